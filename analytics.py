@@ -0,0 +1,209 @@
+"""
+Ocean Tasks productivity analytics
+Turns a user's completion history into lead-time distributions, the on-time
+ratio, weekly created/completed trends and a day-of-week x hour heatmap of
+completions.
+
+Tasks are read once into NumPy columns of wall-clock seconds (the
+task_model.due_timestamp() scale) and every figure is computed with array
+operations, so a million tasks take a fraction of a second. Without NumPy
+the same figures come from plain loops (analyze_python), which the
+benchmark compares against.
+"""
+
+import math
+import warnings
+from bisect import bisect_right
+from datetime import date
+
+from task_model import due_timestamp
+
+try:
+    import numpy as np
+except ImportError:  # optional speed-up
+    np = None
+
+DAY = 86400
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+# Lead-time histogram buckets: upper bounds in hours, the last one is open-ended
+LEAD_TIME_BUCKETS = ((1, '< 1 hour'), (24, '< 1 day'), (72, '< 3 days'), (168, '< 1 week'), (336, '< 2 weeks'))
+LEAD_TIME_OVERFLOW = '2 weeks +'
+
+# numpy datetime64 seconds count from 1970; due_timestamp() counts from 0001-01-01
+_UNIX_EPOCH = date(1970, 1, 1).toordinal() * DAY
+_NAT = -2 ** 63
+
+
+def _week_start(timestamp):
+    """Ordinal of the Monday starting the week of a wall-clock timestamp"""
+    day = timestamp // DAY
+    return day - (day - 1) % 7  # date.fromordinal(1) is a Monday
+
+
+def _percentile(ordered, q):
+    """Nearest-rank percentile of a sorted sequence"""
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def _lead_time_summary(count, total_seconds, percentiles, histogram):
+    summary = {'count': count, 'mean': round(total_seconds / count / 3600, 2) if count else None}
+    for name, value in percentiles.items():
+        summary[name] = round(value / 3600, 2) if value is not None else None
+    labels = [label for _, label in LEAD_TIME_BUCKETS] + [LEAD_TIME_OVERFLOW]
+    summary['histogram'] = [{'label': label, 'count': int(n)} for label, n in zip(labels, histogram)]
+    return summary
+
+
+def _report(counts, lead_time, on_time, due_and_completed, weekly_start, created, completed, heatmap):
+    total, done, overdue = counts
+    return {
+        'total_tasks': total,
+        'completed_tasks': done,
+        'open_tasks': total - done,
+        'overdue_tasks': overdue,
+        'lead_time_hours': lead_time,
+        'on_time': {
+            'due_and_completed': due_and_completed,
+            'on_time': on_time,
+            'ratio': round(on_time / due_and_completed, 3) if due_and_completed else None,
+        },
+        'weekly': [{'week': date.fromordinal(weekly_start + 7 * i).isoformat(),
+                    'created': int(created[i]), 'completed': int(completed[i])} for i in range(len(created))],
+        'heatmap': {'days': list(WEEKDAYS), 'completed': [[int(n) for n in row] for row in heatmap]},
+    }
+
+
+def analyze_python(tasks, now, weeks=12):
+    """analyze() with plain loops over the task dicts, for when NumPy is missing"""
+    total = done = overdue = 0
+    lead_times = []
+    on_time = due_and_completed = 0
+    first_week = _week_start(now) - 7 * (weeks - 1)
+    created_weekly = [0] * weeks
+    completed_weekly = [0] * weeks
+    heatmap = [[0] * 24 for _ in WEEKDAYS]
+    bounds = [hours * 3600 for hours, _ in LEAD_TIME_BUCKETS]
+
+    for task in tasks:
+        total += 1
+        created = due_timestamp(task.get('created_at'))
+        finished = due_timestamp(task.get('completed_at'))
+        due_date = task.get('due_date') or ''
+        due = due_timestamp(due_date)
+        # A date-only due date lasts until the end of that day
+        deadline = due + DAY if due is not None and len(due_date) == 10 else due
+        if created is not None:
+            week = (_week_start(created) - first_week) // 7
+            if 0 <= week < weeks:
+                created_weekly[week] += 1
+        if not task.get('completed', False):
+            if due is not None and due < now:
+                overdue += 1
+            continue
+        done += 1
+        if finished is None:
+            continue
+        if created is not None:
+            lead_times.append(finished - created)
+        if due is not None:
+            due_and_completed += 1
+            on_time += finished <= deadline
+        week = (_week_start(finished) - first_week) // 7
+        if 0 <= week < weeks:
+            completed_weekly[week] += 1
+        heatmap[(finished // DAY - 1) % 7][finished % DAY // 3600] += 1
+
+    lead_times.sort()
+    histogram = [0] * (len(bounds) + 1)
+    for lead in lead_times:
+        histogram[bisect_right(bounds, lead)] += 1
+    percentiles = {name: _percentile(lead_times, q) if lead_times else None for name, q in PERCENTILES}
+    lead_time = _lead_time_summary(len(lead_times), sum(lead_times), percentiles, histogram)
+    return _report((total, done, overdue), lead_time, on_time, due_and_completed,
+                   first_week, created_weekly, completed_weekly, heatmap)
+
+
+class TaskColumns:
+    """A user's tasks as NumPy arrays, loaded in one pass
+
+    created, due, deadline and finished hold wall-clock seconds, with
+    _NAT where the task has no such date; completed is a bool array.
+    """
+
+    def __init__(self, tasks):
+        tasks = tasks if isinstance(tasks, list) else list(tasks)
+        # Seconds resolution and wall-clock time, like due_timestamp()
+        due_dates = [task.get('due_date') or '' for task in tasks]
+        self.created = self._parse([(task.get('created_at') or '')[:19] for task in tasks])
+        self.due = self._parse([value[:19] for value in due_dates])
+        date_only = np.array([len(value) == 10 for value in due_dates], dtype=bool)
+        self.deadline = np.where(date_only, self.due + DAY, self.due)
+        self.finished = self._parse([(task.get('completed_at') or '')[:19] for task in tasks])
+        self.completed = np.array([bool(task.get('completed', False)) for task in tasks], dtype=bool)
+
+    def __len__(self):
+        return len(self.completed)
+
+    @staticmethod
+    def _parse(values):
+        """ISO strings to seconds, falling back to due_timestamp() for anything NumPy can't read exactly"""
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')  # e.g. a UTC offset, which NumPy would convert
+                seconds = np.array(values, dtype='datetime64[s]').astype(np.int64)
+            return np.where(seconds == _NAT, _NAT, seconds + _UNIX_EPOCH)
+        except (ValueError, Warning):
+            stamps = (due_timestamp(value) for value in values)
+            return np.fromiter((_NAT if stamp is None else stamp for stamp in stamps), dtype=np.int64,
+                               count=len(values))
+
+
+def load(tasks):
+    """A user's tasks ready for analyze(): TaskColumns, or a plain list without NumPy"""
+    if np is None:
+        return list(tasks)
+    return TaskColumns(tasks)
+
+
+def analyze(tasks, now, weeks=12):
+    """Productivity figures for an iterable of tasks (or TaskColumns) as of `now`, a due_timestamp() value
+
+    weekly covers the `weeks` weeks up to and including the current one;
+    lead times run from created_at to completed_at; a task completed by the
+    end of its due date counts as on time.
+    """
+    if np is None:
+        return analyze_python(tasks, now, weeks)
+    columns = tasks if isinstance(tasks, TaskColumns) else TaskColumns(tasks)
+    has_created = columns.created != _NAT
+    has_due = columns.due != _NAT
+    has_finished = columns.completed & (columns.finished != _NAT)
+
+    open_tasks = ~columns.completed
+    overdue = int(np.count_nonzero(open_tasks & has_due & (columns.due < now)))
+    counts = (len(columns), int(np.count_nonzero(columns.completed)), overdue)
+
+    lead_mask = has_finished & has_created
+    lead_times = np.sort(columns.finished[lead_mask] - columns.created[lead_mask])
+    bounds = np.array([hours * 3600 for hours, _ in LEAD_TIME_BUCKETS], dtype=np.int64)
+    histogram = np.bincount(np.searchsorted(bounds, lead_times, side='right'), minlength=len(bounds) + 1)
+    percentiles = {name: int(_percentile(lead_times, q)) if len(lead_times) else None for name, q in PERCENTILES}
+    lead_time = _lead_time_summary(len(lead_times), int(lead_times.sum()), percentiles, histogram)
+
+    due_mask = has_finished & has_due
+    due_and_completed = int(np.count_nonzero(due_mask))
+    on_time = int(np.count_nonzero(columns.finished[due_mask] <= columns.deadline[due_mask]))
+
+    first_week = _week_start(now) - 7 * (weeks - 1)
+
+    def weekly(stamps):
+        offsets = (_week_start(stamps) - first_week) // 7
+        return np.bincount(offsets[(offsets >= 0) & (offsets < weeks)], minlength=weeks)
+
+    finished = columns.finished[has_finished]
+    cells = ((finished // DAY - 1) % 7) * 24 + finished % DAY // 3600
+    heatmap = np.bincount(cells, minlength=7 * 24).reshape(7, 24)
+    return _report(counts, lead_time, on_time, due_and_completed, first_week,
+                   weekly(columns.created[has_created]), weekly(finished), heatmap)
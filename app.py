@@ -1,108 +1,215 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from datetime import datetime, timedelta
-import json
+from flask import Flask, Response, abort, render_template, request, jsonify, send_file, session, redirect, stream_with_context, url_for
+from werkzeug.utils import safe_join
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime
+import csv
+import io
 import os
 import uuid
 import hashlib
+import atexit
+import mimetypes
 import re
+import time
+
+import analytics
+import passwords
+from assets import AssetManifest, pick_variant
+from cache import AssetVersions, TTLCache
+from events import EventBus
+from mcp_client import McpPool
+import task_model
+from migrations import run_migrations
+from scheduler import OverdueScheduler
+from sessions import DEFAULT_LIFETIME, REMEMBER_LIFETIME, ServerSessionInterface, create_session_store
+from storage import create_storage
+from task_index import decode_cursor, due_timestamp, encode_cursor, now_timestamp, parse_sort, summarize_changes
+
+class OceanJSONProvider(DefaultJSONProvider):
+    """Compact JSON responses, encoded with orjson when it is installed"""
+    
+    def dumps(self, obj, **kwargs):
+        kwargs.pop('separators', None)
+        if kwargs:  # e.g. indented output in debug mode
+            return super().dumps(obj, **kwargs)
+        return task_model.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return task_model.loads(s)
 
 app = Flask(__name__)
-app.secret_key = 'ocean_waves_secret_key_2024'  # Change this in production
+app.json = OceanJSONProvider(app)
+
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 500
+MAX_SESSIONS = 10000
+
+# Set up by create_app(); nothing touches disk until it runs
+store = None
+session_store = None
+mcp_pool = None
+overdue_scheduler = None
+
+# mcp_server.py, reached over a few long-lived sessions; calls that miss the
+# deadline are answered from recent results or the local fallbacks
+MCP_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp.json')
+MCP_POOL_SIZE = int(os.environ.get('OCEAN_MCP_POOL', 2))
+MCP_DEADLINE = int(os.environ.get('OCEAN_MCP_DEADLINE_MS', 10)) / 1000
+
+def create_app(storage=None, sessions=None, data_dir='data', secret_key=None, migrate=True):
+    """Open storage and sessions under data_dir, upgrade the data and return the app
+    
+    storage is 'json' (data/*.json files) or 'sqlite' (indexed data/ocean.db),
+    defaulting to OCEAN_STORAGE. Sessions live server-side and the cookie only
+    carries an opaque id: 'memory' (bounded LRU, single process) or 'sqlite'
+    (data/sessions.db, shared by worker processes), defaulting to OCEAN_SESSIONS.
+    Also connects the MCP pool (OCEAN_MCP_POOL sessions, 0 to turn it off)
+    and starts the overdue scheduler, unless migrate is False (the migrate
+    command), which only opens the stores.
+    Runs once per process; later calls return the same app.
+    """
+    global store, session_store, mcp_pool, overdue_scheduler
+    if store is not None:
+        return app
+    
+    app.secret_key = secret_key or os.environ.get('OCEAN_SECRET_KEY', 'ocean_waves_secret_key_2024')  # Change this in production
+    os.makedirs(data_dir, exist_ok=True)
+    
+    backend = storage or os.environ.get('OCEAN_STORAGE', 'json')
+    store = create_storage(backend,
+                           tasks_file=os.path.join(data_dir, 'tasks.json'),
+                           users_file=os.path.join(data_dir, 'users.json'),
+                           db_file=os.path.join(data_dir, 'ocean.db'))
+    
+    session_store = create_session_store(sessions or os.environ.get('OCEAN_SESSIONS', 'memory'),
+                                         db_file=os.path.join(data_dir, 'sessions.db'),
+                                         max_sessions=MAX_SESSIONS)
+    session_store.start_sweeper()
+    app.session_interface = ServerSessionInterface(session_store)
+    
+    if not migrate:
+        # e.g. the migrate command: the stores only, no background services on unmigrated data
+        mcp_pool = McpPool(None, enabled=False)
+        return app
+    
+    # Upgrade legacy data once, before serving any requests
+    run_migrations(store)
+    
+    try:
+        # The server reads tasks straight from this store for user_id tool calls
+        mcp_pool = McpPool.from_config(MCP_CONFIG, size=MCP_POOL_SIZE, deadline=MCP_DEADLINE,
+                                       env={'OCEAN_DATA_DIR': os.path.abspath(data_dir), 'OCEAN_STORAGE': backend})
+    except (OSError, ValueError, KeyError) as e:
+        print(f"🐚 MCP server not configured ({e}); using local messages")
+        mcp_pool = McpPool(None, enabled=False)
+    atexit.register(mcp_pool.start().close)
+    overdue_scheduler = OverdueScheduler(store, event_bus).start()
+    return app
+
+# In-process response caches. Per-user entries are keyed by the task revision,
+# so a task change invalidates them; the TTL bounds time-dependent staleness.
+PAGE_CACHE_TTL = 300
+STATS_CACHE_TTL = 60
+ASSET_MAX_AGE = 365 * 24 * 3600
+page_cache = TTLCache('pages', max_entries=1024, ttl=PAGE_CACHE_TTL)
+stats_cache = TTLCache('stats', max_entries=4096, ttl=STATS_CACHE_TTL)
+# A user's tasks as analytics columns, loaded once per revision (they can be large)
+analytics_columns = TTLCache('analytics_columns', max_entries=32, ttl=PAGE_CACHE_TTL)
+ANALYTICS_MAX_WEEKS = 104
+
+# Task changes pushed to open /api/events streams. Each stream holds a request
+# thread, so their number is capped (server.py sets it from --threads).
+event_bus = EventBus()
+app.config['MAX_EVENT_STREAMS'] = int(os.environ.get('OCEAN_MAX_EVENT_STREAMS', 100))
+EVENT_HEARTBEAT = 15
+EVENT_STREAM_MAX_AGE = 300
+EVENT_RETRY_MS = 3000
+asset_versions = AssetVersions(app.static_folder)
+
+# Built by `python assets.py`: minified, content-named and precompressed copies in static/dist
+ASSET_DIR = os.path.join(app.static_folder, 'dist')
+asset_manifest = AssetManifest(os.path.join(ASSET_DIR, 'manifest.json'))
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static asset, fingerprinted with its content hash so it can be cached forever
+    
+    Uses the built copy from the asset manifest when there is one, else the
+    source file with its hash in the query string.
+    """
+    built = asset_manifest.get(filename)
+    if built:
+        return url_for('built_asset', filename=built)
+    version = asset_versions.version(filename)
+    if version is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=filename, v=version)
 
-# Simple JSON storage for tasks and users
-TASKS_FILE = 'data/tasks.json'
-USERS_FILE = 'data/users.json'
-os.makedirs('data', exist_ok=True)
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Serve a built asset, precompressed to match Accept-Encoding, straight from disk"""
+    path = safe_join(ASSET_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    variant, encoding = pick_variant(path, request.accept_encodings)
+    # send_file hands the open file to the server's wsgi.file_wrapper (sendfile where supported)
+    response = send_file(variant, mimetype=mimetypes.guess_type(path)[0], conditional=True, max_age=ASSET_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.before_request
+def require_create_app():
+    """Fail with a pointer to the right entry point when served as app:app"""
+    if store is None:
+        raise RuntimeError("create_app() was never called; serve 'app:create_app()' or wsgi:app instead of app:app")
+
+@app.after_request
+def cache_static_assets(response):
+    """Fingerprinted assets never change under their URL; everything else revalidates"""
+    if request.endpoint == 'static' and response.status_code in (200, 304):
+        filename = request.view_args.get('filename', '')
+        version = request.args.get('v')
+        if version and version == asset_versions.version(filename):
+            response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'public, no-cache'
+    return response
 
 def load_users():
-    """Load users from JSON file"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    """Load all users from the storage backend"""
+    return store.load_users()
 
 def save_users(users):
-    """Save users to JSON file"""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    """Save all users to the storage backend"""
+    store.save_users(users)
 
 def create_user(username, email, password, favorite_beach):
     """Create a new user"""
-    users = load_users()
-    
-    if username in users:
-        return False, "Username already exists"
-    
-    # Check if email already exists
-    for user_data in users.values():
-        if user_data.get('email') == email:
-            return False, "Email already registered"
-    
-    users[username] = {
+    return store.add_user(username, {
         'email': email,
         'password': hash_password(password),
         'favorite_beach': favorite_beach,
-        'created_at': datetime.now().isoformat(),
-        'last_login': None
-    }
-    
-    save_users(users)
-    return True, "User created successfully"
-
-def migrate_old_tasks():
-    """Migrate old tasks without user_id to have a default user_id"""
-    if not os.path.exists(TASKS_FILE):
-        return
-        
-    # Read tasks directly without calling load_tasks() to avoid recursion
-    with open(TASKS_FILE, 'r') as f:
-        tasks = json.load(f)
-    
-    updated = False
-    
-    for task in tasks:
-        if 'user_id' not in task:
-            # Assign old tasks to a default user or the first available user
-            users = load_users()
-            if users:
-                task['user_id'] = list(users.keys())[0]  # Assign to first user
-            else:
-                task['user_id'] = 'admin'  # Default fallback
-            updated = True
-    
-    if updated:
-        save_tasks(tasks)
-        print(f"Migrated {len([t for t in tasks if 'user_id' in t])} tasks")
+        'created_at': datetime.now().isoformat()
+    })
 
 def load_tasks():
-    """Load tasks from JSON file"""
-    if os.path.exists(TASKS_FILE):
-        with open(TASKS_FILE, 'r') as f:
-            tasks = json.load(f)
-        
-        # Auto-migrate old tasks on first load (check only, don't call load_tasks again)
-        needs_migration = any('user_id' not in task for task in tasks)
-        if needs_migration:
-            migrate_old_tasks()
-            # Reload after migration
-            with open(TASKS_FILE, 'r') as f:
-                tasks = json.load(f)
-        
-        return tasks
-    return []
+    """Load all tasks from the storage backend"""
+    return store.load_tasks()
 
 def save_tasks(tasks):
-    """Save tasks to JSON file"""
-    with open(TASKS_FILE, 'w') as f:
-        json.dump(tasks, f, indent=2)
+    """Save all tasks to the storage backend"""
+    store.save_tasks(tasks)
 
 def hash_password(password):
-    """Simple password hashing (use proper hashing in production)"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Salted scrypt/PBKDF2 hash, computed on the bounded KDF pool"""
+    return passwords.hash_password_pooled(password)
 
 def verify_password(password, hashed):
-    """Verify password against hash"""
-    return hash_password(password) == hashed
+    """Verify password against hash (legacy SHA-256 hashes included)"""
+    return passwords.verify_password_pooled(password, hashed)
 
 def get_time_greeting(username):
     """Get time-based greeting with username"""
@@ -144,6 +251,26 @@ def get_time_greeting(username):
     
     return f"{greeting}! ({time_str})"
 
+def render_page(template, **context):
+    """Render a template through the page cache, as a revalidatable private response
+    
+    Context values must be hashable; they are part of the cache key.
+    """
+    def render():
+        html = render_template(template, **context)
+        return html, hashlib.sha256(html.encode()).hexdigest()
+    
+    html, etag = page_cache.get_or_compute((template, tuple(sorted(context.items()))), render)
+    response = app.response_class(html, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+def cached_task_stats(user_id):
+    """store.task_stats() for user_id, reused until their tasks change or the entry expires"""
+    key = ('stats', user_id, store.revision(user_id))
+    return dict(stats_cache.get_or_compute(key, lambda: store.task_stats(user_id, now_timestamp())))
+
 def require_login(f):
     """Decorator to require login for routes"""
     def decorated_function(*args, **kwargs):
@@ -153,12 +280,24 @@ def require_login(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+def require_local(f):
+    """Decorator for monitoring routes: only clients on this machine, not requests relayed by a proxy"""
+    def decorated_function(*args, **kwargs):
+        proxied = 'X-Forwarded-For' in request.headers or 'Forwarded' in request.headers
+        if request.remote_addr not in LOCAL_ADDRS or proxied:
+            return jsonify({'message': '🐚 Metrics are only available from the server itself'}), 403
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
 @app.route('/signup')
 def signup():
     """Signup page"""
     if 'user_id' in session:
         return redirect(url_for('index'))
-    return render_template('signup.html')
+    return render_page('signup.html')
 
 @app.route('/api/signup', methods=['POST'])
 def api_signup():
@@ -215,8 +354,7 @@ def check_username():
     if not username:
         return jsonify({'available': False})
     
-    users = load_users()
-    available = username not in users
+    available = store.get_user(username) is None
     
     return jsonify({'available': available})
 
@@ -228,7 +366,15 @@ def login():
     
     # Get username from query parameter if redirected from signup
     username = request.args.get('username', '')
-    return render_template('login.html', prefill_username=username)
+    return render_page('login.html', prefill_username=username)
+
+def start_session(username, remember):
+    """Log username in on a fresh session id; "remember me" keeps it for 30 days"""
+    session.regenerate()
+    session['user_id'] = username
+    session['username'] = username
+    session.permanent = bool(remember)
+    session.set_lifetime(REMEMBER_LIFETIME if remember else DEFAULT_LIFETIME)
 
 @app.route('/api/login', methods=['POST'])
 def api_login():
@@ -242,20 +388,17 @@ def api_login():
         return jsonify({'message': '🐚 Please provide both username and password!'}), 400
     
     # Check registered users
-    users = load_users()
-    if username in users:
-        user_data = users[username]
+    user_data = store.get_user(username)
+    if user_data:
         if verify_password(password, user_data['password']):
-            session['user_id'] = username
-            session['username'] = username
+            start_session(username, remember)
             
-            # Update last login
-            users[username]['last_login'] = datetime.now().isoformat()
-            save_users(users)
+            # Upgrade legacy SHA-256 hashes and old cost settings while we know the password
+            if passwords.needs_rehash(user_data['password']):
+                store.update_user(username, {'password': hash_password(password)})
             
-            if remember:
-                session.permanent = True
-                app.permanent_session_lifetime = timedelta(days=30)
+            # Buffered and written in batches, so logging in never rewrites the user table
+            store.record_login(username, datetime.now().isoformat())
             
             time_greeting = get_time_greeting(username)
             
@@ -275,12 +418,7 @@ def api_login():
     }
     
     if username in demo_users and demo_users[username] == password:
-        session['user_id'] = username
-        session['username'] = username
-        
-        if remember:
-            session.permanent = True
-            app.permanent_session_lifetime = timedelta(days=30)
+        start_session(username, remember)
         
         time_greeting = get_time_greeting(username)
         
@@ -304,53 +442,131 @@ def logout():
 @require_login
 def profile():
     """User profile page"""
-    users = load_users()
-    user_data = users.get(session['user_id'], {})
+    user_data = store.get_user(session['user_id']) or {}
+    user_data['last_login'] = store.last_login(session['username'])  # login times live in the login store, not the user record
     
     # Get user's task statistics
-    tasks = load_tasks()
-    user_tasks = [task for task in tasks if task.get('user_id') == session['user_id']]
-    
-    stats = {
-        'total_tasks': len(user_tasks),
-        'completed_tasks': len([t for t in user_tasks if t.get('completed', False)]),
-        'pending_tasks': len([t for t in user_tasks if not t.get('completed', False)]),
-        'completion_rate': 0
-    }
+    stats = cached_task_stats(session['user_id'])
+    stats['overdue_tasks'] = overdue_scheduler.summary(session['user_id'])['count']
+    stats['completion_rate'] = 0
     
     if stats['total_tasks'] > 0:
         stats['completion_rate'] = round((stats['completed_tasks'] / stats['total_tasks']) * 100, 1)
     
-    return render_template('profile.html', 
-                         user_data=user_data, 
-                         username=session['username'],
-                         stats=stats)
+    response = app.make_response(render_template('profile.html', 
+                                                 user_data=user_data, 
+                                                 username=session['username'],
+                                                 stats=stats))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/')
 @require_login
 def index():
     """Main page - requires login"""
-    return render_template('index.html', username=session.get('username', 'Ocean Explorer'))
+    return render_page('index.html', username=session.get('username', 'Ocean Explorer'))
+
+def parse_task_query(args):
+    """Turn /api/tasks query parameters into store.query_tasks() arguments"""
+    query = {'sort': args.get('sort', 'created_at')}
+    field, _ = parse_sort(query['sort'])
+    
+    if 'limit' in args:
+        if not args['limit'].isdigit() or not 1 <= int(args['limit']) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        query['limit'] = int(args['limit'])
+    
+    if args.get('cursor'):
+        query['cursor'] = decode_cursor(args['cursor'], field)
+    
+    if 'completed' in args:
+        query['completed'] = args['completed'].lower() in ('1', 'true', 'yes')
+    
+    for name in ('due_after', 'due_before'):
+        if args.get(name):
+            query[name] = due_timestamp(args[name])
+            if query[name] is None:
+                raise ValueError(f"{name} must be an ISO date")
+    
+    return query
+
+def revision_etag(user_id, revision, full_path):
+    """Strong ETag for a task read of full_path at one of the user's revisions"""
+    return hashlib.sha256(f"{user_id}:{revision}:{full_path}".encode()).hexdigest()
+
+def task_etag():
+    """(revision, strong ETag) for the current task read, taken before the data is read"""
+    revision = store.revision(session['user_id'])
+    return revision, revision_etag(session['user_id'], revision, request.full_path)
+
+def revalidated(response, revision, etag):
+    """Mark a task read as revalidate-on-use and tag it with the user's revision"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Revision'] = str(revision)
+    return response
+
+def not_modified(revision, etag):
+    """304 response when the client already holds this revision"""
+    if request.if_none_match.contains(etag):
+        return revalidated(app.response_class(status=304), revision, etag)
+    return None
 
 @app.route('/api/tasks', methods=['GET'])
 @require_login
 def get_tasks():
-    """Get all tasks for logged-in user"""
-    tasks = load_tasks()
-    current_user = session['user_id']
-    user_tasks = [task for task in tasks if task.get('user_id') == current_user]
-    return jsonify(user_tasks)
+    """Get tasks for logged-in user, optionally filtered, sorted and paginated
+    
+    Query parameters: limit, cursor, completed, due_after, due_before and
+    sort (created_at or due_date, '-' prefix for descending). When more tasks
+    follow, the cursor for the next page is sent in the X-Next-Cursor header.
+    """
+    revision, etag = task_etag()
+    cached = not_modified(revision, etag)
+    if cached:
+        return cached
+    
+    try:
+        query = parse_task_query(request.args)
+        user_tasks, last_key = store.query_tasks(session['user_id'], **query)
+    except ValueError as e:
+        return jsonify({'error': f'🐚 {e}'}), 400
+    
+    response = jsonify(user_tasks)
+    if last_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(last_key)
+    return revalidated(response, revision, etag)
 
-@app.route('/api/tasks', methods=['POST'])
+@app.route('/api/tasks/changes', methods=['GET'])
 @require_login
-def create_task():
-    """Create a new task for logged-in user"""
-    data = request.json
-    tasks = load_tasks()
+def get_task_changes():
+    """Tasks created, updated or deleted since revision `since`
     
-    new_task = {
+    When the server no longer remembers that far back, `reset` is true and
+    the client should reload its tasks from /api/tasks.
+    """
+    since = request.args.get('since', '')
+    if not since.isdigit():
+        return jsonify({'error': '🐚 since must be a revision number'}), 400
+    
+    return jsonify(change_feed(session['user_id'], int(since)))
+
+def change_feed(user_id, since):
+    """The /api/tasks/changes payload: what changed for user_id after revision `since`"""
+    revision, changes = store.changes_since(user_id, since)
+    if changes is None:
+        return {'revision': revision, 'reset': True, 'created': [], 'updated': [], 'deleted': [], 'tasks': []}
+    
+    summary = summarize_changes(changes)
+    tasks = [store.get_task(user_id, task_id) for task_id in summary['created'] + summary['updated']]
+    return dict(summary, revision=revision, reset=False, tasks=[task for task in tasks if task])
+
+def build_task(data, user_id):
+    """A new task for user_id from request data (ValueError if malformed)"""
+    data = task_model.validate_patch(data)
+    return {
         'id': str(uuid.uuid4()),
-        'user_id': session['user_id'],
+        'user_id': user_id,
         'title': data.get('title', ''),
         'description': data.get('description', ''),
         'due_date': data.get('due_date'),
@@ -358,9 +574,95 @@ def create_task():
         'created_at': datetime.now().isoformat(),
         'completed_at': None
     }
+
+def task_changes(task, data):
+    """The whitelisted changes to store for an update, stamping completed_at on first completion"""
+    changes = task_model.validate_patch(data)
+    if changes.get('completed') and not task.get('completed_at'):
+        changes['completed_at'] = datetime.now().isoformat()
+    return changes
+
+def publish_task_event(user_id, op, task=None, task_id=None):
+    """Push one task change to the user's event streams, tagged with the revision it produced"""
+    revision = store.revision(user_id)
+    data = {'op': op, 'revision': revision}
+    if task is not None:
+        data['task'] = task
+    else:
+        data['task_id'] = task_id
+    event_bus.publish(user_id, {'type': 'task', 'id': revision, 'data': data})
+
+def publish_sync(user_id):
+    """Tell the user's event streams to fetch /api/tasks/changes, e.g. after a batch"""
+    event_bus.publish(user_id, {'type': 'sync', 'data': {'revision': store.revision(user_id)}})
+
+def sse_message(event):
+    """One event in text/event-stream framing"""
+    lines = [f"event: {event['type']}"]
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"data: {task_model.dumps(event['data']).decode()}")
+    return '\n'.join(lines) + '\n\n'
+
+@app.route('/api/events')
+@require_login
+def task_events():
+    """Server-sent events with the logged-in user's task changes
+    
+    `task` events carry one create, update or delete and use the revision
+    it produced as their id, so a reconnecting EventSource resumes after
+    Last-Event-ID (or ?since=<revision> on the first connect). `sync` events
+    mean changes arrived another way; fetch /api/tasks/changes. Comment lines
+    every 15 seconds keep the connection alive, and streams end after five
+    minutes so the browser reconnects.
+    """
+    if event_bus.subscriber_count() >= app.config['MAX_EVENT_STREAMS']:
+        response = jsonify({'error': '🌊 Too many open event streams; poll /api/tasks/changes instead'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    user_id = session['user_id']
+    after = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+    after = int(after) if after.isdigit() else store.revision(user_id)
+    return Response(event_stream(user_id, after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def event_stream(user_id, after):
+    """Replay what the user missed after revision `after`, then relay live events and heartbeats"""
+    with event_bus.subscribe(user_id, after) as subscription:
+        yield f"retry: {EVENT_RETRY_MS}\n\n"
+        seen = after
+        for event in subscription.replay:
+            seen = max(seen, event['id'])
+            yield sse_message(event)
+        
+        closes_at = time.monotonic() + EVENT_STREAM_MAX_AGE
+        event = None
+        while time.monotonic() < closes_at and not event_bus.closed:
+            if event is None:
+                # Quiet spell: catch writes the bus never saw, e.g. from other worker processes
+                revision = store.revision(user_id)
+                if revision > seen:
+                    seen = revision
+                    yield sse_message({'type': 'sync', 'data': {'revision': revision}})
+                else:
+                    yield ": heartbeat\n\n"
+            elif event['type'] != 'close':
+                seen = max(seen, event.get('id') or event['data'].get('revision') or 0)
+                yield sse_message(event)
+            event = subscription.get(min(EVENT_HEARTBEAT, max(closes_at - time.monotonic(), 0)))
+
+@app.route('/api/tasks', methods=['POST'])
+@require_login
+def create_task():
+    """Create a new task for logged-in user"""
+    try:
+        new_task = build_task(request.json, session['user_id'])
+    except ValueError as e:
+        return jsonify({'error': f'🐚 {e}'}), 400
     
-    tasks.append(new_task)
-    save_tasks(tasks)
+    store.add_task(new_task)
+    publish_task_event(session['user_id'], 'create', task=new_task)
     
     return jsonify(new_task), 201
 
@@ -368,29 +670,193 @@ def create_task():
 @require_login
 def update_task(task_id):
     """Update a task for logged-in user"""
-    data = request.json
-    tasks = load_tasks()
-    
-    for task in tasks:
-        if task['id'] == task_id and task.get('user_id') == session['user_id']:
-            task.update(data)
-            if data.get('completed') and not task.get('completed_at'):
-                task['completed_at'] = datetime.now().isoformat()
-            save_tasks(tasks)
+    task = store.get_task(session['user_id'], task_id)
+    
+    if task:
+        try:
+            changes = task_changes(task, request.json)
+        except ValueError as e:
+            return jsonify({'error': f'🐚 {e}'}), 400
+        task = store.update_task(session['user_id'], task_id, changes)
+        if task:
+            publish_task_event(session['user_id'], 'update', task=task)
             return jsonify(task)
     
     return jsonify({'error': 'Task not found or access denied'}), 404
 
+def plan_batch(operations, user_id):
+    """Validate a batch request and turn it into store.apply_batch() operations for user_id"""
+    if not isinstance(operations, list) or not 1 <= len(operations) <= MAX_BATCH_SIZE:
+        raise ValueError(f"Send a list of 1 to {MAX_BATCH_SIZE} operations")
+    
+    planned = []
+    for position, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op == 'create' and isinstance(operation.get('task'), dict):
+            planned.append({'op': 'create', 'task': build_task(operation['task'], user_id)})
+        elif op == 'update' and isinstance(operation.get('id'), str) and isinstance(operation.get('changes'), dict):
+            task = store.get_task(user_id, operation['id']) or {}
+            planned.append({'op': 'update', 'id': operation['id'],
+                            'changes': task_changes(task, operation['changes'])})
+        elif op == 'delete' and isinstance(operation.get('id'), str):
+            planned.append({'op': 'delete', 'id': operation['id']})
+        else:
+            raise ValueError(f"Operation {position} must be a create with a task, an update with an id "
+                             f"and changes, or a delete with an id")
+    return planned
+
+@app.route('/api/tasks/batch', methods=['POST'])
+@require_login
+def batch_tasks():
+    """Apply a list of task creates, updates and deletes in one atomic write
+    
+    Body: [{"op": "create", "task": {...}}, {"op": "update", "id": ..., "changes": {...}},
+    {"op": "delete", "id": ...}]. Operations run in order and the response
+    holds one result per operation, each with the status the single-task
+    endpoint would have returned.
+    """
+    try:
+        planned = plan_batch(request.get_json(silent=True), session['user_id'])
+    except ValueError as e:
+        return jsonify({'error': f'🐚 {e}'}), 400
+    
+    applied = store.apply_batch(session['user_id'], planned)
+    publish_sync(session['user_id'])
+    return jsonify({'results': batch_results(planned, applied)})
+
+def batch_results(planned, applied):
+    """One result per batch operation, with the status the single-task endpoint would have returned"""
+    results = []
+    for operation, result in zip(planned, applied):
+        if not result:
+            results.append({'status': 404, 'error': 'Task not found or access denied'})
+        elif operation['op'] == 'delete':
+            results.append({'status': 200, 'success': True})
+        else:
+            results.append({'status': 201 if operation['op'] == 'create' else 200, 'task': result})
+    return results
+
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson', 'ocean-tasks.jsonl'),
+    'csv': ('text/csv', 'ocean-tasks.csv'),
+}
+IMPORT_CHUNK_SIZE = 500
+
+def export_rows(user_id, export_format):
+    """Encoded chunks of a user's tasks, read from the store a page at a time"""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(task_model.TASK_FIELDS)
+    for task in store.iter_user_tasks(user_id):
+        if export_format == 'jsonl':
+            yield task_model.dumps(task) + b'\n'
+            continue
+        writer.writerow([csv_value(task.get(field)) for field in task_model.TASK_FIELDS])
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if export_format == 'csv':
+        yield buffer.getvalue()
+
+def csv_value(value):
+    """CSV cell for a task field: booleans as true/false, None as empty"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '' if value is None else value
+
+@app.route('/api/tasks/export', methods=['GET'])
+@require_login
+def export_tasks():
+    """Stream every task of the logged-in user as JSON lines (default) or CSV"""
+    export_format = request.args.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': '🐚 format must be jsonl or csv'}), 400
+    
+    mimetype, filename = EXPORT_FORMATS[export_format]
+    rows = export_rows(session['user_id'], export_format)
+    return Response(stream_with_context(rows), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def csv_record(row):
+    """Task fields from a CSV row, where every cell is text"""
+    record = {name: row.get(name) or '' for name in ('title', 'description')}
+    record['completed'] = (row.get('completed') or '').lower() in ('1', 'true', 'yes')
+    for name in ('due_date', 'created_at', 'completed_at'):
+        record[name] = row.get(name) or None
+    return record
+
+def imported_task(fields, user_id):
+    """A new task for user_id from one exported record, keeping its completion state and timestamps"""
+    task = build_task(fields, user_id)
+    task['completed'] = fields.get('completed', False)
+    for name in ('created_at', 'completed_at'):
+        value = fields.get(name)
+        if isinstance(value, str) and due_timestamp(value) is not None:
+            task[name] = value
+    if not task['completed']:
+        task['completed_at'] = None
+    return task
+
+def import_records(stream, import_format):
+    """Yield (line number, record) pairs parsed from an upload as it arrives"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if import_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, csv_record(row)
+        return
+    for line_number, line in enumerate(text, 1):
+        if line.strip():
+            try:
+                yield line_number, task_model.loads(line)
+            except ValueError:
+                raise ValueError(f"line {line_number} is not valid JSON")
+
+@app.route('/api/tasks/import', methods=['POST'])
+@require_login
+def import_tasks():
+    """Create tasks from an uploaded JSON-lines or CSV export, parsed and stored in chunks
+    
+    The format comes from ?format= or the Content-Type. Each chunk of 500
+    tasks is written atomically; if a record is malformed, the chunks before
+    it stay imported and the response says how many that was.
+    """
+    import_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+    if import_format not in EXPORT_FORMATS:
+        return jsonify({'error': '🐚 format must be jsonl or csv'}), 400
+    
+    imported = 0
+    chunk = []
+    try:
+        for line_number, record in import_records(request.stream, import_format):
+            try:
+                chunk.append({'op': 'create', 'task': imported_task(record, session['user_id'])})
+            except ValueError as e:
+                raise ValueError(f"line {line_number}: {e}")
+            if len(chunk) == IMPORT_CHUNK_SIZE:
+                store.apply_batch(session['user_id'], chunk)
+                imported += len(chunk)
+                chunk = []
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if imported:
+            publish_sync(session['user_id'])
+        return jsonify({'error': f'🐚 {e}', 'imported': imported}), 400
+    
+    if chunk:
+        store.apply_batch(session['user_id'], chunk)
+        imported += len(chunk)
+    if imported:
+        publish_sync(session['user_id'])
+    return jsonify({'imported': imported}), 201
+
 @app.route('/api/tasks/<task_id>', methods=['DELETE'])
 @require_login
 def delete_task(task_id):
     """Delete a task for logged-in user"""
-    tasks = load_tasks()
-    original_length = len(tasks)
-    tasks = [task for task in tasks if not (task['id'] == task_id and task.get('user_id') == session['user_id'])]
-    
-    if len(tasks) < original_length:
-        save_tasks(tasks)
+    if store.delete_task(session['user_id'], task_id):
+        publish_task_event(session['user_id'], 'delete', task_id=task_id)
         return jsonify({'success': True})
     else:
         return jsonify({'error': 'Task not found or access denied'}), 404
@@ -399,17 +865,47 @@ def delete_task(task_id):
 @require_login
 def get_calendar_tasks(year, month):
     """Get tasks for a specific month for logged-in user"""
-    tasks = load_tasks()
-    user_tasks = [task for task in tasks if task.get('user_id') == session['user_id']]
-    month_tasks = []
+    try:
+        start = date(int(year), int(month), 1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    except (ValueError, OverflowError):
+        return jsonify({'error': '📅 Please pick a real month'}), 400
     
-    for task in user_tasks:
-        if task.get('due_date'):
-            task_date = datetime.fromisoformat(task['due_date'].replace('Z', '+00:00'))
-            if task_date.year == int(year) and task_date.month == int(month):
-                month_tasks.append(task)
+    revision, etag = task_etag()
+    cached = not_modified(revision, etag)
+    if cached:
+        return cached
     
-    return jsonify(month_tasks)
+    month_tasks = store.tasks_due_between(session['user_id'], due_timestamp(start.isoformat()),
+                                          due_timestamp(end.isoformat()))
+    return revalidated(jsonify(month_tasks), revision, etag)
+
+@app.route('/api/calendar')
+@require_login
+def get_calendar_range():
+    """Get tasks due in [from, to) for logged-in user, e.g. for the weekly view"""
+    start = due_timestamp(request.args.get('from'))
+    end = due_timestamp(request.args.get('to'))
+    if start is None or end is None:
+        return jsonify({'error': '📅 Please provide ISO dates for from and to'}), 400
+    
+    revision, etag = task_etag()
+    cached = not_modified(revision, etag)
+    if cached:
+        return cached
+    
+    return revalidated(jsonify(store.tasks_due_between(session['user_id'], start, end)), revision, etag)
+
+@app.route('/api/overdue')
+@require_login
+def overdue_tasks():
+    """Logged-in user's overdue tasks, most overdue first, as tracked by the overdue scheduler"""
+    user_id = session['user_id']
+    summary = overdue_scheduler.summary(user_id)
+    summary['tasks'] = overdue_scheduler.overdue_tasks(user_id, limit=MAX_PAGE_SIZE)
+    return jsonify(summary)
+
+MOTIVATION_CONTEXTS = ('overdue_gentle', 'overdue_encouraging', 'completion_celebration', 'daily_motivation')
 
 @app.route('/api/motivational-message', methods=['POST'])
 @require_login
@@ -418,104 +914,175 @@ def get_motivational_message():
     try:
         data = request.json
         context = data.get('context', 'daily_motivation')
-        days_overdue = data.get('days_overdue', 0)
-        task_count = data.get('task_count', 1)
+        if context not in MOTIVATION_CONTEXTS:
+            context = 'daily_motivation'
+        days_overdue = max(int(data.get('days_overdue', 0)), 0)
+        task_count = max(int(data.get('task_count', 1)), 1)
+        if context.startswith('overdue'):
+            # Counted by the overdue scheduler rather than taken from the page
+            overdue = overdue_scheduler.summary(session['user_id'])
+            task_count = max(overdue['count'], 1)
+            days_overdue = overdue['days_overdue']
+            context = 'overdue_encouraging' if overdue['count'] > 3 else 'overdue_gentle'
         
         # Personalized messages with username
         username = session.get('username', 'Ocean Explorer')
         
-        # For now, return a static message since MCP integration requires setup
-        # In production, this would call the MCP server
-        messages = {
-            'overdue_gentle': [
-                f"The tide hasn't turned yet, {username} 🌊 — you've still got this!",
-                f"Every wave begins somewhere, {username}. Take one small step today.",
-                f"Like shells on the shore, your tasks are waiting to be discovered, {username} 🐚"
-            ],
-            'overdue_encouraging': [
-                f"Your productivity is like the tide, {username} - it ebbs and flows. This is your time to flow!",
-                f"The beach is calling, {username}, but first, let's catch up on these tasks 🏖️",
-                f"Like a lighthouse guides ships, let your determination guide you back on track, {username} ⚓"
-            ],
-            'completion_celebration': [
-                f"Fantastic, {username}! You're riding the wave of productivity! 🌊⭐",
-                f"Like a perfect seashell, your completed task is a treasure, {username}! 🐚✨",
-                f"You're making waves with your progress, {username}! Keep it flowing! 🌊"
-            ],
-            'daily_motivation': [
-                f"Start your day like the sunrise over the ocean, {username} - bright and full of possibility! 🌅",
-                f"Let your tasks flow like gentle waves, {username} - steady and purposeful 🌊",
-                f"Today's productivity forecast for {username}: Clear skies and smooth sailing ahead! ⛵"
-            ]
-        }
-        
-        import random
-        message = random.choice(messages.get(context, messages['daily_motivation']))
-        
-        if context.startswith('overdue') and days_overdue > 0:
-            if days_overdue == 1:
-                message += f"\n\n💙 Just one day behind - like a gentle wave, you can catch up easily!"
-            elif days_overdue <= 3:
-                message += f"\n\n🌊 {days_overdue} days behind, but the ocean teaches us patience. You've got this!"
-            else:
-                message += f"\n\n🏖️ Take it one task at a time, like collecting shells on an endless beach."
-        
+        message = mcp_pool.call_tool('get_motivational_message',
+                                     {'context': context, 'days_overdue': days_overdue, 'task_count': task_count},
+                                     fallback=lambda: local_motivational_message(context, days_overdue, username),
+                                     stale_ok=True)
         return jsonify({'message': message})
         
     except Exception as e:
         username = session.get('username', 'Ocean Explorer')
         return jsonify({'message': f'🌊 The ocean whispers to {username}: Keep flowing forward, one wave at a time!'}), 200
 
+def local_motivational_message(context, days_overdue, username):
+    """Motivational message picked here, for when the MCP server can't answer in time"""
+    messages = {
+        'overdue_gentle': [
+            f"The tide hasn't turned yet, {username} 🌊 — you've still got this!",
+            f"Every wave begins somewhere, {username}. Take one small step today.",
+            f"Like shells on the shore, your tasks are waiting to be discovered, {username} 🐚"
+        ],
+        'overdue_encouraging': [
+            f"Your productivity is like the tide, {username} - it ebbs and flows. This is your time to flow!",
+            f"The beach is calling, {username}, but first, let's catch up on these tasks 🏖️",
+            f"Like a lighthouse guides ships, let your determination guide you back on track, {username} ⚓"
+        ],
+        'completion_celebration': [
+            f"Fantastic, {username}! You're riding the wave of productivity! 🌊⭐",
+            f"Like a perfect seashell, your completed task is a treasure, {username}! 🐚✨",
+            f"You're making waves with your progress, {username}! Keep it flowing! 🌊"
+        ],
+        'daily_motivation': [
+            f"Start your day like the sunrise over the ocean, {username} - bright and full of possibility! 🌅",
+            f"Let your tasks flow like gentle waves, {username} - steady and purposeful 🌊",
+            f"Today's productivity forecast for {username}: Clear skies and smooth sailing ahead! ⛵"
+        ]
+    }
+    
+    import random
+    message = random.choice(messages.get(context, messages['daily_motivation']))
+    
+    if context.startswith('overdue') and days_overdue > 0:
+        if days_overdue == 1:
+            message += f"\n\n💙 Just one day behind - like a gentle wave, you can catch up easily!"
+        elif days_overdue <= 3:
+            message += f"\n\n🌊 {days_overdue} days behind, but the ocean teaches us patience. You've got this!"
+        else:
+            message += f"\n\n🏖️ Take it one task at a time, like collecting shells on an endless beach."
+    
+    return message
+
 @app.route('/api/task-analysis', methods=['POST'])
 @require_login
 def analyze_tasks():
     """Analyze task patterns and provide insights for logged-in user"""
     try:
-        tasks = load_tasks()
-        user_tasks = [task for task in tasks if task.get('user_id') == session['user_id']]
+        user_id = session['user_id']
         username = session.get('username', 'Ocean Explorer')
-        
-        total_tasks = len(user_tasks)
-        completed_tasks = len([t for t in user_tasks if t.get('completed', False)])
-        overdue_tasks = []
-        
-        now = datetime.now()
-        for task in user_tasks:
-            if task.get('due_date') and not task.get('completed', False):
-                try:
-                    due_date = datetime.fromisoformat(task['due_date'].replace('Z', '+00:00'))
-                    if due_date < now:
-                        overdue_tasks.append(task)
-                except:
-                    continue
-        
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        analysis = {
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'overdue_tasks': len(overdue_tasks),
-            'completion_rate': round(completion_rate, 1),
-            'insights': []
-        }
-        
-        # Generate personalized insights
-        if completion_rate >= 80:
-            analysis['insights'].append(f"🌟 Excellent Flow, {username}! You're riding the productivity wave like a pro surfer!")
-        elif completion_rate >= 60:
-            analysis['insights'].append(f"🌊 Steady Progress, {username}! Like consistent ocean waves, you're making good progress.")
-        elif completion_rate >= 40:
-            analysis['insights'].append(f"🐚 Building Momentum, {username}! Every shell starts rough before becoming smooth.")
-        else:
-            analysis['insights'].append(f"🏖️ Fresh Start Opportunity, {username}! Like a clean beach at dawn, you have beautiful potential!")
-        
-        if overdue_tasks:
-            analysis['insights'].append(f"🌅 Gentle Reminder for {username}: {len(overdue_tasks)} tasks are waiting like shells on the shore.")
-        
+        revision = store.revision(user_id)
+        overdue_count = overdue_scheduler.summary(user_id)['count']
+        key = ('analysis', user_id, revision, username, overdue_count)
+        analysis = dict(stats_cache.get_or_compute(key, lambda: build_task_analysis(user_id, username, overdue_count)))
+        analysis['summary'] = task_pattern_summary(user_id, revision)
         return jsonify(analysis)
-        
     except Exception as e:
         return jsonify({'error': 'Unable to analyze tasks'}), 500
 
+def build_task_analysis(user_id, username, overdue_count):
+    """Completion stats and insights behind /api/task-analysis"""
+    stats = cached_task_stats(user_id)
+    
+    total_tasks = stats['total_tasks']
+    completed_tasks = stats['completed_tasks']
+    
+    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    
+    analysis = {
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'overdue_tasks': overdue_count,
+        'completion_rate': round(completion_rate, 1),
+        'insights': []
+    }
+    
+    # Generate personalized insights
+    if completion_rate >= 80:
+        analysis['insights'].append(f"🌟 Excellent Flow, {username}! You're riding the productivity wave like a pro surfer!")
+    elif completion_rate >= 60:
+        analysis['insights'].append(f"🌊 Steady Progress, {username}! Like consistent ocean waves, you're making good progress.")
+    elif completion_rate >= 40:
+        analysis['insights'].append(f"🐚 Building Momentum, {username}! Every shell starts rough before becoming smooth.")
+    else:
+        analysis['insights'].append(f"🏖️ Fresh Start Opportunity, {username}! Like a clean beach at dawn, you have beautiful potential!")
+    
+    if overdue_count:
+        analysis['insights'].append(f"🌅 Gentle Reminder for {username}: {overdue_count} tasks are waiting like shells on the shore.")
+    
+    return analysis
+
+@app.route('/api/analytics')
+@require_login
+def productivity_analytics():
+    """Lead times, on-time ratio, weekly trends and completion heatmap for logged-in user"""
+    weeks = request.args.get('weeks', '12')
+    if not weeks.isdigit() or not 1 <= int(weeks) <= ANALYTICS_MAX_WEEKS:
+        return jsonify({'error': f'🐚 weeks must be between 1 and {ANALYTICS_MAX_WEEKS}'}), 400
+    
+    user_id = session['user_id']
+    revision = store.revision(user_id)
+    key = ('analytics', user_id, revision, int(weeks))
+    return jsonify(stats_cache.get_or_compute(key, lambda: user_analytics(user_id, revision, int(weeks))))
+
+def user_analytics(user_id, revision, weeks):
+    """analytics.analyze() over the user's tasks, reusing their loaded columns while the revision holds"""
+    columns = analytics_columns.get_or_compute((user_id, revision),
+                                               lambda: analytics.load(store.iter_user_tasks(user_id)))
+    return analytics.analyze(columns, now_timestamp(), weeks)
+
+def task_pattern_summary(user_id, revision):
+    """The MCP server's analyze_task_patterns write-up, or None until it has answered
+    
+    The server reads the user's tasks from the store itself; results are
+    kept per task revision.
+    """
+    return mcp_pool.call_tool('analyze_task_patterns', {'user_id': user_id},
+                              cache_key=('analyze_task_patterns', user_id, revision), stale_ok=True)
+
+@app.route('/api/metrics/cache')
+@require_local
+def cache_metrics():
+    """Hit/miss counters of the response caches, for monitoring"""
+    return jsonify({cache.name: cache.stats() for cache in (page_cache, stats_cache, analytics_columns)})
+
+@app.route('/api/metrics/events')
+@require_local
+def event_metrics():
+    """Open event streams and published events, for monitoring"""
+    return jsonify(dict(event_bus.stats(), max_streams=app.config['MAX_EVENT_STREAMS']))
+
+@app.route('/api/metrics/mcp')
+@require_local
+def mcp_metrics():
+    """MCP pool connections, timeouts, fallbacks and result cache, for monitoring"""
+    return jsonify(mcp_pool.stats())
+
+@app.route('/api/metrics/overdue')
+@require_local
+def overdue_metrics():
+    """Tasks scheduled and gone overdue, and catch-ups with the store, for monitoring"""
+    return jsonify(overdue_scheduler.stats())
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Upgrade stored data to the current schema version"""
+    create_app(migrate=False)
+    applied = run_migrations(store)
+    print(f"🌊 Data at schema version {applied[-1] if applied else store.get_schema_version()}")
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server; use `python server.py` in production
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
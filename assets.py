@@ -0,0 +1,195 @@
+"""
+Ocean Tasks static asset pipeline
+`python assets.py` minifies the CSS and JS under static/, names each file after
+its content hash and writes gzip (and brotli, when the brotli package is
+installed) variants next to it in static/dist/, along with a manifest.json
+mapping source names to built ones.
+
+Templates link assets through the manifest, and the app serves the smallest
+variant the browser accepts straight from disk with a year-long cache lifetime.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from storage import file_signature, atomic_write_bytes, atomic_write_json
+
+try:
+    import brotli
+except ImportError:  # optional, gzip variants are always built
+    brotli = None
+
+EXTENSIONS = ('.css', '.js')
+MANIFEST = 'manifest.json'
+
+# Preferred first; each is only used if the browser accepts it and the variant was built
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_STRINGS = re.compile(r'''"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/''', re.S)
+_CSS_TIGHT = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """CSS without comments and with whitespace collapsed; strings are left alone"""
+    strings = []
+
+    def hold(match):
+        if match.group().startswith('/*'):
+            return ' '
+        strings.append(match.group())
+        return f'\0{len(strings) - 1}\0'
+
+    text = re.sub(r'\s+', ' ', _CSS_STRINGS.sub(hold, text))
+    text = re.sub(r':\s+', ':', _CSS_TIGHT.sub(r'\1', text)).replace(';}', '}').strip()
+    return re.sub(r'\0(\d+)\0', lambda match: strings[int(match.group(1))], text)
+
+
+def minify_js(text):
+    """JS with indentation, blank lines and whole-line comments removed
+
+    Deliberately conservative: line breaks are kept so automatic semicolon
+    insertion behaves the same, and lines inside strings and template
+    literals are copied untouched.
+    """
+    lines = []
+    stack = []  # open quotes and template ${...} braces, innermost last
+    in_comment = False
+    for line in text.split('\n'):
+        in_code = not stack and not in_comment
+        stripped = line.lstrip() if in_code else line
+        if in_code and (not stripped or stripped.startswith('//')):
+            continue
+        i = 0
+        while i < len(line):
+            char = line[i]
+            top = stack[-1] if stack else None
+            if in_comment:
+                if line.startswith('*/', i):
+                    in_comment = False
+                    i += 1
+            elif top in ('"', "'", '`'):
+                if char == '\\':
+                    i += 1
+                elif char == top:
+                    stack.pop()
+                elif top == '`' and line.startswith('${', i):
+                    stack.append('{')
+                    i += 1
+            elif line.startswith('//', i):
+                break
+            elif line.startswith('/*', i):
+                in_comment = True
+                i += 1
+            elif char in ('"', "'", '`'):
+                stack.append(char)
+            elif char == '{' and top == '{':
+                stack.append('{')
+            elif char == '}' and top == '{':
+                stack.pop()
+            i += 1
+        if stack and stack[-1] in ('"', "'"):  # unterminated plain string: give up on this line
+            stack.pop()
+        lines.append(stripped if stack or in_comment else stripped.rstrip())
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprinted(name, data, length=12):
+    """'js/app.js' -> 'js/app.<content hash>.js'"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:length]}{ext}"
+
+
+def _write_variants(path, data):
+    """Write path plus compressed variants that actually come out smaller"""
+    atomic_write_bytes(path, data)
+    os.chmod(path, 0o644)
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            atomic_write_bytes(path + suffix, compressed)
+            os.chmod(path + suffix, 0o644)
+
+
+def build(static_dir='static', out_dir=None, clean=False):
+    """Build every CSS/JS asset under static_dir into out_dir, returning the manifest
+
+    Built names are content hashed, so earlier builds can stay in place for
+    pages that still reference them unless clean is set.
+    """
+    out_dir = out_dir or os.path.join(static_dir, 'dist')
+    if clean and os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != out_dir)
+        for filename in sorted(files):
+            ext = os.path.splitext(filename)[1]
+            if ext not in EXTENSIONS:
+                continue
+            source = os.path.join(root, filename)
+            name = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, encoding='utf-8') as f:
+                data = MINIFIERS[ext](f.read()).encode()
+            manifest[name] = fingerprinted(name, data)
+            target = os.path.join(out_dir, manifest[name])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write_variants(target, data)
+
+    # Written last, so the app never sees a manifest naming files that aren't there yet
+    atomic_write_json(os.path.join(out_dir, MANIFEST), manifest)
+    return manifest
+
+
+class AssetManifest:
+    """Source name -> built name lookups, reloaded when manifest.json changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._signature = None
+        self._entries = {}
+
+    def get(self, name):
+        signature = file_signature(self.path)
+        if signature != self._signature:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+            self._signature = signature
+        return self._entries.get(name)
+
+
+def pick_variant(path, accept_encodings):
+    """(file to send, Content-Encoding or None) for a built asset and a request's Accept-Encoding"""
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings.quality(encoding) > 0 and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def main():
+    """Command line entry point for building static assets"""
+    parser = argparse.ArgumentParser(description='Build minified, fingerprinted, precompressed static assets')
+    parser.add_argument('--static', default='static', help='source folder (default: static)')
+    parser.add_argument('--out', help='output folder (default: <static>/dist)')
+    parser.add_argument('--clean', action='store_true', help='remove earlier builds first')
+    args = parser.parse_args()
+
+    manifest = build(args.static, args.out, args.clean)
+    print(f"🌊 Built {len(manifest)} assets{'' if brotli else ' (install brotli for .br variants)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+Ocean Tasks async task API
+An asyncio-native (Quart) variant of the task API for deployments that hold
+many idle keep-alive connections or long polls: a connection costs a little
+memory on the event loop instead of a worker thread.
+
+It reuses app.py's validation, models and storage (create_app() opens the
+same store and session store), and every blocking store call runs on a
+bounded thread pool through AsyncStorage, so the loop never waits on disk.
+Writes are published on app.py's event bus like the Flask routes do, so
+event streams and the overdue scheduler in the same process hear about them.
+Pages and login stay on the Flask app; route /api/tasks and /api/calendar
+here. Both apps must see the same sessions, so use OCEAN_SESSIONS=sqlite
+when they run as separate processes.
+
+    hypercorn "async_app:create_async_app()" --bind 0.0.0.0:8001 --keep-alive 75
+"""
+
+import asyncio
+import functools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from quart import Quart, Response, redirect, request, session
+
+import app as ocean
+import task_model
+from sessions import ServerSessionInterface
+from task_index import due_timestamp, encode_cursor
+
+STORE_THREADS = 32
+LONG_POLL_MAX = 60
+LONG_POLL_INTERVAL = 0.5
+
+
+class AsyncStorage:
+    """Awaitable view of a Storage: every method call runs on a bounded thread pool"""
+
+    def __init__(self, store, max_workers=STORE_THREADS):
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='store')
+
+    async def run(self, function, *args, **kwargs):
+        """Run any blocking function (e.g. a helper from app.py that reads the store) on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(function, *args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class RevisionWatch:
+    """Wakes long polls once a user's task revision moves past what they have
+
+    One background task checks each waited-on user once per `interval`
+    however many of their requests are waiting, and writes made through this
+    app wake their waiters straight away.
+    """
+
+    def __init__(self, astore, interval=LONG_POLL_INTERVAL):
+        self.astore = astore
+        self.interval = interval
+        self._waiters = defaultdict(set)  # user_id -> {(since, future)}
+        self._task = None
+
+    async def wait(self, user_id, since, timeout):
+        """The user's revision once it is past `since`, or the current one after `timeout` seconds"""
+        revision = await self.astore.revision(user_id)
+        if revision > since or timeout <= 0:
+            return revision
+        future = asyncio.get_running_loop().create_future()
+        waiter = (since, future)
+        self._waiters[user_id].add(waiter)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return await self.astore.revision(user_id)
+        finally:
+            self._waiters[user_id].discard(waiter)
+            if not self._waiters[user_id]:
+                del self._waiters[user_id]
+
+    async def poke(self, user_id):
+        """Check one user now, e.g. right after a write"""
+        if user_id in self._waiters:
+            self._wake(user_id, await self.astore.revision(user_id))
+
+    def _wake(self, user_id, revision):
+        for since, future in list(self._waiters.get(user_id, ())):
+            if revision > since and not future.done():
+                future.set_result(revision)
+
+    async def _poll(self):
+        while self._waiters:
+            await asyncio.sleep(self.interval)
+            for user_id in list(self._waiters):
+                self._wake(user_id, await self.astore.revision(user_id))
+
+
+class AsyncSessionInterface(ServerSessionInterface):
+    """The Flask app's server-side sessions, with store access moved off the event loop"""
+
+    def __init__(self, store, astore):
+        super().__init__(store)
+        self.astore = astore
+
+    async def open_session(self, app, request):
+        return await self.astore.run(super().open_session, app, request)
+
+    async def save_session(self, app, session, response):
+        return await self.astore.run(super().save_session, app, session, response)
+
+
+app = Quart(__name__)
+
+# Set up by create_async_app()
+astore = None
+watch = None
+
+
+def create_async_app(storage=None, sessions=None, data_dir='data', store_threads=STORE_THREADS):
+    """Open the shared stores through app.create_app() and return the async app"""
+    global astore, watch
+    if astore is not None:
+        return app
+    flask_app = ocean.create_app(storage=storage, sessions=sessions, data_dir=data_dir)
+    app.secret_key = flask_app.secret_key
+    astore = AsyncStorage(ocean.store, store_threads)
+    watch = RevisionWatch(astore)
+    app.session_interface = AsyncSessionInterface(ocean.session_store, astore)
+    return app
+
+
+async def changed(user_id, publish, *args, **kwargs):
+    """After a write: publish it with one of app.py's publish_* helpers and wake the user's long polls"""
+    await astore.run(publish, user_id, *args, **kwargs)
+    await watch.poke(user_id)
+
+
+def json_response(data, status=200):
+    """JSON response encoded with the same codec as the Flask app"""
+    return Response(task_model.dumps(data), status=status, mimetype='application/json')
+
+
+def error(message, status=400):
+    return json_response({'error': message}, status)
+
+
+def require_login(view):
+    """Redirect to the login page unless there is a logged-in session"""
+    @functools.wraps(view)
+    async def decorated(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect('/login')
+        return await view(*args, **kwargs)
+    return decorated
+
+
+async def task_etag():
+    """(revision, strong ETag) for the current task read, taken before the data is read"""
+    revision = await astore.revision(session['user_id'])
+    return revision, ocean.revision_etag(session['user_id'], revision, request.full_path)
+
+
+def revalidated(response, revision, etag):
+    """Mark a task read as revalidate-on-use and tag it with the user's revision"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Revision'] = str(revision)
+    return response
+
+
+def not_modified(revision, etag):
+    """304 response when the client already holds this revision"""
+    if request.if_none_match.contains(etag):
+        return revalidated(Response('', status=304), revision, etag)
+    return None
+
+
+@app.route('/api/tasks', methods=['GET'])
+@require_login
+async def get_tasks():
+    """Get tasks for logged-in user, filtered, sorted and paginated like the Flask route"""
+    revision, etag = await task_etag()
+    cached = not_modified(revision, etag)
+    if cached:
+        return cached
+
+    try:
+        query = ocean.parse_task_query(request.args)
+        user_tasks, last_key = await astore.query_tasks(session['user_id'], **query)
+    except ValueError as e:
+        return error(f'🐚 {e}')
+
+    response = json_response(user_tasks)
+    if last_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(last_key)
+    return revalidated(response, revision, etag)
+
+
+@app.route('/api/tasks/changes', methods=['GET'])
+@require_login
+async def get_task_changes():
+    """Tasks created, updated or deleted since revision `since`
+
+    With `wait=<seconds>` (up to 60) the request is held open until something
+    changes, so clients can long-poll instead of polling on a timer.
+    """
+    since = request.args.get('since', '')
+    wait = request.args.get('wait', '0')
+    if not since.isdigit() or not wait.isdigit():
+        return error('🐚 since and wait must be whole numbers')
+
+    user_id = session['user_id']
+    await watch.wait(user_id, int(since), min(int(wait), LONG_POLL_MAX))
+    return json_response(await astore.run(ocean.change_feed, user_id, int(since)))
+
+
+@app.route('/api/tasks', methods=['POST'])
+@require_login
+async def create_task():
+    """Create a new task for logged-in user"""
+    try:
+        new_task = ocean.build_task(await request.get_json(silent=True), session['user_id'])
+    except ValueError as e:
+        return error(f'🐚 {e}')
+
+    await astore.add_task(new_task)
+    await changed(session['user_id'], ocean.publish_task_event, 'create', task=new_task)
+    return json_response(new_task, 201)
+
+
+@app.route('/api/tasks/<task_id>', methods=['PUT'])
+@require_login
+async def update_task(task_id):
+    """Update a task for logged-in user"""
+    user_id = session['user_id']
+    task = await astore.get_task(user_id, task_id)
+
+    if task:
+        try:
+            changes = ocean.task_changes(task, await request.get_json(silent=True))
+        except ValueError as e:
+            return error(f'🐚 {e}')
+        task = await astore.update_task(user_id, task_id, changes)
+        if task:
+            await changed(user_id, ocean.publish_task_event, 'update', task=task)
+            return json_response(task)
+
+    return error('Task not found or access denied', 404)
+
+
+@app.route('/api/tasks/<task_id>', methods=['DELETE'])
+@require_login
+async def delete_task(task_id):
+    """Delete a task for logged-in user"""
+    if await astore.delete_task(session['user_id'], task_id):
+        await changed(session['user_id'], ocean.publish_task_event, 'delete', task_id=task_id)
+        return json_response({'success': True})
+    return error('Task not found or access denied', 404)
+
+
+@app.route('/api/tasks/batch', methods=['POST'])
+@require_login
+async def batch_tasks():
+    """Apply a list of task creates, updates and deletes in one atomic write"""
+    user_id = session['user_id']
+    try:
+        planned = await astore.run(ocean.plan_batch, await request.get_json(silent=True), user_id)
+    except ValueError as e:
+        return error(f'🐚 {e}')
+
+    applied = await astore.apply_batch(user_id, planned)
+    await changed(user_id, ocean.publish_sync)
+    return json_response({'results': ocean.batch_results(planned, applied)})
+
+
+@app.route('/api/calendar/<year>/<month>')
+@require_login
+async def get_calendar_tasks(year, month):
+    """Get tasks for a specific month for logged-in user"""
+    try:
+        start = date(int(year), int(month), 1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    except (ValueError, OverflowError):
+        return error('📅 Please pick a real month')
+
+    revision, etag = await task_etag()
+    cached = not_modified(revision, etag)
+    if cached:
+        return cached
+
+    month_tasks = await astore.tasks_due_between(session['user_id'], due_timestamp(start.isoformat()),
+                                                 due_timestamp(end.isoformat()))
+    return revalidated(json_response(month_tasks), revision, etag)
+
+
+@app.route('/api/calendar')
+@require_login
+async def get_calendar_range():
+    """Get tasks due in [from, to) for logged-in user, e.g. for the weekly view"""
+    start = due_timestamp(request.args.get('from'))
+    end = due_timestamp(request.args.get('to'))
+    if start is None or end is None:
+        return error('📅 Please provide ISO dates for from and to')
+
+    revision, etag = await task_etag()
+    cached = not_modified(revision, etag)
+    if cached:
+        return cached
+
+    tasks = await astore.tasks_due_between(session['user_id'], start, end)
+    return revalidated(json_response(tasks), revision, etag)
+
+
+if __name__ == '__main__':
+    # Development server; use hypercorn (see above) in production
+    create_async_app().run(port=5001)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+First-load bytes and server CPU per page view for static assets
+Builds the assets into a temporary folder, then loads every asset each page
+links (through the Flask test client) three ways: raw from static/, raw plus
+on-the-fly gzip (what a compressing proxy or middleware would do per request),
+and the precompressed build via /assets/.
+
+    python benchmarks/asset_delivery.py --views 500
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import assets  # noqa: E402
+
+PAGES = ('index.html', 'login.html', 'signup.html')
+
+
+def page_assets(template):
+    with open(os.path.join(ROOT, 'templates', template)) as f:
+        return re.findall(r"asset_url\('([^']+)'\)", f.read())
+
+
+def load(client, urls, encoding, compress=False):
+    """Bytes on the wire for one page view's assets"""
+    total = 0
+    for url in urls:
+        response = client.get(url, headers={'Accept-Encoding': encoding})
+        body = response.get_data()
+        total += len(gzip.compress(body, 6) if compress else body)
+        response.close()
+    return total
+
+
+def cpu_per_view(client, urls, encoding, compress, views):
+    started = time.process_time()
+    for _ in range(views):
+        load(client, urls, encoding, compress)
+    return (time.process_time() - started) / views
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--views', type=int, default=500, help='page views timed per mode')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    os.chdir(work)  # the app creates its data/ folder in the working directory
+    import app as appmod
+
+    appmod.ASSET_DIR = os.path.join(work, 'dist')
+    manifest = assets.build(os.path.join(ROOT, 'static'), appmod.ASSET_DIR)
+    client = appmod.app.test_client()
+    encoding = 'gzip, br' if assets.brotli else 'gzip'
+
+    modes = [
+        ('raw', lambda names: [f'/static/{name}' for name in names], 'identity', False),
+        ('raw + gzip per request', lambda names: [f'/static/{name}' for name in names], 'identity', True),
+        (f'precompressed ({encoding})', lambda names: [f'/assets/{manifest[name]}' for name in names], encoding, False),
+    ]
+
+    print(f'{"page":<12} {"mode":<28} {"bytes":>8} {"CPU us/view":>12}')
+    for page in PAGES:
+        names = page_assets(page)
+        for label, urls_for, accept, compress in modes:
+            urls = urls_for(names)
+            size = load(client, urls, accept, compress)
+            cpu = cpu_per_view(client, urls, accept, compress, args.views)
+            print(f'{page:<12} {label:<28} {size:>8} {cpu * 1e6:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput of the Flask task API vs. the async (Quart) one
+while many other connections sit idle on keep-alive
+Starts server.py (one worker) and async_app.py under hypercorn (one worker)
+on the same scratch data folder with SQLite sessions, seeds a user through
+the Flask app, opens --idle keep-alive connections to each server that make
+one request and then stay open, and measures GET /api/tasks from --active
+connections on top. A thread-per-connection server runs out of threads;
+the event loop does not.
+
+Needs quart and hypercorn installed.
+
+    python benchmarks/async_api.py --idle 1000 --active 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import free_port, seed  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def fetch(reader, writer, path, cookie):
+    """One GET over an open keep-alive connection; returns the status code"""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def wait_for_port(port, deadline=60):
+    until = time.monotonic() + deadline
+    while time.monotonic() < until:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f'nothing listening on {port}')
+
+
+async def measure(port, cookie, args):
+    """(requests/sec, p50 ms, p99 ms) of the active connections while the idle ones stay open"""
+    idle = []
+    for _ in range(args.idle):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        idle.append(writer)
+        # Sent without waiting: a busy server only answers once it has a free thread
+        writer.write(f'GET /api/tasks?limit=1 HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n\r\n'.encode())
+
+    deadline = time.monotonic() + args.seconds
+    latencies = []
+
+    async def active():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(fetch(reader, writer, args.path, cookie),
+                                                deadline - time.monotonic() + 5)
+            except asyncio.TimeoutError:
+                break
+            assert status == 200, status
+            latencies.append(time.perf_counter() - started)
+        writer.close()
+
+    await asyncio.gather(*(active() for _ in range(args.active)))
+    for writer in idle:
+        writer.close()
+    if not latencies:
+        return 0, float('inf'), float('inf')
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+    return len(latencies) / args.seconds, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--idle', type=int, default=1000, help='idle keep-alive connections held open')
+    parser.add_argument('--active', type=int, default=32, help='connections issuing requests back to back')
+    parser.add_argument('--threads', type=int, default=32, help='request threads of the Flask worker')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--path', default='/api/tasks?limit=100')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix='ocean-async-')
+    data_dir = os.path.join(work, 'data')  # create_async_app()'s default, relative to its working directory
+    env = dict(os.environ, OCEAN_STORAGE='sqlite', OCEAN_SESSIONS='sqlite', PYTHONPATH=ROOT)
+    flask_port, async_port = free_port(), free_port()
+    servers = [
+        subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'), '--bind', f'127.0.0.1:{flask_port}',
+                          '--workers', '1', '--threads', str(args.threads), '--keep-alive', '75',
+                          '--data-dir', data_dir], cwd=work, env=env),
+        subprocess.Popen([sys.executable, '-m', 'hypercorn', '--bind', f'127.0.0.1:{async_port}',
+                          '--keep-alive', '75', '--backlog', '4096',
+                          'async_app:create_async_app()'], cwd=work, env=env),
+    ]
+    try:
+        asyncio.run(wait_for_port(flask_port))
+        asyncio.run(wait_for_port(async_port))
+        cookie = seed(flask_port, args.tasks)
+
+        print(f'{args.idle} idle + {args.active} active connections, GET {args.path}')
+        print(f'{"server":<28} {"req/s":>10} {"p50 ms":>10} {"p99 ms":>10}')
+        for label, port in ((f'Flask, {args.threads} threads', flask_port), ('Quart, event loop', async_port)):
+            rate, p50, p99 = asyncio.run(measure(port, cookie, args))
+            print(f'{label:<28} {rate:>10.0f} {p50:>10.1f} {p99:>10.1f}')
+    finally:
+        for server in servers:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+/api/check-username latency as the user directory grows
+Fills a scratch data directory with N users, then times availability checks
+through the Flask app. With the indexed user directory the per-request cost
+should stay flat from a hundred to a million users; only the first request
+after users.json changes pays for loading it.
+
+    python benchmarks/check_username.py --backend json --sizes 100,10000,1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def fill_users(store, backend, count):
+    """Replace every user with `count` generated ones"""
+    users = {
+        f'surfer_{i}': {'email': f'surfer_{i}@ocean.test', 'password': '', 'favorite_beach': 'sandy'}
+        for i in range(count)
+    }
+    if backend == 'json':
+        # Written directly: the app notices the new file and reloads it once
+        with open(store.users_file, 'w') as f:
+            json.dump(users, f)
+    else:
+        store.save_users(users)
+
+
+def time_checks(client, count, requests):
+    """Median and p99 latency in microseconds of availability checks"""
+    names = [f'surfer_{i * 7919 % count}' if i % 2 else f'free_{i}' for i in range(requests)]
+    client.post('/api/check-username', json={'username': 'warm_up'})
+    samples = []
+    for name in names:
+        started = time.perf_counter()
+        response = client.post('/api/check-username', json={'username': name})
+        samples.append((time.perf_counter() - started) * 1e6)
+        assert response.json['available'] == name.startswith('free_')
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--sizes', default='100,10000,100000,1000000')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    # app.py keeps its data in ./data, so run it from a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix='ocean-users-'))
+    import app as ocean_app  # noqa: E402
+
+    client = ocean_app.create_app(storage=args.backend).test_client()
+    print(f'{"users":>10} {"median µs":>10} {"p99 µs":>10}')
+    for count in (int(size) for size in args.sizes.split(',')):
+        fill_users(ocean_app.store, args.backend, count)
+        median, p99 = time_checks(client, count, args.requests)
+        print(f'{count:>10} {median:>10.0f} {p99:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Throughput of server.py as the worker count grows
+For each worker count, starts the production server on a scratch data
+folder, signs up a user with a few hundred tasks, then has client processes
+hammer GET /api/tasks over keep-alive connections and reports requests/sec
+and latency. Throughput should grow with workers up to the number of CPUs.
+
+    python benchmarks/load_test.py --workers 1,2,4 --clients 4 --connections 8 --seconds 10
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(conn, method, path, body=None, cookie=None):
+    headers = {'Content-Type': 'application/json'}
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response
+
+
+def start_server(workers, port, args):
+    data_dir = tempfile.mkdtemp(prefix='ocean-load-')
+    server = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'server.py'), '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--threads', str(args.threads), '--storage', args.storage, '--data-dir', data_dir,
+    ], cwd=data_dir)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('server did not start')
+
+
+def seed(port, tasks):
+    """Sign up and log in a user with `tasks` tasks; returns the session cookie"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    request(conn, 'POST', '/api/signup', {
+        'username': 'loadtest', 'email': 'load@test.sea', 'password': 'sandcastle', 'confirmPassword': 'sandcastle',
+        'favoriteBeach': 'sandy', 'terms': True,
+    })
+    response = request(conn, 'POST', '/api/login', {'username': 'loadtest', 'password': 'sandcastle'})
+    cookie = response.getheader('Set-Cookie').split(';')[0]
+    for start in range(0, tasks, 500):
+        operations = [{'op': 'create', 'task': {'title': f'Shell {i}', 'due_date': f'2026-07-{i % 28 + 1:02d}'}}
+                      for i in range(start, min(start + 500, tasks))]
+        assert request(conn, 'POST', '/api/tasks/batch', operations, cookie).status == 200
+    return cookie
+
+
+def client(port, cookie, path, connections, seconds, results):
+    """One client process: `connections` threads issuing requests back to back"""
+    deadline = time.monotonic() + seconds
+    latencies = []
+    lock = threading.Lock()
+
+    def run():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        mine = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            assert request(conn, 'GET', path, cookie=cookie).status == 200
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=run) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='worker counts to compare')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=4, help='client processes')
+    parser.add_argument('--connections', type=int, default=8, help='keep-alive connections per client process')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--storage', choices=['json', 'sqlite'], default='sqlite')
+    parser.add_argument('--path', default='/api/tasks?limit=100')
+    args = parser.parse_args()
+
+    print(f'{os.cpu_count()} CPUs, {args.clients} client processes x {args.connections} connections, GET {args.path}')
+    print(f'{"workers":>8} {"req/s":>10} {"p50 ms":>8} {"p99 ms":>8}')
+    for workers in (int(count) for count in args.workers.split(',')):
+        port = free_port()
+        server = start_server(workers, port, args)
+        try:
+            cookie = seed(port, args.tasks)
+            results = multiprocessing.Queue()
+            clients = [multiprocessing.Process(target=client, args=(port, cookie, args.path, args.connections,
+                                                                   args.seconds, results))
+                       for _ in range(args.clients)]
+            for process in clients:
+                process.start()
+            latencies = sorted(sample for _ in clients for sample in results.get())
+            for process in clients:
+                process.join()
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+        print(f'{workers:>8} {len(latencies) / args.seconds:>10.0f} {p50:>8.1f} {p99:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Latency /api/motivational-message adds by asking mcp_server.py
+Times the route through the Flask app with the MCP pool connected and with
+it turned off (local messages only), and times one MCP session spawned per
+call for comparison. The pool should add no more than a few milliseconds at
+p99; a process per call costs hundreds.
+
+    python benchmarks/mcp_pool.py --requests 2000 --spawned 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentiles(samples):
+    """(p50, p99) in milliseconds"""
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[max(int(len(samples) * 0.99) - 1, 0)] * 1000
+
+
+def time_route(client, requests):
+    contexts = ['daily_motivation', 'overdue_gentle', 'overdue_encouraging', 'completion_celebration']
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        response = client.post('/api/motivational-message',
+                               json={'context': contexts[i % 4], 'days_overdue': i % 5, 'task_count': 1})
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return percentiles(samples)
+
+
+def time_spawned(calls):
+    """A fresh mcp_server.py process and session for every call"""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=['mcp_server.py'], cwd=ROOT)
+
+    async def call():
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.call_tool('get_motivational_message', {'context': 'daily_motivation'})
+
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        asyncio.run(call())
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--spawned', type=int, default=20, help='calls made with a process each (0 to skip)')
+    args = parser.parse_args()
+
+    # app.py keeps its data in ./data, so run it from a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix='ocean-mcp-'))
+    import app as ocean_app  # noqa: E402
+    from mcp_client import McpPool  # noqa: E402
+
+    client = ocean_app.create_app().test_client()
+    client.post('/api/signup', json={
+        'username': 'mcpbench', 'email': 'mcp@bench.sea', 'password': 'sandcastle',
+        'confirmPassword': 'sandcastle', 'favoriteBeach': 'sandy', 'terms': True,
+    })
+    client.post('/api/login', json={'username': 'mcpbench', 'password': 'sandcastle'})
+
+    pool = ocean_app.mcp_pool
+    deadline = time.monotonic() + 30
+    while pool.enabled and pool.stats()['connected'] < pool.size and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    print(f'{"route":<28} {"p50 ms":>8} {"p99 ms":>8}')
+    ocean_app.mcp_pool = McpPool(None, enabled=False)
+    p50, p99 = time_route(client, args.requests)
+    print(f'{"local messages":<28} {p50:>8.2f} {p99:>8.2f}')
+    ocean_app.mcp_pool = pool
+    p50, p99 = time_route(client, args.requests)
+    print(f'{f"MCP pool ({pool.size} sessions)":<28} {p50:>8.2f} {p99:>8.2f}')
+    if args.spawned:
+        p50, p99 = time_spawned(args.spawned)
+        print(f'{"MCP process per call":<28} {p50:>8.2f} {p99:>8.2f}')
+    print(pool.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Overdue lookups: the overdue scheduler vs. querying the store per request
+Stores N tasks for one user (a third of them open, due dates spread around
+today), then times what /api/overdue and the motivational-message route did
+before (the first 100 open tasks due before now, by due date) against reading
+the scheduler's precomputed state. Also reports the one-off start-up load
+and the cost of following one task write (store.changes_since plus
+re-reading the task), which is all the scheduler does per mutation.
+
+    python benchmarks/overdue_scheduler.py --tasks 100000 --backend sqlite
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scheduler import OverdueScheduler  # noqa: E402
+from storage import create_storage  # noqa: E402
+from task_index import now_timestamp  # noqa: E402
+
+
+def make_tasks(count, seed=7):
+    """`count` tasks for user 'bench', due within 30 days either side of now"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    tasks = []
+    for i in range(count):
+        due = now + timedelta(seconds=rng.randrange(-30 * 86400, 30 * 86400))
+        tasks.append({
+            'id': str(i),
+            'user_id': 'bench',
+            'title': f'Shell {i}',
+            'description': '',
+            'due_date': rng.choice([due.date().isoformat(), due.strftime('%Y-%m-%dT%H:%M')]),
+            'completed': rng.random() < 2 / 3,
+            'created_at': (now - timedelta(days=31)).isoformat(),
+            'completed_at': None,
+        })
+    return tasks
+
+
+def per_request(function, requests):
+    """Mean milliseconds per call"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        function()
+    return (time.perf_counter() - started) * 1000 / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='sqlite')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--writes', type=int, default=200)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='ocean-overdue-')
+    store = create_storage(args.backend,
+                           tasks_file=os.path.join(data_dir, 'tasks.json'),
+                           users_file=os.path.join(data_dir, 'users.json'),
+                           db_file=os.path.join(data_dir, 'ocean.db'))
+    store.save_tasks(make_tasks(args.tasks))
+
+    started = time.perf_counter()
+    scheduler = OverdueScheduler(store).start()
+    start_ms = (time.perf_counter() - started) * 1000
+    scheduler.fire_due()
+
+    def query():
+        return store.query_tasks('bench', completed=False, due_before=now_timestamp(), sort='due_date', limit=100)[0]
+
+    assert [task['id'] for task in query()] == [task['task_id'] for task in scheduler.overdue_tasks('bench', limit=100)]
+    print(f'{args.tasks} tasks ({args.backend}), {scheduler.summary("bench")["count"]} overdue')
+    print(f'{"scheduler start-up load":<34} {start_ms:>10.1f} ms')
+    print(f'{"store query per request":<34} {per_request(query, args.requests):>10.3f} ms')
+    print(f'{"scheduler read per request":<34} '
+          f'{per_request(lambda: scheduler.overdue_tasks("bench", limit=100), args.requests):>10.3f} ms')
+    print(f'{"scheduler count per request":<34} '
+          f'{per_request(lambda: scheduler.summary("bench"), args.requests):>10.3f} ms')
+
+    rng = random.Random(11)
+    follow_ms = 0.0
+    for _ in range(args.writes):
+        due = datetime.now() + timedelta(days=rng.randrange(-5, 5))
+        store.update_task('bench', str(rng.randrange(args.tasks)), {'due_date': due.date().isoformat()})
+        started = time.perf_counter()
+        scheduler.sync_user('bench')
+        follow_ms += (time.perf_counter() - started) * 1000
+    print(f'{"following one write":<34} {follow_ms / args.writes:>10.3f} ms')
+    scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Login throughput per password hashing cost setting
+Runs concurrent password checks through the bounded KDF pool the way
+/api/login does (with the verify cache off, so every check pays for the KDF)
+and reports logins/sec and latency for each setting, to pick parameters
+against the login latency budget.
+
+    python benchmarks/password_hashing.py --clients 16 --seconds 3
+    python benchmarks/password_hashing.py --settings scrypt:16384:8:1,pbkdf2_sha256:600000
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords  # noqa: E402
+
+DEFAULT_SETTINGS = ','.join([
+    'sha256',
+    'scrypt:4096:8:1', 'scrypt:16384:8:1', 'scrypt:32768:8:1',
+    'pbkdf2_sha256:100000', 'pbkdf2_sha256:310000', 'pbkdf2_sha256:600000',
+])
+
+
+def stored_hash(setting, password):
+    """A stored hash for 'scheme:param:param' (or the legacy 'sha256')"""
+    scheme, *params = setting.split(':')
+    if scheme == 'sha256':
+        return hashlib.sha256(password.encode()).hexdigest()
+    return passwords.hash_password(password, scheme, [int(param) for param in params])
+
+
+def run(stored, password, clients, seconds):
+    """Sorted login latencies from `clients` threads logging in for `seconds`"""
+    deadline = time.perf_counter() + seconds
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        mine = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            assert passwords.verify_password_pooled(password, stored)
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=DEFAULT_SETTINGS)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent logins')
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    passwords._verified.size = 0
+    print(f'KDF pool: {passwords.KDF_WORKERS} workers, {args.clients} concurrent logins')
+    print(f'{"setting":<24} {"logins/s":>10} {"p50 ms":>8} {"p99 ms":>8}')
+    for setting in args.settings.split(','):
+        stored = stored_hash(setting, 'sandcastle')
+        latencies = run(stored, 'sandcastle', args.clients, args.seconds)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+        print(f'{setting:<24} {len(latencies) / args.seconds:>10.0f} {p50:>8.1f} {p99:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
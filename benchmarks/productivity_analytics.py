@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Productivity analytics: NumPy columns vs. plain Python loops
+Generates N tasks spread over the last few months (most completed, some
+overdue, a mix of date-only and timed due dates), then times
+analytics.analyze_python() against loading analytics.TaskColumns once and
+running analytics.analyze() on them, and checks both give the same report.
+
+    python benchmarks/productivity_analytics.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+from task_index import now_timestamp  # noqa: E402
+
+
+def make_tasks(count, seed=7):
+    """`count` task dicts created over the last 120 days"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    tasks = []
+    for i in range(count):
+        created = now - timedelta(seconds=rng.randrange(120 * 86400))
+        due = created + timedelta(seconds=rng.randrange(-86400, 21 * 86400))
+        completed = rng.random() < 0.7
+        task = {
+            'id': str(i),
+            'user_id': 'bench',
+            'title': f'Shell {i}',
+            'description': '',
+            'due_date': rng.choice([None, due.date().isoformat(), due.strftime('%Y-%m-%dT%H:%M')]),
+            'completed': completed,
+            'created_at': created.isoformat(),
+            'completed_at': None,
+        }
+        if completed:
+            task['completed_at'] = min(created + timedelta(seconds=rng.expovariate(1 / (3 * 86400))), now).isoformat()
+        tasks.append(task)
+    return tasks
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--weeks', type=int, default=12)
+    args = parser.parse_args()
+    if analytics.np is None:
+        sys.exit('NumPy is not installed; only the pure-Python path is available')
+
+    now = now_timestamp()
+    print(f'{"tasks":>10} {"python ms":>10} {"load ms":>10} {"numpy ms":>10} {"speed-up":>9}')
+    for count in (int(size) for size in args.sizes.split(',')):
+        tasks = make_tasks(count)
+        expected, python_ms = timed(analytics.analyze_python, tasks, now, args.weeks)
+        columns, load_ms = timed(analytics.TaskColumns, tasks)
+        report, numpy_ms = timed(analytics.analyze, columns, now, args.weeks)
+        assert report == expected, 'NumPy and Python reports differ'
+        print(f'{count:>10} {python_ms:>10.0f} {load_ms:>10.0f} {numpy_ms:>10.0f} {python_ms / numpy_ms:>8.0f}x')
+
+
+if __name__ == '__main__':
+    main()
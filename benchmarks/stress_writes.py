@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Concurrent write stress test for the Ocean Tasks storage backends
+Several worker processes (each with a few threads) create, update and delete
+tasks and sign up users against one shared data directory, the way
+multi-worker gunicorn would. At the end every write must be accounted for.
+
+    python benchmarks/stress_writes.py --backend json --processes 8 --threads 4 --ops 100
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import create_storage  # noqa: E402
+
+
+def open_store(backend, data_dir):
+    return create_storage(
+        backend,
+        tasks_file=os.path.join(data_dir, 'tasks.json'),
+        users_file=os.path.join(data_dir, 'users.json'),
+        db_file=os.path.join(data_dir, 'ocean.db'),
+    )
+
+
+def worker(backend, data_dir, worker_id, threads, ops):
+    """Run `threads` threads doing `ops` create/patch/delete rounds each"""
+    store = open_store(backend, data_dir)
+
+    def run(thread_id):
+        user_id = f'user-{worker_id}-{thread_id}'
+        store.add_user(user_id, {'email': f'{user_id}@ocean.test', 'password': '', 'last_login': None})
+        for i in range(ops):
+            task_id = str(uuid.uuid4())
+            store.add_task({'id': task_id, 'user_id': user_id, 'title': f'task {i}', 'completed': False})
+            store.update_task(user_id, task_id, {'completed': True})
+            if i % 5 == 0:
+                store.delete_task(user_id, task_id)
+            store.update_user(user_id, {'last_login': f'round {i}'})
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=50)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='ocean-stress-')
+    started = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker, args=(args.backend, data_dir, p, args.threads, args.ops))
+        for p in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0, f'worker exited with {process.exitcode}'
+    elapsed = time.perf_counter() - started
+
+    store = open_store(args.backend, data_dir)
+    tasks = store.load_tasks()
+    users = store.load_users()
+    writers = args.processes * args.threads
+    kept_per_writer = args.ops - len(range(0, args.ops, 5))
+    mutations = writers * (args.ops * 2 + len(range(0, args.ops, 5)) + args.ops + 1)
+
+    assert len(users) == writers, f'lost users: expected {writers}, found {len(users)}'
+    assert len(tasks) == writers * kept_per_writer, \
+        f'lost tasks: expected {writers * kept_per_writer}, found {len(tasks)}'
+    assert all(task['completed'] for task in tasks), 'lost updates: some tasks were never completed'
+    assert all(user['last_login'] == f'round {args.ops - 1}' for user in users.values()), 'lost user updates'
+
+    print(f'{args.backend}: {mutations} mutations from {writers} writers in {elapsed:.2f}s '
+          f'({mutations / elapsed:.0f} ops/s), nothing lost')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Resident memory of tasks held as plain dicts vs. slotted task_model.Task
+Builds N tasks the way json.load hands them over (every value a fresh
+object), then measures the memory each representation keeps alive with
+tracemalloc, plus a full TaskIndex over the same tasks.
+
+    python benchmarks/task_memory.py --count 1000000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_index import TaskIndex  # noqa: E402
+from task_model import Task  # noqa: E402
+
+
+def task_documents(count, users=1000):
+    """`count` task documents shaped like data/tasks.json, round-tripped through JSON"""
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    documents = []
+    for i in range(count):
+        created = start + timedelta(seconds=i * 37, microseconds=i % 1000 * 997 + 1)
+        documents.append({
+            'id': str(uuid.UUID(int=i)),
+            'user_id': f'surfer_{i % users}',
+            'title': f'Collect shell number {i}',
+            'description': '' if i % 3 else 'Low tide on the north beach',
+            'due_date': (created.date() + timedelta(days=i % 30)).isoformat() if i % 4 else None,
+            'completed': i % 5 == 0,
+            'created_at': created.isoformat(),
+            'completed_at': (created + timedelta(hours=2)).isoformat() if i % 5 == 0 else None,
+        })
+    return json.loads(json.dumps(documents))
+
+
+def measure(build):
+    """Bytes still allocated after build() returns, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    encoded = json.dumps(task_documents(args.count))
+    dict_bytes, dicts = measure(lambda: json.loads(encoded))
+    task_bytes, tasks = measure(lambda: [Task.from_dict(document) for document in json.loads(encoded)])
+    assert all(task.to_dict() == document for task, document in zip(tasks, dicts))
+    del dicts, tasks
+    index_bytes, _ = measure(lambda: TaskIndex(json.loads(encoded)))
+
+    print(f'{args.count} resident tasks')
+    print(f'{"dicts":<16} {dict_bytes / 2**20:>8.1f} MiB {dict_bytes / args.count:>6.0f} B/task')
+    print(f'{"slotted Task":<16} {task_bytes / 2**20:>8.1f} MiB {task_bytes / args.count:>6.0f} B/task '
+          f'({1 - task_bytes / dict_bytes:.0%} smaller)')
+    print(f'{"TaskIndex":<16} {index_bytes / 2**20:>8.1f} MiB {index_bytes / args.count:>6.0f} B/task')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Ocean Tasks response caching
+Small in-process LRU caches with a TTL for rendered pages and computed stats.
+Per-user entries are keyed by the user's task revision, so any task change
+makes the old entry unreachable without explicit invalidation; the TTL bounds
+how stale time-dependent values (like overdue counts) can get.
+
+Also fingerprints static assets by content, so their URLs change whenever
+the file does and browsers can cache them forever.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU-ordered dict of at most `max_entries`, each living `ttl` seconds
+
+    Counts hits, misses and evictions for monitoring.
+    """
+
+    def __init__(self, name, max_entries=1024, ttl=60):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """The cached value for key, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class AssetVersions:
+    """Short content hashes of files under a static folder, rehashed only when a file changes"""
+
+    def __init__(self, folder, length=12):
+        self.folder = folder
+        self.length = length
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def version(self, filename):
+        """Content hash of static/<filename>, or None if it doesn't exist"""
+        path = os.path.join(self.folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            known = self._hashes.get(filename)
+        if known is not None and known[0] == signature:
+            return known[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:self.length]
+        with self._lock:
+            self._hashes[filename] = (signature, digest)
+        return digest
@@ -0,0 +1,138 @@
+"""
+Ocean Tasks event bus
+In-process publish/subscribe for task changes, feeding the /api/events
+server-sent event streams. Each user's recent events stay in a bounded
+replay buffer, so a stream that reconnects can pick up after its
+Last-Event-ID.
+
+Event ids are the user's task revisions. The bus only hears about writes
+made in this process; streams notice anything else by watching the store's
+revision and ask the client to fetch /api/tasks/changes. Listeners hear
+every user's events, e.g. the overdue scheduler following task writes.
+"""
+
+import queue
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+from task_index import CHANGE_LOG_SIZE
+
+MAX_USERS = 10000
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """One stream's view of a user's events: what to replay, then a queue of live ones"""
+
+    def __init__(self, bus, user_id, replay):
+        self.bus = bus
+        self.user_id = user_id
+        self.replay = replay
+        self.queue = queue.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Too far behind to catch up event by event; have the client fetch the changes instead
+            try:
+                while True:
+                    self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait({'type': 'sync', 'data': {'revision': event.get('id')}})
+            except queue.Full:  # another publisher got there first
+                pass
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventBus:
+    """Per-user fan-out of events to open streams, plus a replay buffer of the last `replay_size`"""
+
+    def __init__(self, replay_size=CHANGE_LOG_SIZE, max_users=MAX_USERS):
+        self.replay_size = replay_size
+        self.max_users = max_users
+        self.published = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        self._replay = OrderedDict()  # user_id -> deque of events, least recently active user first
+        self._subscribers = defaultdict(set)
+        self._listeners = []
+
+    def publish(self, user_id, event):
+        """Send an event to the user's streams
+
+        event is {'type': ..., 'data': {...}}; events with an 'id' (the
+        revision they produced) are also kept for replay.
+        """
+        with self._lock:
+            self.published += 1
+            if event.get('id') is not None:
+                buffer = self._replay.get(user_id)
+                if buffer is None:
+                    buffer = self._replay[user_id] = deque(maxlen=self.replay_size)
+                    if len(self._replay) > self.max_users:
+                        self._replay.popitem(last=False)
+                self._replay.move_to_end(user_id)
+                buffer.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        for listener in self._listeners:
+            listener(user_id, event)
+
+    def listen(self, callback):
+        """Call callback(user_id, event) for every event published, in the publishing thread"""
+        self._listeners.append(callback)
+
+    def subscribe(self, user_id, after):
+        """A Subscription to the user's events, replaying buffered ones with an id above `after`"""
+        with self._lock:
+            replay = [event for event in self._replay.get(user_id, ()) if event['id'] > after]
+            subscription = Subscription(self, user_id, replay)
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def close(self):
+        """End every open stream, e.g. before the process stops"""
+        with self._lock:
+            self.closed = True
+            subscribers = [subscription for subscribers in self._subscribers.values() for subscription in subscribers]
+        for subscription in subscribers:
+            subscription.put({'type': 'close'})
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'streams': sum(len(subscribers) for subscribers in self._subscribers.values()),
+                'users_buffered': len(self._replay),
+                'published': self.published,
+            }
@@ -0,0 +1,280 @@
+"""
+Ocean Tasks MCP client pool
+Keeps a few long-lived MCP sessions to mcp_server.py (as configured in
+mcp.json) open on a background asyncio loop, so request threads can call its
+tools without spawning a process per request.
+
+Every call has a deadline. A call that misses it keeps running in the
+background and refreshes an LRU cache of recent tool results, which is what
+the caller gets instead, or the caller's own fallback when nothing is cached.
+A circuit breaker stops sending calls for a while after repeated failures:
+errors, or calls still unanswered after CALL_TIMEOUT. A call that merely
+misses the caller's deadline is not a failure.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import sys
+import threading
+import time
+
+from cache import TTLCache
+
+try:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+except ImportError:  # optional, every call falls back without it
+    ClientSession = None
+
+RESULT_CACHE_SIZE = 512
+RESULT_CACHE_TTL = 3600
+CALL_TIMEOUT = 5
+RECONNECT_DELAY = 2
+
+
+class McpToolError(Exception):
+    """The MCP server answered a tool call with an error"""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` failures in a row; then lets one trial call through every `cooldown` seconds"""
+
+    def __init__(self, threshold=5, cooldown=10):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.failures >= self.threshold
+
+    def allow(self):
+        with self._lock:
+            if not self.is_open:
+                return True
+            if not self._trial and time.monotonic() >= self._opened_at + self.cooldown:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.is_open:
+                self._opened_at = time.monotonic()
+
+
+def load_server_config(path='mcp.json', name='ocean-tasks'):
+    """One server's entry from an mcp.json file"""
+    with open(path) as f:
+        return json.load(f)['mcpServers'][name]
+
+
+class McpPool:
+    """`size` persistent MCP sessions to one server, shared by every request thread"""
+
+    def __init__(self, command, args=(), env=None, cwd=None, size=2, deadline=0.01, enabled=True):
+        self.command = command
+        self.args = list(args)
+        self.env = env
+        self.cwd = cwd
+        self.size = size
+        self.deadline = deadline
+        self.enabled = enabled and size > 0 and ClientSession is not None
+        self.breaker = CircuitBreaker()
+        self.results = TTLCache('mcp_results', max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self._connected = 0
+        self._loop = None
+        self._idle = None
+        self._closing = None
+        self._connections = []
+        self._refreshing = set()
+        self._lock = threading.Lock()  # counters and _refreshing, shared by request threads
+
+    @classmethod
+    def from_config(cls, path='mcp.json', name='ocean-tasks', size=2, deadline=0.01, env=None):
+        """Pool for a server configured in mcp.json; relative paths are resolved from the file's folder
+
+        env adds to the configured environment, e.g. where the app keeps its data.
+        """
+        config = load_server_config(path, name)
+        command = config['command']
+        if command in ('python', 'python3'):
+            command = sys.executable  # same interpreter and packages as the app
+        env = dict(os.environ, **config.get('env', {}), **(env or {}))
+        return cls(command, config.get('args', []), env, os.path.dirname(os.path.abspath(path)),
+                   size, deadline, enabled=not config.get('disabled', False))
+
+    def start(self):
+        """Start the background loop and connect the sessions (no-op when disabled)"""
+        if not self.enabled or self._loop is not None:
+            return self
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._idle = asyncio.Queue()
+            self._closing = asyncio.Event()
+            self._connections = [self._loop.create_task(self._connection()) for _ in range(self.size)]
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name='mcp-pool', daemon=True).start()
+        ready.wait()
+        return self
+
+    def close(self, timeout=2):
+        """Disconnect the sessions, which stops the server processes"""
+        if self._loop is None:
+            return
+
+        async def disconnect():
+            self._closing.set()
+            await asyncio.wait(self._connections, timeout=timeout)
+
+        try:
+            asyncio.run_coroutine_threadsafe(disconnect(), self._loop).result(timeout + 1)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    async def _connection(self):
+        """Keep one session connected, reconnecting after the server goes away"""
+        params = StdioServerParameters(command=self.command, args=self.args, env=self.env, cwd=self.cwd)
+        while not self._closing.is_set():
+            broken = asyncio.Event()
+            try:
+                async with stdio_client(params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        self._connected += 1
+                        try:
+                            self._idle.put_nowait((session, broken))
+                            waits = [asyncio.ensure_future(self._closing.wait()), asyncio.ensure_future(broken.wait())]
+                            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+                            for waiting in waits:
+                                waiting.cancel()
+                        finally:
+                            self._connected -= 1
+            except Exception as e:
+                print(f"MCP connection failed: {e}", file=sys.stderr)
+            if not self._closing.is_set():
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _call(self, name, arguments):
+        session, broken = await self._idle.get()
+        if broken.is_set():  # its connection is already being replaced
+            return await self._call(name, arguments)
+        try:
+            result = await asyncio.wait_for(session.call_tool(name, arguments), CALL_TIMEOUT)
+        except Exception:
+            broken.set()
+            raise
+        self._idle.put_nowait((session, broken))
+        text = '\n'.join(item.text for item in result.content if getattr(item, 'text', None))
+        if result.isError:
+            raise McpToolError(text)
+        return text
+
+    def _available(self):
+        return self.enabled and self._connected and self.breaker.allow()
+
+    def _submit(self, key, name, arguments):
+        """Start a call on the loop; whoever is still waiting, its outcome is settled when it finishes"""
+        with self._lock:
+            self.calls += 1
+        future = asyncio.run_coroutine_threadsafe(self._call(name, arguments), self._loop)
+        future.add_done_callback(lambda done: self._settle(key, name, done))
+        return future
+
+    def _settle(self, key, name, future):
+        """Cache a finished call's result and tell the breaker how it went"""
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                self.errors += 1
+            self.breaker.failure()
+            if not future.cancelled():
+                print(f"MCP call {name} failed: {future.exception()!r}", file=sys.stderr)
+            return
+        self.results.set(key, future.result())
+        self.breaker.success()
+
+    def _refresh(self, key, name, arguments):
+        """Fetch a newer result in the background, one call per key at a time"""
+        if not self._available():
+            return
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def finished(done):
+            with self._lock:
+                self._refreshing.discard(key)
+
+        self._submit(key, name, arguments).add_done_callback(finished)
+
+    def _fallback(self, key, fallback):
+        with self._lock:
+            self.fallbacks += 1
+        cached = self.results.get(key)
+        if cached is not None:
+            return cached
+        return fallback() if callable(fallback) else fallback
+
+    def call_tool(self, name, arguments, fallback=None, cache_key=None, stale_ok=False):
+        """A tool's text result within the deadline, else the last cached result or fallback
+
+        Results are cached under cache_key (by default the tool name and
+        arguments); pass a cheaper key when the arguments are large. With
+        stale_ok a cached result is returned straight away and replaced in
+        the background, so only the first call for a key waits on the server.
+        """
+        key = cache_key if cache_key is not None else (name, json.dumps(arguments, sort_keys=True))
+        if stale_ok:
+            cached = self.results.get(key)
+            if cached is not None:
+                self._refresh(key, name, arguments)
+                return cached
+        if not self._available():
+            return self._fallback(key, fallback)
+
+        future = self._submit(key, name, arguments)
+        try:
+            return future.result(self.deadline)
+        except concurrent.futures.TimeoutError:
+            # Still running: it counts as a failure only if the server never answers (CALL_TIMEOUT)
+            with self._lock:
+                self.timeouts += 1
+            return self._fallback(key, fallback)
+        except Exception:  # counted by _settle()
+            return self._fallback(key, fallback)
+
+    def stats(self):
+        with self._lock:
+            counters = {'calls': self.calls, 'timeouts': self.timeouts, 'errors': self.errors,
+                        'fallbacks': self.fallbacks}
+        return {
+            'enabled': self.enabled,
+            'connected': self._connected,
+            **counters,
+            'circuit_open': self.breaker.is_open,
+            'results': self.results.stats(),
+        }
@@ -6,13 +6,18 @@ Provides motivational messages and task insights for the beach-themed task manag
 
 import json
 import asyncio
-from datetime import datetime, timedelta
+import functools
+import os
 from typing import Any, Dict, List
 import random
 
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
+import analytics
+from storage import create_storage
+from task_model import due_timestamp
+from task_index import now_timestamp
 from mcp.types import (
     Resource,
     Tool,
@@ -73,6 +78,69 @@ TASK_INSIGHTS = {
 
 server = Server("ocean-tasks-mcp")
 
+# The app's task store, for tools that take a user_id. create_app() passes its
+# data folder and backend when it launches this server.
+DATA_DIR = os.environ.get("OCEAN_DATA_DIR", "data")
+STORAGE_BACKEND = os.environ.get("OCEAN_STORAGE", "json")
+ANALYSIS_CHUNK_SIZE = 500
+task_store = None
+
+def get_task_store():
+    """Open the task store on first use"""
+    global task_store
+    if task_store is None:
+        task_store = create_storage(STORAGE_BACKEND,
+                                    tasks_file=os.path.join(DATA_DIR, "tasks.json"),
+                                    users_file=os.path.join(DATA_DIR, "users.json"),
+                                    db_file=os.path.join(DATA_DIR, "ocean.db"))
+    return task_store
+
+def count_task_patterns(tasks, now):
+    """(total, completed, overdue) counts in a single pass over any iterable of tasks"""
+    total_tasks = completed_tasks = overdue_tasks = 0
+    for task in tasks:
+        total_tasks += 1
+        if task.get("completed", False):
+            completed_tasks += 1
+        elif task.get("due_date"):
+            due = due_timestamp(task["due_date"])
+            if due is not None and due < now:
+                overdue_tasks += 1
+    return total_tasks, completed_tasks, overdue_tasks
+
+def stored_analytics(user_id, weeks):
+    """analytics.analyze() over a user's stored tasks"""
+    tasks = get_task_store().iter_user_tasks(user_id, chunk_size=ANALYSIS_CHUNK_SIZE)
+    return analytics.analyze(analytics.load(tasks), now_timestamp(), weeks)
+
+def format_analytics(report):
+    """A short beach-themed read-out of an analytics report"""
+    lead_time = report["lead_time_hours"]
+    on_time = report["on_time"]
+    text = f"🌊 **Ocean Tasks Analytics** 🌊\n\n"
+    if lead_time["count"]:
+        text += f"⏱️ **Lead time:** half of {lead_time['count']} completed tasks took under {lead_time['p50']}h, 90% under {lead_time['p90']}h\n"
+    if on_time["ratio"] is not None:
+        text += f"🎯 **On time:** {on_time['ratio'] * 100:.1f}% of {on_time['due_and_completed']} tasks with a due date 🐚\n"
+    weeks = report["weekly"]
+    text += f"📈 **Last {len(weeks)} weeks:** {sum(week['created'] for week in weeks)} created, {sum(week['completed'] for week in weeks)} completed ⭐\n"
+    heatmap = report["heatmap"]["completed"]
+    busiest = max(((count, day, hour) for day, row in enumerate(heatmap) for hour, count in enumerate(row)), default=(0, 0, 0))
+    if busiest[0]:
+        text += f"🏖️ **High tide:** you finish the most tasks on {analytics.WEEKDAYS[busiest[1]]} around {busiest[2]:02d}:00"
+    return text
+
+def count_stored_patterns(user_id, due_after=None, due_before=None):
+    """count_task_patterns() over a user's stored tasks, read a page at a time"""
+    filters = {name: value for name, value in (("due_after", due_after), ("due_before", due_before)) if value is not None}
+    tasks = get_task_store().iter_user_tasks(user_id, chunk_size=ANALYSIS_CHUNK_SIZE, **filters)
+    return count_task_patterns(tasks, now_timestamp())
+
+async def in_thread(function, *args, **kwargs):
+    """Run a blocking store read off the event loop (asyncio.to_thread needs Python 3.9)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(function, *args, **kwargs))
+
 @server.list_tools()
 async def handle_list_tools() -> List[Tool]:
     """List available MCP tools for Ocean Tasks"""
@@ -123,10 +191,22 @@ async def handle_list_tools() -> List[Tool]:
         ),
         Tool(
             name="analyze_task_patterns",
-            description="Analyze task completion patterns and provide insights",
+            description="Analyze task completion patterns and provide insights, for a stored user's tasks or a tasks array",
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "user_id": {
+                        "type": "string",
+                        "description": "Analyze this user's stored tasks instead of a tasks array"
+                    },
+                    "due_after": {
+                        "type": "string",
+                        "description": "With user_id, only tasks due after this ISO date (optional)"
+                    },
+                    "due_before": {
+                        "type": "string",
+                        "description": "With user_id, only tasks due before this ISO date (optional)"
+                    },
                     "tasks": {
                         "type": "array",
                         "items": {
@@ -140,10 +220,29 @@ async def handle_list_tools() -> List[Tool]:
                                 "completed_at": {"type": "string"}
                             }
                         },
-                        "description": "Array of task objects to analyze"
+                        "description": "Array of task objects to analyze (for tasks that aren't stored)"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_productivity_analytics",
+            description="Lead times, on-time ratio, weekly trends and busiest hours from a user's completion history",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "user_id": {
+                        "type": "string",
+                        "description": "Whose stored tasks to analyze"
+                    },
+                    "weeks": {
+                        "type": "integer",
+                        "description": "Weeks of trend to include (optional, default 12)",
+                        "minimum": 1,
+                        "maximum": 104
                     }
                 },
-                "required": ["tasks"]
+                "required": ["user_id"]
             }
         ),
         Tool(
@@ -219,19 +318,19 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
             return [TextContent(type="text", text="🌊 Like the endless ocean, there are infinite ways to improve productivity!")]
     
     elif name == "analyze_task_patterns":
-        tasks = arguments["tasks"]
-        
-        # Analyze completion patterns
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t.get("completed", False)])
-        overdue_tasks = []
-        
-        now = datetime.now()
-        for task in tasks:
-            if task.get("due_date") and not task.get("completed", False):
-                due_date = datetime.fromisoformat(task["due_date"].replace('Z', '+00:00'))
-                if due_date < now:
-                    overdue_tasks.append(task)
+        if "user_id" in arguments:
+            window = {}
+            for bound in ("due_after", "due_before"):
+                if arguments.get(bound):
+                    window[bound] = due_timestamp(arguments[bound])
+                    if window[bound] is None:
+                        return [TextContent(type="text", text=f"🐚 {bound} must be an ISO date")]
+            counts = await in_thread(count_stored_patterns, arguments["user_id"], **window)
+        elif "tasks" in arguments:
+            counts = count_task_patterns(arguments["tasks"], now_timestamp())
+        else:
+            return [TextContent(type="text", text="🐚 Pass a user_id or a tasks array to analyze")]
+        total_tasks, completed_tasks, overdue_count = counts
         
         completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         
@@ -241,7 +340,7 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         analysis += f"• Total tasks: {total_tasks} 🐚\n"
         analysis += f"• Completed: {completed_tasks} ⭐\n"
         analysis += f"• Completion rate: {completion_rate:.1f}% 🌊\n"
-        analysis += f"• Overdue tasks: {len(overdue_tasks)} 🏖️\n\n"
+        analysis += f"• Overdue tasks: {overdue_count} 🏖️\n\n"
         
         # Provide personalized insights
         if completion_rate >= 80:
@@ -253,11 +352,20 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         else:
             analysis += "🏖️ **Fresh Start Opportunity!** Like a clean beach at dawn, you have a beautiful opportunity to create new patterns. Start with one small task - your first seashell!"
         
-        if overdue_tasks:
-            analysis += f"\n\n🌅 **Gentle Reminder:** {len(overdue_tasks)} tasks are waiting like shells on the shore. Consider tackling the smallest one first to build momentum!"
+        if overdue_count:
+            analysis += f"\n\n🌅 **Gentle Reminder:** {overdue_count} tasks are waiting like shells on the shore. Consider tackling the smallest one first to build momentum!"
         
         return [TextContent(type="text", text=analysis)]
     
+    elif name == "get_productivity_analytics":
+        weeks = arguments.get("weeks", 12)
+        if not isinstance(weeks, int) or not 1 <= weeks <= 104:
+            return [TextContent(type="text", text="🐚 weeks must be between 1 and 104")]
+        report = await in_thread(stored_analytics, arguments["user_id"], weeks)
+        # The read-out for people, then the full figures for programs
+        return [TextContent(type="text", text=format_analytics(report)),
+                TextContent(type="text", text=json.dumps(report))]
+    
     elif name == "generate_custom_message":
         tone = arguments["tone"]
         task_title = arguments.get("task_title", "")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Ocean Tasks data migrations
+Each migration upgrades stored data by one schema version. They run once, in
+order, at startup (or from the command line) and the store remembers the
+version it reached, so request handlers never have to check for legacy data.
+"""
+
+import argparse
+
+MIGRATIONS = []
+
+
+def migration(version):
+    """Register a function as the migration to `version`"""
+    def register(func):
+        if MIGRATIONS and version != MIGRATIONS[-1][0] + 1:
+            raise ValueError(f"Migration {func.__name__} must be version {MIGRATIONS[-1][0] + 1}, not {version}")
+        MIGRATIONS.append((version, func))
+        return func
+    return register
+
+
+@migration(1)
+def assign_task_owners(store):
+    """Give tasks saved before multi-user support an owner"""
+    tasks = store.load_tasks()
+    orphans = [task for task in tasks if 'user_id' not in task]
+    if not orphans:
+        return
+
+    # Assign old tasks to the first registered user, or a default fallback
+    users = store.load_users()
+    owner = next(iter(users), 'admin')
+    for task in orphans:
+        task['user_id'] = owner
+
+    store.save_tasks(tasks)
+    print(f"Migrated {len(orphans)} tasks")
+
+
+@migration(2)
+def move_last_logins(store):
+    """Move last_login out of the user records into the login store"""
+    users = store.load_users()
+    logins = {username: record['last_login'] for username, record in users.items() if record.get('last_login')}
+    if not any('last_login' in record for record in users.values()):
+        return
+
+    for username, when in logins.items():
+        store.record_login(username, when)
+    store.flush_logins()
+    for record in users.values():
+        record.pop('last_login', None)
+    store.save_users(users)
+    print(f"Moved {len(logins)} last login times")
+
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(store):
+    """Bring the store up to SCHEMA_VERSION, returning the versions applied"""
+    applied = []
+    with store.migration_lock():
+        current = store.get_schema_version()
+        for version, func in MIGRATIONS:
+            if version > current:
+                func(store)
+                store.set_schema_version(version)
+                applied.append(version)
+    return applied
+
+
+def main():
+    """Command line entry point: python migrations.py [--backend sqlite]"""
+    from storage import BACKENDS, create_storage
+
+    parser = argparse.ArgumentParser(description='Run Ocean Tasks data migrations')
+    parser.add_argument('--backend', choices=BACKENDS, default='json')
+    parser.add_argument('--db', default='data/ocean.db')
+    args = parser.parse_args()
+
+    store = create_storage(args.backend, db_file=args.db)
+    applied = run_migrations(store)
+    if applied:
+        print(f"🌊 Migrated data to schema version {applied[-1]}")
+    else:
+        print(f"🌊 Data already at schema version {SCHEMA_VERSION}")
+
+
+if __name__ == '__main__':
+    main()
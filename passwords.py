@@ -0,0 +1,157 @@
+"""
+Ocean Tasks password hashing
+Salted scrypt (or PBKDF2) hashes with tunable cost. Hashes are stored as
+'scheme$params$salt$hash' so cost settings can change without breaking
+existing accounts, and legacy unsalted SHA-256 hex digests still verify so
+they can be upgraded on the next login.
+
+Key derivation runs on a small bounded thread pool: a burst of logins queues
+for a KDF slot instead of oversubscribing every CPU, and recently verified
+credentials skip the KDF altogether for a short while.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Cost settings, overridable from the environment
+SCHEME = os.environ.get('OCEAN_PASSWORD_SCHEME', 'scrypt')
+SCRYPT_N = int(os.environ.get('OCEAN_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('OCEAN_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('OCEAN_SCRYPT_P', 1))
+PBKDF2_ITERATIONS = int(os.environ.get('OCEAN_PBKDF2_ITERATIONS', 600_000))
+KDF_WORKERS = int(os.environ.get('OCEAN_KDF_WORKERS', os.cpu_count() or 2))
+VERIFY_CACHE_SIZE = int(os.environ.get('OCEAN_VERIFY_CACHE_SIZE', 1024))
+VERIFY_CACHE_TTL = 300
+
+SCHEMES = ('scrypt', 'pbkdf2_sha256')
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode()
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+
+def current_params(scheme=None):
+    """Cost parameters new hashes are made with"""
+    scheme = scheme or SCHEME
+    if scheme == 'scrypt':
+        return scheme, (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    if scheme == 'pbkdf2_sha256':
+        return scheme, (PBKDF2_ITERATIONS,)
+    raise ValueError(f"Unknown password scheme: {scheme} (expected one of {', '.join(SCHEMES)})")
+
+
+def hash_password(password, scheme=None, params=None):
+    """Salted hash of password, as 'scheme$params$salt$hash'"""
+    scheme, default_params = current_params(scheme)
+    params = tuple(params or default_params)
+    salt = secrets.token_bytes(16)
+    derived = _scrypt(password, salt, *params) if scheme == 'scrypt' else _pbkdf2(password, salt, *params)
+    return '$'.join([scheme, ','.join(map(str, params)), _b64(salt), _b64(derived)])
+
+
+def _parse(stored):
+    """(scheme, params, salt, hash) of a stored hash; legacy SHA-256 digests have scheme 'sha256'"""
+    if '$' not in stored:
+        return 'sha256', (), b'', stored
+    scheme, params, salt, derived = stored.split('$')
+    return scheme, tuple(int(value) for value in params.split(',')), base64.b64decode(salt), derived
+
+
+def verify_password(password, stored):
+    """Check password against a stored hash of any supported scheme"""
+    try:
+        scheme, params, salt, expected = _parse(stored)
+    except ValueError:
+        return False
+    if scheme == 'sha256':
+        derived = hashlib.sha256(password.encode()).hexdigest()
+    elif scheme == 'scrypt':
+        derived = _b64(_scrypt(password, salt, *params))
+    elif scheme == 'pbkdf2_sha256':
+        derived = _b64(_pbkdf2(password, salt, *params))
+    else:
+        return False
+    return hmac.compare_digest(derived, expected)
+
+
+def needs_rehash(stored):
+    """Whether a stored hash uses a legacy scheme or different cost settings"""
+    try:
+        scheme, params, _, _ = _parse(stored)
+    except ValueError:
+        return True
+    return (scheme, params) != current_params()
+
+
+class VerifyCache:
+    """Recently verified (stored hash, password) pairs, keyed by a per-process HMAC
+
+    Only successful checks are remembered and only for `ttl` seconds, so a
+    user logging in again soon, or several tabs at once, costs one KDF run.
+    """
+
+    def __init__(self, size=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _token(self, password, stored):
+        return hmac.new(self._key, f'{stored}\0{password}'.encode(), hashlib.sha256).digest()
+
+    def hit(self, password, stored):
+        if not self.size:
+            return False
+        token = self._token(password, stored)
+        with self._lock:
+            expires = self._entries.get(token)
+            if expires is None or expires < time.monotonic():
+                self._entries.pop(token, None)
+                return False
+            self._entries.move_to_end(token)
+            return True
+
+    def add(self, password, stored):
+        if not self.size:
+            return
+        token = self._token(password, stored)
+        with self._lock:
+            self._entries[token] = time.monotonic() + self.ttl
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix='kdf')
+_verified = VerifyCache()
+
+
+def hash_password_pooled(password):
+    """hash_password() on the KDF pool"""
+    return _pool.submit(hash_password, password).result()
+
+
+def verify_password_pooled(password, stored):
+    """verify_password() on the KDF pool, answering repeat checks from the verify cache"""
+    if _verified.hit(password, stored):
+        return True
+    if not _pool.submit(verify_password, password, stored).result():
+        return False
+    _verified.add(password, stored)
+    return True
@@ -0,0 +1,273 @@
+"""
+Ocean Tasks overdue scheduler
+Keeps the due time of every open task in a heap and marks each one overdue
+as its due time passes, so requests read precomputed overdue state instead
+of reparsing due dates. Each task turns overdue exactly once per due date;
+moving the due date later or completing the task takes it off the list.
+
+Tasks are loaded once at start-up. After that the scheduler follows each
+user's revision log (store.changes_since) and re-reads only the tasks that
+changed: in the background as soon as the event bus reports a write in this
+process, and on the next read for writes made by other processes. Every
+transition is recorded in the store (store.record_overdue) and published on
+the bus, one `overdue` event per user and tick, for the user's open streams.
+
+The heap lives in each process, but a transition is recorded only once per
+task and due time: the process that records it announces it, while other
+workers and later starts (restarts, SIGHUP reloads) take it over silently.
+"""
+
+import bisect
+import heapq
+import sys
+import threading
+from datetime import datetime
+
+from task_index import now_timestamp
+from task_model import due_timestamp
+
+DAY = 86400
+MAX_SLEEP = 60
+
+
+class OverdueScheduler:
+    """Open tasks' due times in a heap, and per user the tasks that have gone overdue"""
+
+    def __init__(self, store, bus=None, clock=now_timestamp):
+        self.store = store
+        self.bus = bus
+        self.clock = clock
+        self.fired = 0
+        self.syncs = 0
+        self.rescans = 0
+        self.already_recorded = 0
+        self._lock = threading.Condition()
+        self._sync_lock = threading.Lock()  # one catch-up at a time, so task reads land in order
+        self._heap = []  # (due, user_id, task_id); entries whose task has moved on are skipped when popped
+        self._open = {}  # (user_id, task_id) -> (due, title, due_date) of open tasks with a due date
+        self._overdue = {}  # user_id -> {task_id: record}
+        self._order = {}  # user_id -> sorted [(due, task_id)] of their overdue tasks
+        self._revisions = {}  # user_id -> revision the state reflects
+        self._pending = set()  # users with writes to catch up on
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Load every open task with a due date, then keep watch from a background thread
+
+        Tasks whose transition is recorded already are overdue from the start
+        and won't be announced again.
+        """
+        if self._thread is not None:
+            return self
+        users = set()
+        recorded = self.store.load_overdue()
+        with self._lock:
+            for task in self.store.open_due_tasks():
+                user_id = task.get('user_id')
+                if user_id is None:  # not migrated yet, so nobody's to remind
+                    continue
+                users.add(user_id)
+                self._apply(user_id, task['id'], task)
+                mark = recorded.get((user_id, task['id']))
+                if mark is not None and mark[0] == self._open[(user_id, task['id'])][0]:
+                    self._mark(user_id, task['id'], mark[1])
+                    self.already_recorded += 1
+        for user_id in users:
+            self._revisions[user_id] = self.store.revision(user_id)
+        if self.bus is not None:
+            self.bus.listen(self._heard)
+        self._thread = threading.Thread(target=self._run, name='overdue-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2):
+        with self._lock:
+            self._stopping = True
+            self._lock.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _heard(self, user_id, event):
+        """Event bus listener: queue a catch-up for the user after any task write"""
+        if event['type'] in ('task', 'sync'):
+            with self._lock:
+                self._pending.add(user_id)
+                self._lock.notify()
+
+    def _apply(self, user_id, task_id, task):
+        """Bring one task's entry up to date; task is its current dict, or None once deleted"""
+        key = (user_id, task_id)
+        due = None
+        if task is not None and not task.get('completed', False):
+            due = due_timestamp(task.get('due_date'))
+        previous = self._open.get(key)
+        if due is None:
+            self._open.pop(key, None)
+            self._forget(user_id, task_id)
+            return
+        self._open[key] = (due, task.get('title', ''), task['due_date'])
+        if previous is not None and previous[0] == due:
+            record = self._overdue.get(user_id, {}).get(task_id)
+            if record is not None:
+                record['title'] = task.get('title', '')
+            return
+        # New or rescheduled: it goes overdue (again) when the new due time passes
+        self._forget(user_id, task_id)
+        heapq.heappush(self._heap, (due, user_id, task_id))
+        if self._heap[0][0] == due:
+            self._lock.notify()
+
+    def _forget(self, user_id, task_id):
+        overdue = self._overdue.get(user_id)
+        if overdue is None or task_id not in overdue:
+            return
+        order = self._order[user_id]
+        del order[bisect.bisect_left(order, (overdue.pop(task_id)['_due'], task_id))]
+        if not overdue:
+            del self._overdue[user_id]
+            del self._order[user_id]
+
+    def _mark(self, user_id, task_id, overdue_at):
+        """Put an open task on its user's overdue list and return the record"""
+        due, title, due_date = self._open[(user_id, task_id)]
+        record = {'task_id': task_id, 'title': title, 'due_date': due_date, 'overdue_at': overdue_at, '_due': due}
+        self._overdue.setdefault(user_id, {})[task_id] = record
+        bisect.insort(self._order.setdefault(user_id, []), (due, task_id))
+        return record
+
+    def _compact(self):
+        """Rebuild the heap once skipped entries outnumber live ones"""
+        if len(self._heap) > 2 * len(self._open) + 1000:
+            self._heap = [(entry[0], user_id, task_id) for (user_id, task_id), entry in self._open.items()
+                          if task_id not in self._overdue.get(user_id, ())]
+            heapq.heapify(self._heap)
+
+    def sync_user(self, user_id):
+        """Catch up with the user's writes since the revision last seen, re-reading only changed tasks"""
+        with self._sync_lock:
+            seen = self._revisions.get(user_id, 0)
+            revision, changes = self.store.changes_since(user_id, seen)
+            if revision == seen:
+                return
+            self.syncs += 1
+            if changes is None:
+                # Too far behind for the change log: reload the user's open tasks
+                self.rescans += 1
+                tasks = {task['id']: task for task in self.store.iter_user_tasks(user_id, completed=False)}
+                with self._lock:
+                    stale = [task_id for (owner, task_id) in self._open if owner == user_id and task_id not in tasks]
+                    for task_id in stale:
+                        self._apply(user_id, task_id, None)
+                    for task_id, task in tasks.items():
+                        self._apply(user_id, task_id, task)
+            else:
+                task_ids = {task_id for _, _, task_id in changes}
+                tasks = {task_id: self.store.get_task(user_id, task_id) for task_id in task_ids}
+                with self._lock:
+                    for task_id, task in tasks.items():
+                        self._apply(user_id, task_id, task)
+            with self._lock:
+                self._revisions[user_id] = revision
+                self._compact()
+
+    def fire_due(self):
+        """Mark every task whose due time has passed as overdue, record and announce the new ones"""
+        now = self.clock()
+        due_now = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < now:
+                due, user_id, task_id = heapq.heappop(self._heap)
+                entry = self._open.get((user_id, task_id))
+                if entry is None or entry[0] != due or task_id in self._overdue.get(user_id, ()):
+                    continue
+                overdue_at = datetime.now().isoformat(timespec='seconds')
+                due_now.append((user_id, due, self._mark(user_id, task_id, overdue_at)))
+        if not due_now:
+            return 0
+        try:
+            earlier = self.store.record_overdue([(user_id, record['task_id'], due, record['overdue_at'])
+                                                 for user_id, due, record in due_now])
+        except Exception as e:
+            # Announce them anyway; they may be announced again after a restart
+            print(f"Overdue scheduler could not record transitions: {e}", file=sys.stderr)
+            earlier = {}
+        fired = []
+        with self._lock:
+            for user_id, _, record in due_now:
+                overdue_at = earlier.get((user_id, record['task_id']))
+                if overdue_at is not None:
+                    record['overdue_at'] = overdue_at  # another process recorded and announced it
+                    self.already_recorded += 1
+                else:
+                    fired.append((user_id, {field: value for field, value in record.items() if field != '_due'}))
+            self.fired += len(fired)
+        if self.bus is not None:
+            # One event per user and tick: date-only tasks all go overdue at the same midnight
+            by_user = {}
+            for user_id, record in fired:
+                by_user.setdefault(user_id, []).append(record)
+            for user_id, records in by_user.items():
+                self.bus.publish(user_id, {'type': 'overdue', 'data': {'tasks': records}})
+        return len(fired)
+
+    def _sleep_time(self):
+        if not self._heap:
+            return MAX_SLEEP
+        # Due times are whole seconds and a task is overdue once now is past them
+        return min(max(self._heap[0][0] + 1 - self.clock(), 0), MAX_SLEEP)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                if not self._pending:
+                    self._lock.wait(self._sleep_time())
+                users, self._pending = self._pending, set()
+            for user_id in users:
+                try:
+                    self.sync_user(user_id)
+                except Exception as e:
+                    print(f"Overdue scheduler could not catch up on {user_id}: {e}", file=sys.stderr)
+            self.fire_due()
+
+    def _catch_up(self, user_id):
+        if self.store.revision(user_id) != self._revisions.get(user_id, 0):
+            self.sync_user(user_id)  # written by another process
+        self.fire_due()
+
+    def overdue_tasks(self, user_id, limit=None):
+        """The user's overdue tasks, most overdue first, each with its whole days overdue"""
+        self._catch_up(user_id)
+        now = self.clock()
+        with self._lock:
+            overdue = self._overdue.get(user_id, {})
+            tasks = []
+            for due, task_id in self._order.get(user_id, ())[:limit]:
+                task = {field: value for field, value in overdue[task_id].items() if field != '_due'}
+                task['days_overdue'] = (now - due) // DAY
+                tasks.append(task)
+            return tasks
+
+    def summary(self, user_id):
+        """How many of the user's tasks are overdue, and by how many days at most"""
+        self._catch_up(user_id)
+        with self._lock:
+            order = self._order.get(user_id)
+            if not order:
+                return {'count': 0, 'days_overdue': 0}
+            return {'count': len(order), 'days_overdue': (self.clock() - order[0][0]) // DAY}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'scheduled': len(self._open),
+                'heap': len(self._heap),
+                'overdue': sum(len(tasks) for tasks in self._overdue.values()),
+                'users': len(self._revisions),
+                'fired': self.fired,
+                'already_recorded': self.already_recorded,
+                'syncs': self.syncs,
+                'rescans': self.rescans,
+            }
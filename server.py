@@ -0,0 +1,312 @@
+"""
+Ocean Tasks production server
+A pre-forking HTTP server: the master process binds the listening socket and
+forks worker processes, each of which imports the app, calls create_app() and
+serves connections from a fixed-size thread pool with HTTP/1.1 keep-alive.
+
+    python server.py --workers 4 --threads 8 --bind 0.0.0.0:8000 --storage sqlite
+
+SIGHUP reloads gracefully: a new set of workers (running freshly imported
+code) is started, and once they are accepting connections the old ones stop
+taking new requests, finish what they are serving and exit. SIGTERM or Ctrl-C
+stops the server the same way. Needs fork(), so POSIX only.
+"""
+
+import argparse
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import LimitedStream
+
+READY_TIMEOUT = 60
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    """HTTP/1.1 handler; idle connections are closed after `timeout` seconds
+
+    Werkzeug closes every connection after the response, draining whatever
+    the socket still holds, since it can't tell where a request body the app
+    left unread ends. Here a body with a Content-Length is read through a
+    LimitedStream, so that draining stops at the end of the body and the
+    connection can carry the next request. Chunked request bodies still
+    close it.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    timeout = 5
+    access_log = False
+    _body = None
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate small writes; don't let Nagle hold the body back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def run_wsgi(self):
+        length = self.headers.get('Content-Length') or '0'
+        if 'Transfer-Encoding' in self.headers or not length.isdigit():
+            return super().run_wsgi()
+        rfile = self.rfile
+        self._body = self.rfile = LimitedStream(rfile, int(length))
+        try:
+            super().run_wsgi()
+        finally:
+            self.rfile = rfile
+        try:
+            self._body.exhaust()
+        except (OSError, ClientDisconnected):
+            self.close_connection = True
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'connection' and value == 'close' and self._body is not None:
+            return  # the body is accounted for, so the connection can stay open
+        super().send_header(keyword, value)
+
+    def handle_one_request(self):
+        self._body = None
+        super().handle_one_request()
+        if self.server.stopping:
+            self.close_connection = True
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server that handles connections on a fixed-size thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, fd, threads=8, handler=KeepAliveHandler):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self.stopping = False
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def stop(self):
+        """Stop accepting connections and let in-flight requests finish"""
+        self.stopping = True
+        self.shutdown()
+        self.pool.shutdown(wait=True)
+
+
+def parse_bind(value):
+    host, _, port = value.rpartition(':')
+    return host.strip('[]') or '127.0.0.1', int(port)
+
+
+def exit_reason(status):
+    """How a child ended, from an os.waitpid() status (os.waitstatus_to_exitcode needs Python 3.9)"""
+    if os.WIFSIGNALED(status):
+        return f"signal {os.WTERMSIG(status)}"
+    return f"status {os.WEXITSTATUS(status)}"
+
+
+def serve_worker(listener, args, ready_fd):
+    """Worker process body: build the app, report ready, serve until SIGTERM"""
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    from app import create_app, event_bus
+
+    app = create_app(storage=args.storage, sessions=args.sessions, data_dir=args.data_dir)
+    if 'OCEAN_MAX_EVENT_STREAMS' not in os.environ:
+        # Each /api/events stream holds a thread; keep half of them for ordinary requests
+        app.config['MAX_EVENT_STREAMS'] = max(args.threads // 2, 1)
+    KeepAliveHandler.timeout = args.keep_alive
+    KeepAliveHandler.access_log = args.access_log
+    host, port = parse_bind(args.bind)
+    server = PooledWSGIServer(host, port, app, fd=listener.fileno(), threads=args.threads)
+    listener.close()
+
+    def stop(signum, frame):
+        event_bus.close()  # open event streams end now; browsers reconnect to the new workers
+        # shutdown() waits for serve_forever() to return, so it can't run on the serving thread
+        threading.Thread(target=server.stop, name='stop').start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    os.write(ready_fd, b'1')
+    os.close(ready_fd)
+    server.serve_forever()
+    server.pool.shutdown(wait=True)
+
+
+class Master:
+    """Keeps `workers` worker processes serving one listening socket"""
+
+    def __init__(self, args):
+        self.args = args
+        self.listener = None
+        self.workers = set()
+        self.reload_requested = False
+        self.stop_requested = False
+
+    def log(self, message):
+        print(f"🌊 [master {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+    def spawn(self, count):
+        """Fork `count` workers and wait until each is serving; returns the pids that made it"""
+        started = {}
+        for _ in range(count):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                code = 0
+                try:
+                    serve_worker(self.listener, self.args, write_fd)
+                except BaseException:
+                    traceback.print_exc()
+                    code = 1
+                sys.exit(code)  # runs atexit hooks, e.g. the login buffer flush
+            os.close(write_fd)
+            started[pid] = read_fd
+
+        ready = set()
+        deadline = time.monotonic() + READY_TIMEOUT
+        while started and time.monotonic() < deadline:
+            readable, _, _ = select.select(list(started.values()), [], [], max(deadline - time.monotonic(), 0))
+            for pid, read_fd in list(started.items()):
+                if read_fd in readable:
+                    if os.read(read_fd, 1):
+                        ready.add(pid)
+                    os.close(read_fd)
+                    del started[pid]
+        for pid, read_fd in started.items():  # never reported ready
+            os.close(read_fd)
+            self.kill(pid)
+        failed = count - len(ready)
+        if failed:
+            self.log(f"{failed} of {count} workers failed to start")
+        return ready
+
+    def kill(self, pid, sig=signal.SIGKILL):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """Collect exited workers"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stop_requested:
+                    self.log(f"worker {pid} exited with {exit_reason(status)}")
+
+    def stop(self, pids):
+        """SIGTERM pids, then SIGKILL whatever hasn't exited after the graceful timeout"""
+        for pid in pids:
+            self.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pending.discard(pid)
+            time.sleep(0.05)
+        for pid in pending:
+            self.kill(pid)
+            os.waitpid(pid, 0)
+
+    def reload(self):
+        """Replace every worker without dropping connections"""
+        self.reload_requested = False
+        self.log("reloading")
+        fresh = self.spawn(self.args.workers)
+        if len(fresh) < self.args.workers:
+            self.log("reload aborted, keeping the current workers")
+            self.stop(fresh)
+            return
+        old, self.workers = self.workers, fresh
+        self.stop(old)
+        self.log(f"reloaded, workers {sorted(fresh)}")
+
+    def run(self):
+        host, port = parse_bind(self.args.bind)
+        self.listener = socket.create_server((host, port), backlog=self.args.backlog)
+
+        signal.signal(signal.SIGHUP, lambda signum, frame: setattr(self, 'reload_requested', True))
+        signal.signal(signal.SIGTERM, lambda signum, frame: setattr(self, 'stop_requested', True))
+        signal.signal(signal.SIGINT, lambda signum, frame: setattr(self, 'stop_requested', True))
+
+        self.workers = self.spawn(self.args.workers)
+        if not self.workers:
+            self.log("no worker could start")
+            return 1
+        self.log(f"serving http://{host}:{port} with {len(self.workers)} workers x {self.args.threads} threads")
+
+        while not self.stop_requested:
+            time.sleep(0.2)
+            if self.reload_requested:
+                self.reload()
+            self.reap()
+            missing = self.args.workers - len(self.workers)
+            if missing > 0 and not self.stop_requested:
+                fresh = self.spawn(missing)
+                self.workers |= fresh
+                if len(fresh) < missing:
+                    time.sleep(1)  # don't spin on a worker that can't start
+
+        self.log("shutting down")
+        self.stop(self.workers)
+        self.listener.close()
+        return 0
+
+
+def main():
+    """Command line entry point for serving the app in production"""
+    parser = argparse.ArgumentParser(description='Ocean Tasks production server')
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port to listen on (default: 127.0.0.1:8000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='worker processes (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker (default: 8)')
+    parser.add_argument('--keep-alive', type=float, default=5, help='seconds an idle connection stays open (default: 5)')
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help='seconds a stopping worker gets to finish its requests (default: 30)')
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--storage', choices=['json', 'sqlite'], help='storage backend (default: $OCEAN_STORAGE or json)')
+    parser.add_argument('--sessions', choices=['memory', 'sqlite'],
+                        help='session store (default: $OCEAN_SESSIONS, else sqlite with several workers)')
+    parser.add_argument('--data-dir', default='data', help='where data files live (default: data)')
+    parser.add_argument('--access-log', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    args.sessions = args.sessions or os.environ.get('OCEAN_SESSIONS') or ('sqlite' if args.workers > 1 else 'memory')
+    if args.sessions == 'memory' and args.workers > 1:
+        print("🐚 In-memory sessions aren't shared between workers; use --sessions sqlite", file=sys.stderr)
+    sys.exit(Master(args).run())
+
+
+if __name__ == '__main__':
+    main()
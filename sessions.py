@@ -0,0 +1,235 @@
+"""
+Ocean Tasks server-side sessions
+Session data lives on the server, keyed by an opaque random id, so the cookie
+stays tiny and a session can be revoked. Each session has its own lifetime
+("remember me" lasts longer) that slides while it is in use: once more than
+half of it has passed, the next request saves the session again. A background
+sweeper drops expired ones.
+
+Two stores: an in-memory LRU capped at a fixed number of sessions (single
+process), and a SQLite one shared by every worker process.
+"""
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+DEFAULT_LIFETIME = timedelta(days=1)
+REMEMBER_LIFETIME = timedelta(days=30)
+
+
+class SessionStore:
+    """Where session data lives between requests"""
+
+    def get(self, session_id):
+        """(data, lifetime in seconds, expiry as a time.time() value) of a live session, or None"""
+        raise NotImplementedError
+
+    def save(self, session_id, data, lifetime):
+        """Store session data, expiring `lifetime` seconds from now"""
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def sweep(self):
+        """Drop expired sessions, returning how many were removed"""
+        raise NotImplementedError
+
+    def start_sweeper(self, interval=60):
+        """Sweep expired sessions every `interval` seconds in a background thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep()
+                except sqlite3.Error as e:
+                    print(f"Session sweep failed: {e}")
+
+        thread = threading.Thread(target=run, name='session-sweeper', daemon=True)
+        thread.start()
+        return thread
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in an LRU-ordered dict holding at most `max_sessions`
+
+    Lookups are O(1); when the cap is reached the least recently used
+    session is evicted, so memory stays bounded however many clients log in.
+    """
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires, lifetime, data = entry
+            if expires < time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return dict(data), lifetime, expires
+
+    def save(self, session_id, data, lifetime):
+        with self._lock:
+            self._sessions[session_id] = (time.time() + lifetime, lifetime, dict(data))
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (expires, _, _) in self._sessions.items() if expires < now]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a WAL-mode SQLite table shared by all worker processes"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        expires REAL NOT NULL,
+        lifetime REAL NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires);
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        """Per-thread connection, created on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self.conn.execute(
+            'SELECT data, lifetime, expires FROM sessions WHERE id = ? AND expires >= ?', (session_id, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1], row[2]) if row else None
+
+    def save(self, session_id, data, lifetime):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO sessions (id, user_id, expires, lifetime, data) VALUES (?, ?, ?, ?, ?)',
+            (session_id, data.get('user_id'), time.time() + lifetime, lifetime, json.dumps(data))
+        )
+
+    def delete(self, session_id):
+        self.conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    def sweep(self):
+        return self.conn.execute('DELETE FROM sessions WHERE expires < ?', (time.time(),)).rowcount
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict remembering its id, lifetime, expiry and whether it changed"""
+
+    def __init__(self, data=None, session_id=None, lifetime=None, expires=None):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(data, on_update)
+        self.session_id = session_id
+        self.lifetime = lifetime or DEFAULT_LIFETIME.total_seconds()
+        self.expires = expires
+        self.replaced_id = None
+        self.modified = False
+
+    def needs_refresh(self):
+        """True once more than half of the lifetime has passed since the session was last saved"""
+        return self.expires is not None and self.expires - time.time() < self.lifetime / 2
+
+    def set_lifetime(self, lifetime):
+        """Keep this session for `lifetime` (a timedelta)"""
+        self.lifetime = lifetime.total_seconds()
+        self.modified = True
+
+    def regenerate(self):
+        """Move the data to a fresh id, e.g. on login, so an old id can't be reused"""
+        if self.session_id:
+            self.replaced_id = self.session_id
+        self.session_id = None
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface that keeps only an opaque id in the cookie"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        session_id = request.cookies.get(self.get_cookie_name(app))
+        if session_id:
+            found = self.store.get(session_id)
+            if found is not None:
+                data, lifetime, expires = found
+                return ServerSession(data, session_id, lifetime, expires)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.replaced_id:
+            self.store.delete(session.replaced_id)
+
+        if not session:
+            if session.session_id and session.modified:
+                self.store.delete(session.session_id)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified and not session.needs_refresh():
+            return
+
+        if session.session_id is None:
+            session.session_id = secrets.token_urlsafe(32)
+        self.store.save(session.session_id, dict(session), session.lifetime)
+
+        expires = None
+        if session.permanent:
+            expires = datetime.now(timezone.utc) + timedelta(seconds=session.lifetime)
+        response.set_cookie(
+            name, session.session_id, expires=expires, domain=domain, path=path,
+            httponly=self.get_cookie_httponly(app), secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app) or 'Lax',
+        )
+
+
+def create_session_store(backend='memory', db_file='data/sessions.db', max_sessions=10000):
+    """Build the configured session store"""
+    if backend == 'memory':
+        return MemorySessionStore(max_sessions)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(db_file)
+    raise ValueError(f"Unknown session backend: {backend} (expected memory or sqlite)")
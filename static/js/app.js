@@ -2,6 +2,13 @@
 class OceanTasks {
     constructor() {
         this.tasks = [];
+        this.calendarTasks = [];
+        this.calendarView = 'month';
+        this.nextCursor = null;
+        this.loadingMore = false;
+        this.pageSize = 50;
+        this.revision = null;
+        this.syncInterval = 30000;
         this.currentDate = new Date();
         this.username = this.getUsername();
         this.init();
@@ -45,7 +52,8 @@ class OceanTasks {
 
     init() {
         this.bindEvents();
-        this.loadTasks();
+        // Sync starts from the revision the first page was read at
+        this.loadTasks().then(() => this.startSync());
         this.renderCalendar();
         this.checkOverdueTasks();
         this.showWelcomeMessage();
@@ -70,13 +78,15 @@ class OceanTasks {
 
         // Calendar navigation
         document.getElementById('prevMonth').addEventListener('click', () => {
-            this.currentDate.setMonth(this.currentDate.getMonth() - 1);
-            this.renderCalendar();
+            this.shiftCalendar(-1);
         });
 
         document.getElementById('nextMonth').addEventListener('click', () => {
-            this.currentDate.setMonth(this.currentDate.getMonth() + 1);
-            this.renderCalendar();
+            this.shiftCalendar(1);
+        });
+
+        document.getElementById('toggleView').addEventListener('click', () => {
+            this.toggleCalendarView();
         });
 
         // Modal close
@@ -94,10 +104,13 @@ class OceanTasks {
 
     async loadTasks() {
         try {
-            const response = await fetch('/api/tasks');
+            const response = await fetch(`/api/tasks?sort=-created_at&limit=${this.pageSize}`);
             if (response.ok) {
                 this.tasks = await response.json();
+                this.nextCursor = response.headers.get('X-Next-Cursor');
+                this.revision = response.headers.get('X-Revision');
                 this.renderTasks();
+                this.observeTaskListEnd();
             } else {
                 console.error('Failed to load tasks:', response.status);
                 this.showNotification(`🌊 Couldn't load your tasks, ${this.username}. The ocean seems choppy!`, 'error');
@@ -108,6 +121,158 @@ class OceanTasks {
         }
     }
 
+    async loadMoreTasks() {
+        // Fetch the next page when the end of the list scrolls into view
+        if (!this.nextCursor || this.loadingMore) return;
+        this.loadingMore = true;
+
+        try {
+            const params = new URLSearchParams({ sort: '-created_at', limit: this.pageSize, cursor: this.nextCursor });
+            const response = await fetch(`/api/tasks?${params}`);
+            if (response.ok) {
+                const page = await response.json();
+                this.tasks.push(...page);
+                this.nextCursor = response.headers.get('X-Next-Cursor');
+                this.renderTasks();
+            } else {
+                console.error('Failed to load more tasks:', response.status);
+            }
+        } catch (error) {
+            console.error('Error loading more tasks:', error);
+        } finally {
+            this.loadingMore = false;
+        }
+    }
+
+    observeTaskListEnd() {
+        if (this.taskListObserver) return;
+
+        const sentinel = document.createElement('div');
+        sentinel.className = 'tasks-sentinel';
+        document.getElementById('tasksList').after(sentinel);
+
+        this.taskListObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                this.loadMoreTasks();
+            }
+        });
+        this.taskListObserver.observe(sentinel);
+    }
+
+    startSync() {
+        // Pick up changes made in other tabs and devices without reloading everything
+        if (window.EventSource) {
+            this.openEventStream();
+        } else {
+            this.startPolling();
+        }
+    }
+
+    openEventStream() {
+        // The server pushes each change as it happens; the browser reconnects and resumes by itself
+        const since = this.revision === null ? '' : `?since=${this.revision}`;
+        this.events = new EventSource(`/api/events${since}`);
+        this.events.addEventListener('task', event => this.applyTaskEvent(JSON.parse(event.data)));
+        this.events.addEventListener('sync', () => this.syncChanges());
+        this.events.addEventListener('overdue', event => {
+            // Tasks just went past due (one event lists all of them): restyle them and send one gentle nudge
+            this.renderTasks();
+            this.showMotivationalMessage(JSON.parse(event.data).tasks);
+        });
+        this.events.addEventListener('error', () => {
+            if (this.events.readyState === EventSource.CLOSED) {
+                // Refused, e.g. too many open streams; fall back to polling
+                this.events = null;
+                this.startPolling();
+            }
+        });
+    }
+
+    startPolling() {
+        setInterval(() => this.syncChanges(), this.syncInterval);
+        window.addEventListener('focus', () => this.syncChanges());
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'visible') {
+                this.syncChanges();
+            }
+        });
+    }
+
+    applyTaskEvent(change) {
+        if (this.revision === null) return;
+        const current = Number(this.revision);
+        if (change.revision <= current) return; // already applied
+        if (change.revision !== current + 1 || this.syncing) {
+            // Missed a change (e.g. made through another server process); fetch what's new instead
+            this.syncChanges();
+            return;
+        }
+
+        this.revision = change.revision;
+        if (change.op === 'delete') {
+            if (!this.tasks.some(task => task.id === change.task_id)) return;
+            this.tasks = this.tasks.filter(task => task.id !== change.task_id);
+        } else {
+            const index = this.tasks.findIndex(task => task.id === change.task.id);
+            if (index !== -1) {
+                if (JSON.stringify(this.tasks[index]) === JSON.stringify(change.task)) return; // our own change
+                this.tasks[index] = change.task;
+            } else if (change.op === 'create') {
+                this.tasks.unshift(change.task);
+            } else {
+                return; // not on a page we have loaded
+            }
+        }
+        this.renderTasks();
+        this.renderCalendar();
+    }
+
+    async syncChanges() {
+        if (this.revision === null) return;
+        if (this.syncing) {
+            this.syncAgain = true;
+            return;
+        }
+        this.syncing = true;
+
+        try {
+            const response = await fetch(`/api/tasks/changes?since=${this.revision}`);
+            if (!response.ok) {
+                console.error('Failed to sync tasks:', response.status);
+                return;
+            }
+            const delta = await response.json();
+            if (delta.reset) {
+                await this.loadTasks();
+                this.renderCalendar();
+                return;
+            }
+            if (String(delta.revision) === String(this.revision)) return;
+
+            const changed = new Map(delta.tasks.map(task => [task.id, task]));
+            const deleted = new Set(delta.deleted);
+            this.tasks = this.tasks
+                .filter(task => !deleted.has(task.id))
+                .map(task => changed.get(task.id) || task);
+            delta.created.forEach(taskId => {
+                if (changed.has(taskId) && !this.tasks.some(task => task.id === taskId)) {
+                    this.tasks.unshift(changed.get(taskId));
+                }
+            });
+            this.revision = delta.revision;
+            this.renderTasks();
+            this.renderCalendar();
+        } catch (error) {
+            console.error('Error syncing tasks:', error);
+        } finally {
+            this.syncing = false;
+            if (this.syncAgain) {
+                this.syncAgain = false;
+                this.syncChanges();
+            }
+        }
+    }
+
     async addTask() {
         const title = document.getElementById('taskTitle').value.trim();
         const description = document.getElementById('taskDescription').value.trim();
@@ -135,7 +300,7 @@ class OceanTasks {
 
             if (response.ok) {
                 const newTask = await response.json();
-                this.tasks.push(newTask);
+                this.tasks.unshift(newTask);
                 this.renderTasks();
                 this.renderCalendar();
                 this.clearForm();
@@ -319,12 +484,59 @@ class OceanTasks {
         }
     }
 
-    renderCalendar() {
+    async fetchCalendarTasks(url) {
+        try {
+            const response = await fetch(url);
+            if (response.ok) {
+                return await response.json();
+            }
+            console.error('Failed to load calendar tasks:', response.status);
+        } catch (error) {
+            console.error('Error loading calendar tasks:', error);
+        }
+        return [];
+    }
+
+    toIsoDate(date) {
+        // Local calendar date as YYYY-MM-DD
+        const month = String(date.getMonth() + 1).padStart(2, '0');
+        const day = String(date.getDate()).padStart(2, '0');
+        return `${date.getFullYear()}-${month}-${day}`;
+    }
+
+    shiftCalendar(step) {
+        if (this.calendarView === 'week') {
+            this.currentDate.setDate(this.currentDate.getDate() + 7 * step);
+        } else {
+            this.currentDate.setMonth(this.currentDate.getMonth() + step);
+        }
+        this.renderCalendar();
+    }
+
+    toggleCalendarView() {
+        this.calendarView = this.calendarView === 'week' ? 'month' : 'week';
+        document.getElementById('toggleView').textContent = this.calendarView === 'week' ? 'Month' : 'Week';
+        this.renderCalendar();
+    }
+
+    async renderCalendar() {
+        if (this.calendarView === 'week') {
+            return this.renderWeek();
+        }
+
         const calendar = document.getElementById('calendar');
         const monthHeader = document.getElementById('currentMonth');
         
         const year = this.currentDate.getFullYear();
         const month = this.currentDate.getMonth();
+        const shownDate = this.currentDate.getTime();
+
+        // The task list is paged, so ask the server for this month's tasks
+        const calendarTasks = await this.fetchCalendarTasks(`/api/calendar/${year}/${month + 1}`);
+        if (shownDate !== this.currentDate.getTime() || this.calendarView !== 'month') {
+            return; // the user already moved on
+        }
+        this.calendarTasks = calendarTasks;
         
         monthHeader.textContent = this.currentDate.toLocaleDateString('en-US', { 
             month: 'long', 
@@ -333,17 +545,7 @@ class OceanTasks {
 
         // Clear calendar
         calendar.innerHTML = '';
-
-        // Add day headers
-        const dayHeaders = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
-        dayHeaders.forEach(day => {
-            const dayHeader = document.createElement('div');
-            dayHeader.className = 'calendar-day-header';
-            dayHeader.textContent = day;
-            dayHeader.style.fontWeight = 'bold';
-            dayHeader.style.color = 'var(--ocean-blue)';
-            calendar.appendChild(dayHeader);
-        });
+        this.addDayHeaders(calendar);
 
         // Get first day of month and number of days
         const firstDay = new Date(year, month, 1).getDay();
@@ -358,32 +560,78 @@ class OceanTasks {
 
         // Add days of the month
         for (let day = 1; day <= daysInMonth; day++) {
-            const dayElement = document.createElement('div');
-            dayElement.className = 'calendar-day';
-            dayElement.textContent = day;
-            
-            // Check if this day has tasks
-            const dayDate = new Date(year, month, day);
-            const hasTasks = this.tasks.some(task => {
-                if (!task.due_date) return false;
-                const taskDate = new Date(task.due_date);
-                return taskDate.toDateString() === dayDate.toDateString();
-            });
+            calendar.appendChild(this.createDayElement(new Date(year, month, day)));
+        }
+    }
 
-            if (hasTasks) {
-                dayElement.classList.add('has-tasks');
-            }
+    async renderWeek() {
+        const calendar = document.getElementById('calendar');
+        const monthHeader = document.getElementById('currentMonth');
 
-            dayElement.addEventListener('click', () => {
-                this.showTasksForDate(dayDate);
-            });
+        // Sunday to Saturday around the current date
+        const weekStart = new Date(this.currentDate.getFullYear(), this.currentDate.getMonth(),
+                                   this.currentDate.getDate() - this.currentDate.getDay());
+        const weekEnd = new Date(weekStart.getFullYear(), weekStart.getMonth(), weekStart.getDate() + 7);
+        const shownDate = this.currentDate.getTime();
 
-            calendar.appendChild(dayElement);
+        const params = new URLSearchParams({ from: this.toIsoDate(weekStart), to: this.toIsoDate(weekEnd) });
+        const calendarTasks = await this.fetchCalendarTasks(`/api/calendar?${params}`);
+        if (shownDate !== this.currentDate.getTime() || this.calendarView !== 'week') {
+            return; // the user already moved on
         }
+        this.calendarTasks = calendarTasks;
+
+        const lastDay = new Date(weekEnd.getFullYear(), weekEnd.getMonth(), weekEnd.getDate() - 1);
+        const format = { month: 'short', day: 'numeric' };
+        monthHeader.textContent = `${weekStart.toLocaleDateString('en-US', format)} – ` +
+            `${lastDay.toLocaleDateString('en-US', { ...format, year: 'numeric' })}`;
+
+        calendar.innerHTML = '';
+        this.addDayHeaders(calendar);
+
+        for (let offset = 0; offset < 7; offset++) {
+            const dayDate = new Date(weekStart.getFullYear(), weekStart.getMonth(), weekStart.getDate() + offset);
+            calendar.appendChild(this.createDayElement(dayDate));
+        }
+    }
+
+    addDayHeaders(calendar) {
+        const dayHeaders = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
+        dayHeaders.forEach(day => {
+            const dayHeader = document.createElement('div');
+            dayHeader.className = 'calendar-day-header';
+            dayHeader.textContent = day;
+            dayHeader.style.fontWeight = 'bold';
+            dayHeader.style.color = 'var(--ocean-blue)';
+            calendar.appendChild(dayHeader);
+        });
+    }
+
+    createDayElement(dayDate) {
+        const dayElement = document.createElement('div');
+        dayElement.className = 'calendar-day';
+        dayElement.textContent = dayDate.getDate();
+        
+        // Check if this day has tasks
+        const hasTasks = this.calendarTasks.some(task => {
+            if (!task.due_date) return false;
+            const taskDate = new Date(task.due_date);
+            return taskDate.toDateString() === dayDate.toDateString();
+        });
+
+        if (hasTasks) {
+            dayElement.classList.add('has-tasks');
+        }
+
+        dayElement.addEventListener('click', () => {
+            this.showTasksForDate(dayDate);
+        });
+
+        return dayElement;
     }
 
     showTasksForDate(date) {
-        const tasksForDate = this.tasks.filter(task => {
+        const tasksForDate = this.calendarTasks.filter(task => {
             if (!task.due_date) return false;
             const taskDate = new Date(task.due_date);
             return taskDate.toDateString() === date.toDateString();
@@ -405,13 +653,17 @@ class OceanTasks {
         }
     }
 
-    checkOverdueTasks() {
-        const now = new Date();
-        const overdueTasks = this.tasks.filter(task => 
-            task.due_date && 
-            new Date(task.due_date) < now && 
-            !task.completed
-        );
+    async checkOverdueTasks() {
+        // The server keeps track of which open tasks have gone past due
+        let overdueTasks = [];
+        try {
+            const response = await fetch('/api/overdue');
+            if (response.ok) {
+                overdueTasks = (await response.json()).tasks;
+            }
+        } catch (error) {
+            console.error('Error checking overdue tasks:', error);
+        }
 
         if (overdueTasks.length > 0) {
             // Show motivational message for overdue tasks
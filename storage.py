@@ -0,0 +1,1125 @@
+#!/usr/bin/env python3
+"""
+Ocean Tasks storage backends
+Keeps tasks and users behind one small interface so the Flask app can run on
+plain JSON files or on an indexed SQLite database
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from task_index import CHANGE_LOG_SIZE, NO_DUE_DATE, TaskIndex, due_timestamp, parse_sort
+from user_index import UserIndex, email_key
+
+
+@contextmanager
+def file_lock(path, exclusive=False):
+    """Hold an advisory lock on path + '.lock' (shared for readers, exclusive for writers)
+
+    Without fcntl (Windows) this is a no-op and only in-process locking applies.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def file_signature(path):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def atomic_write_bytes(path, data):
+    """Write to a temp file next to path and rename it into place"""
+    fd, temp_file = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                     dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        os.unlink(temp_file)
+        raise
+
+
+def atomic_write_json(path, data):
+    """Atomically write pretty-printed JSON to path"""
+    atomic_write_bytes(path, json.dumps(data, indent=2).encode())
+
+
+class LoginBuffer:
+    """Last-login times held in memory and written out in batches
+
+    Logins only touch this buffer; a background thread hands the pending
+    times to `save` every `interval` seconds and once more at exit, so a
+    login never rewrites the user table.
+    """
+
+    def __init__(self, save, interval=30):
+        self._save = save
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, username, when):
+        with self._lock:
+            self._pending[username] = max(when, self._pending.get(username, when))
+            if self._flusher is None and self.interval:
+                self._flusher = threading.Thread(target=self._flush_loop, name='login-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def get(self, username):
+        with self._lock:
+            return self._pending.get(username)
+
+    def flush(self):
+        """Write out every pending login time"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            self._save(batch)
+        except BaseException:
+            with self._lock:
+                for username, when in batch.items():
+                    self._pending[username] = max(when, self._pending.get(username, when))
+            raise
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Last login flush failed: {e}")
+
+
+class Storage:
+    """Interface shared by every storage backend"""
+
+    def load_tasks(self):
+        """Return every task of every user"""
+        raise NotImplementedError
+
+    def save_tasks(self, tasks):
+        """Replace the whole task collection"""
+        raise NotImplementedError
+
+    def load_users(self):
+        """Return every user as a username -> record dict"""
+        raise NotImplementedError
+
+    def save_users(self, users):
+        """Replace the whole user collection"""
+        raise NotImplementedError
+
+    def get_user_tasks(self, user_id):
+        """Return the tasks owned by one user"""
+        raise NotImplementedError
+
+    def get_task(self, user_id, task_id):
+        """Return one task owned by user_id, or None"""
+        raise NotImplementedError
+
+    def query_tasks(self, user_id, completed=None, due_after=None, due_before=None,
+                    sort='created_at', cursor=None, limit=None):
+        """One page of a user's tasks as (tasks, sort key of the last task or None)
+
+        Filters: completed (bool), due_after/due_before (exclusive
+        task_index.due_timestamp() bounds). sort is a field from
+        task_index.SORT_FIELDS, prefixed with '-' for descending order; cursor
+        is the key returned for the previous page. The key is only returned
+        when more tasks may follow.
+        """
+        raise NotImplementedError
+
+    def iter_user_tasks(self, user_id, chunk_size=500, **filters):
+        """Yield a user's tasks oldest first, reading `chunk_size` at a time
+
+        Each chunk is one keyset page, so memory stays flat however many
+        tasks the user has and no lock is held between chunks. filters are
+        query_tasks() filters (completed, due_after, due_before).
+        """
+        cursor = None
+        while True:
+            page, cursor = self.query_tasks(user_id, cursor=cursor, limit=chunk_size, **filters)
+            yield from page
+            if cursor is None:
+                return
+
+    def tasks_due_between(self, user_id, start, end):
+        """A user's tasks with start <= due < end (due_timestamp() values), ordered by due date"""
+        raise NotImplementedError
+
+    def task_stats(self, user_id, now):
+        """A user's total/completed/pending/overdue task counts as of `now` (a due_timestamp() value)"""
+        raise NotImplementedError
+
+    def revision(self, user_id):
+        """A counter that grows every time one of the user's tasks changes"""
+        raise NotImplementedError
+
+    def changes_since(self, user_id, since):
+        """(revision, changes) where changes lists the (revision, op, task_id) entries
+        after `since`, or is None when they are too old to be known"""
+        raise NotImplementedError
+
+    def add_task(self, task):
+        """Store a new task"""
+        raise NotImplementedError
+
+    def update_task(self, user_id, task_id, changes):
+        """Apply changes to a task and return it, or None if it does not exist"""
+        raise NotImplementedError
+
+    def delete_task(self, user_id, task_id):
+        """Delete a task, returning True if it existed"""
+        raise NotImplementedError
+
+    def apply_batch(self, user_id, operations):
+        """Apply create/update/delete operations for one user in a single atomic write
+
+        Operations look like {'op': 'create', 'task': task}, {'op': 'update',
+        'id': task_id, 'changes': changes} or {'op': 'delete', 'id': task_id};
+        the results are what add_task/update_task/delete_task would return.
+        """
+        raise NotImplementedError
+
+    def open_due_tasks(self):
+        """Every user's open tasks that have a due date, what the overdue scheduler watches"""
+        raise NotImplementedError
+
+    def load_overdue(self):
+        """Recorded overdue transitions as (user_id, task_id) -> (due, overdue_at)"""
+        raise NotImplementedError
+
+    def record_overdue(self, transitions):
+        """Record (user_id, task_id, due, overdue_at) transitions, once per task and due time
+
+        Returns the ones another process had recorded first, as
+        (user_id, task_id) -> overdue_at. Records of deleted tasks are dropped.
+        """
+        raise NotImplementedError
+
+    def record_login(self, username, when):
+        """Remember a login time (ISO string) without touching the user record"""
+        self._logins.record(username, when)
+
+    def last_login(self, username):
+        """Most recent recorded login time, or None"""
+        return self._logins.get(username) or self._load_logins([username]).get(username)
+
+    def flush_logins(self):
+        """Write buffered login times out now"""
+        self._logins.flush()
+
+    def _load_logins(self, usernames):
+        """Stored login times for these users"""
+        raise NotImplementedError
+
+    def _save_logins(self, logins):
+        """Merge username -> login time into the store, keeping the newest"""
+        raise NotImplementedError
+
+    def migration_lock(self):
+        """Context manager that keeps other processes from migrating at the same time"""
+        raise NotImplementedError
+
+    def get_schema_version(self):
+        """Return the schema version the stored data was migrated to"""
+        raise NotImplementedError
+
+    def set_schema_version(self, version):
+        """Record the schema version the stored data was migrated to"""
+        raise NotImplementedError
+
+    def get_user(self, username):
+        """Return one user record, or None"""
+        raise NotImplementedError
+
+    def add_user(self, username, record):
+        """Store a new user, returning (success, message)"""
+        raise NotImplementedError
+
+    def update_user(self, username, changes):
+        """Apply changes to an existing user record"""
+        raise NotImplementedError
+
+
+class JSONStorage(Storage):
+    """Stores tasks and users as pretty-printed JSON documents
+
+    Tasks live in a snapshot (data/tasks.json) plus an append-only JSON-lines
+    journal of create/patch/delete operations (data/tasks.journal). Each
+    mutation appends one small line instead of rewriting the snapshot; a
+    background thread periodically folds the journal into a new snapshot, and
+    startup replays whatever the journal holds, skipping a torn final line
+    left by a crash.
+
+    The snapshot and journal are mirrored in a TaskIndex. The snapshot's
+    (mtime, size) signature and the journal length are checked before each
+    access, so changes made by another process are picked up instead of
+    serving stale data. The journal's baseline records the signature of the
+    snapshot it belongs to; a snapshot without one was edited outside the
+    app, so every user's revision is bumped past what clients have seen and
+    a fresh snapshot and baseline are written. Users are cached the same way in a UserIndex keyed by
+    username and lowercase email, reloaded only when users.json changes.
+
+    Every read-modify-write cycle runs under an exclusive advisory lock
+    (data/tasks.json.lock, data/users.json.lock) and reads take a shared one,
+    so several worker processes can share the files without lost updates.
+    Whole-document writes go to a temp file that is renamed into place.
+    """
+
+    def __init__(self, tasks_file, users_file, journal_file=None, compact_interval=60, fsync=False,
+                 login_flush_interval=30):
+        self.tasks_file = tasks_file
+        self.users_file = users_file
+        self.logins_file = os.path.join(os.path.dirname(users_file), 'logins.json')
+        self.journal_file = journal_file or os.path.splitext(tasks_file)[0] + '.journal'
+        self.meta_file = os.path.join(os.path.dirname(tasks_file), 'meta.json')
+        self.overdue_file = os.path.join(os.path.dirname(tasks_file), 'overdue.json')
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._index = TaskIndex()
+        self._tasks_signature = None
+        self._journal_offset = 0
+        self._journal_base = 0
+        self._baseline_snapshot = None
+        self._loaded = False
+        self._compactor = None
+        self._user_index = None
+        self._users_signature = None
+        self._logins = LoginBuffer(self._save_logins, login_flush_interval)
+
+    @contextmanager
+    def _tasks(self, exclusive=False):
+        """Lock the task files and yield an up-to-date index"""
+        with self._lock:
+            if not exclusive:
+                with file_lock(self.tasks_file):
+                    index = self._refresh()
+                    if index is not None:
+                        yield index
+                        return
+            # Writers, and readers that found the snapshot edited outside the app
+            with file_lock(self.tasks_file, exclusive=True):
+                yield self._refresh(exclusive=True)
+
+    def _journal_size(self):
+        try:
+            return os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            return 0
+
+    def _refresh(self, exclusive=False):
+        """Bring the index up to date with the snapshot and journal on disk
+
+        Returns None, changing nothing, if the snapshot was edited outside the
+        app and the lock is only shared; the caller retries with an exclusive one.
+        """
+        signature = file_signature(self.tasks_file)
+        journal_size = self._journal_size()
+        previous = None
+        if not self._loaded or signature != self._tasks_signature or journal_size < self._journal_offset:
+            previous = self._index
+            tasks = []
+            if signature is not None:
+                with open(self.tasks_file, 'r') as f:
+                    tasks = json.load(f)
+            self._index = TaskIndex(tasks)
+            self._tasks_signature = signature
+            self._journal_offset = self._journal_base = 0
+            self._baseline_snapshot = None
+            self._loaded = True
+        if journal_size > self._journal_offset:
+            self._replay_journal(exclusive)
+        if previous is not None and self._baseline_snapshot != (list(signature) if signature else None):
+            # The journal's revisions belong to the old content; clients would get stale 304s and deltas
+            if not exclusive:
+                self._index, self._loaded = previous, False
+                return None
+            self._index.carry_revisions(previous, self._index)
+            self._write_snapshot()
+        return self._index
+
+    def _replay_journal(self, exclusive):
+        """Apply every complete journal line past the current offset"""
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash, superseded by later lines
+            self._index.apply(entry)
+            if entry['op'] == 'baseline' and self._journal_offset == 0:
+                self._journal_base = len(line) + 1
+                self._baseline_snapshot = entry.get('snapshot')
+        self._journal_offset += end
+        if end < len(data) and exclusive:
+            # A crash left half a line at the end; cut it so new appends start clean
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(self._journal_offset)
+
+    def _append(self, entry):
+        """Record one operation in the journal and apply it to the index"""
+        line = (json.dumps(entry) + '\n').encode()
+        with open(self.journal_file, 'ab') as f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._journal_offset += len(line)
+        self._start_compactor()
+        return self._index.apply(entry)
+
+    def _write_snapshot(self):
+        """Atomically replace the snapshot, then start a new journal from the index's baseline"""
+        atomic_write_json(self.tasks_file, [task.to_dict() for task in self._index.all()])
+        self._tasks_signature = file_signature(self.tasks_file)
+        self._baseline_snapshot = list(self._tasks_signature)
+        baseline = (json.dumps(dict(self._index.baseline(), snapshot=self._baseline_snapshot)) + '\n').encode()
+        atomic_write_bytes(self.journal_file, baseline)
+        self._journal_offset = self._journal_base = len(baseline)
+        self._loaded = True
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with self._tasks(exclusive=True):
+            if self._journal_offset > self._journal_base:
+                self._write_snapshot()
+
+    def _start_compactor(self):
+        """Start the background compaction thread on first write"""
+        if self._compactor is None and self.compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name='tasks-compactor', daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Task journal compaction failed: {e}")
+
+    def load_tasks(self):
+        with self._tasks() as index:
+            return [task.to_dict() for task in index.all()]
+
+    def save_tasks(self, tasks):
+        with self._tasks(exclusive=True) as previous:
+            self._index = TaskIndex(dict(task) for task in tasks)
+            self._index.carry_revisions(previous)
+            self._write_snapshot()
+
+    @contextmanager
+    def _users(self, exclusive=False):
+        """Lock the users file and yield an up-to-date UserIndex"""
+        with self._lock, file_lock(self.users_file, exclusive):
+            signature = file_signature(self.users_file)
+            if self._user_index is None or signature != self._users_signature:
+                users = {}
+                if signature is not None:
+                    with open(self.users_file, 'r') as f:
+                        users = json.load(f)
+                self._user_index = UserIndex(users)
+                self._users_signature = signature
+            yield self._user_index
+
+    def _write_users(self, index):
+        atomic_write_json(self.users_file, index.all())
+        self._users_signature = file_signature(self.users_file)
+
+    def load_users(self):
+        with self._users() as index:
+            return {username: dict(record) for username, record in index.all().items()}
+
+    def save_users(self, users):
+        with self._users(exclusive=True):
+            self._user_index = UserIndex({username: dict(record) for username, record in users.items()})
+            self._write_users(self._user_index)
+
+    def get_user_tasks(self, user_id):
+        with self._tasks() as index:
+            return [task.to_dict() for task in index.user_tasks(user_id)]
+
+    def get_task(self, user_id, task_id):
+        with self._tasks() as index:
+            task = index.get(user_id, task_id)
+            return task.to_dict() if task is not None else None
+
+    def query_tasks(self, user_id, completed=None, due_after=None, due_before=None,
+                    sort='created_at', cursor=None, limit=None):
+        with self._tasks() as index:
+            page, last_key = index.query(user_id, completed, due_after, due_before, sort, cursor, limit)
+            return [task.to_dict() for task in page], last_key
+
+    def tasks_due_between(self, user_id, start, end):
+        with self._tasks() as index:
+            return [task.to_dict() for task in index.due_between(user_id, start, end)]
+
+    def task_stats(self, user_id, now):
+        with self._tasks() as index:
+            return index.stats(user_id, now)
+
+    def revision(self, user_id):
+        with self._tasks() as index:
+            return index.revision(user_id)
+
+    def changes_since(self, user_id, since):
+        with self._tasks() as index:
+            return index.revision(user_id), index.changes_since(user_id, since)
+
+    def add_task(self, task):
+        with self._tasks(exclusive=True):
+            self._append({'op': 'create', 'task': task})
+
+    def update_task(self, user_id, task_id, changes):
+        with self._tasks(exclusive=True) as index:
+            if index.get(user_id, task_id) is None:
+                return None
+            task = self._append({'op': 'patch', 'user_id': user_id, 'id': task_id, 'changes': changes})
+            return dict(task)
+
+    def delete_task(self, user_id, task_id):
+        with self._tasks(exclusive=True) as index:
+            if index.get(user_id, task_id) is None:
+                return False
+            self._append({'op': 'delete', 'user_id': user_id, 'id': task_id})
+            return True
+
+    def apply_batch(self, user_id, operations):
+        entries = [_journal_entry(user_id, operation) for operation in operations]
+        with self._tasks(exclusive=True):
+            results = self._append({'op': 'batch', 'ops': entries})
+        return [
+            result is not None if entry['op'] == 'delete' else result and dict(result)
+            for entry, result in zip(entries, results)
+        ]
+
+    def open_due_tasks(self):
+        with self._tasks() as index:
+            return [task.to_dict() for task in index.all() if not task.get('completed') and task.due_ts is not None]
+
+    def _read_overdue(self):
+        if os.path.exists(self.overdue_file):
+            with open(self.overdue_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def load_overdue(self):
+        with file_lock(self.overdue_file):
+            stored = self._read_overdue()
+        return {(user_id, task_id): tuple(mark) for user_id, marks in stored.items() for task_id, mark in marks.items()}
+
+    def record_overdue(self, transitions):
+        earlier = {}
+        with file_lock(self.overdue_file, exclusive=True):
+            stored = self._read_overdue()  # user_id -> {task_id: [due, overdue_at]}
+            for user_id, task_id, due, overdue_at in transitions:
+                marks = stored.setdefault(user_id, {})
+                if task_id in marks and marks[task_id][0] == due:
+                    earlier[(user_id, task_id)] = marks[task_id][1]
+                else:
+                    marks[task_id] = [due, overdue_at]
+            with self._tasks() as index:
+                for user_id, marks in stored.items():
+                    for task_id in [task_id for task_id in marks if index.get(user_id, task_id) is None]:
+                        del marks[task_id]
+            atomic_write_json(self.overdue_file, {user_id: marks for user_id, marks in stored.items() if marks})
+        return earlier
+
+    def _read_logins(self):
+        if os.path.exists(self.logins_file):
+            with open(self.logins_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _load_logins(self, usernames):
+        with file_lock(self.logins_file):
+            logins = self._read_logins()
+        return {username: logins[username] for username in usernames if username in logins}
+
+    def _save_logins(self, logins):
+        with file_lock(self.logins_file, exclusive=True):
+            stored = self._read_logins()
+            for username, when in logins.items():
+                stored[username] = max(when, stored.get(username, when))
+            atomic_write_json(self.logins_file, stored)
+
+    def migration_lock(self):
+        return file_lock(self.meta_file + '.migrate', exclusive=True)
+
+    def get_schema_version(self):
+        with file_lock(self.meta_file):
+            if os.path.exists(self.meta_file):
+                with open(self.meta_file, 'r') as f:
+                    return json.load(f).get('schema_version', 0)
+        return 0
+
+    def set_schema_version(self, version):
+        with file_lock(self.meta_file, exclusive=True):
+            atomic_write_json(self.meta_file, {'schema_version': version})
+
+    def get_user(self, username):
+        with self._users() as index:
+            record = index.get(username)
+            return dict(record) if record is not None else None
+
+    def add_user(self, username, record):
+        with self._users(exclusive=True) as index:
+            conflict = index.conflict(username, record.get('email'))
+            if conflict:
+                return False, conflict
+            index.put(username, dict(record))
+            self._write_users(index)
+        return True, "User created successfully"
+
+    def update_user(self, username, changes):
+        with self._users(exclusive=True) as index:
+            record = index.get(username)
+            if record is not None:
+                index.put(username, dict(record, **changes))
+                self._write_users(index)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users(email COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS user_logins (
+    username TEXT PRIMARY KEY,
+    last_login TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    user_id TEXT,
+    due_date TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS overdue_fired (
+    user_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    due INTEGER NOT NULL,
+    overdue_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, task_id)
+);
+"""
+
+# Columns derived from the task document, added to older databases on connect
+TASK_COLUMNS = (
+    ('created_at', "TEXT NOT NULL DEFAULT ''"),
+    ('completed', 'INTEGER NOT NULL DEFAULT 0'),
+    ('due_ts', f'INTEGER NOT NULL DEFAULT {NO_DUE_DATE}'),
+)
+
+SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks(user_id, seq);
+CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(user_id, due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_page ON tasks(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_page ON tasks(user_id, due_ts, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_open_due ON tasks(user_id, completed, due_ts);
+"""
+
+# Per-user counters kept current by triggers, so reading them is O(1)
+SQLITE_STATS = """
+CREATE TABLE task_stats (
+    user_id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER task_stats_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO task_stats (user_id, total, completed) VALUES (NEW.user_id, 1, NEW.completed)
+    ON CONFLICT (user_id) DO UPDATE SET total = total + 1, completed = completed + NEW.completed;
+END;
+
+CREATE TRIGGER task_stats_delete AFTER DELETE ON tasks BEGIN
+    UPDATE task_stats SET total = total - 1, completed = completed - OLD.completed WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER task_stats_update AFTER UPDATE OF user_id, completed ON tasks BEGIN
+    UPDATE task_stats SET total = total - 1, completed = completed - OLD.completed WHERE user_id = OLD.user_id;
+    INSERT INTO task_stats (user_id, total, completed) VALUES (NEW.user_id, 1, NEW.completed)
+    ON CONFLICT (user_id) DO UPDATE SET total = total + 1, completed = completed + NEW.completed;
+END;
+
+INSERT INTO task_stats (user_id, total, completed)
+SELECT user_id, COUNT(*), SUM(completed) FROM tasks GROUP BY user_id;
+"""
+
+# Columns holding the keyset values of task_index.sort_key()
+SQLITE_SORT_KEYS = {
+    'created_at': 'created_at',
+    'due_date': 'due_ts',
+}
+
+
+def _log_change_sql(user, op, task_id):
+    """Trigger statements that bump a user's revision and log one change"""
+    return f"""
+    INSERT INTO task_revisions (user_id, rev) VALUES ({user}, 1)
+    ON CONFLICT (user_id) DO UPDATE SET rev = rev + 1;
+    INSERT INTO task_changes (user_id, rev, op, task_id)
+    SELECT user_id, rev, '{op}', {task_id} FROM task_revisions WHERE user_id = {user};
+    DELETE FROM task_changes WHERE user_id = {user}
+    AND rev <= (SELECT rev FROM task_revisions WHERE user_id = {user}) - {CHANGE_LOG_SIZE};"""
+
+
+# Per-user revisions and a bounded change log for delta sync, kept by triggers
+SQLITE_CHANGES = f"""
+CREATE TABLE task_revisions (
+    user_id TEXT PRIMARY KEY,
+    rev INTEGER NOT NULL
+);
+
+CREATE TABLE task_changes (
+    user_id TEXT NOT NULL,
+    rev INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, rev)
+);
+
+CREATE TRIGGER task_changes_insert AFTER INSERT ON tasks BEGIN{_log_change_sql('NEW.user_id', 'create', 'NEW.id')}
+END;
+
+CREATE TRIGGER task_changes_delete AFTER DELETE ON tasks BEGIN{_log_change_sql('OLD.user_id', 'delete', 'OLD.id')}
+END;
+
+CREATE TRIGGER task_changes_update AFTER UPDATE ON tasks
+WHEN OLD.user_id IS NEW.user_id AND OLD.id IS NEW.id BEGIN{_log_change_sql('NEW.user_id', 'update', 'NEW.id')}
+END;
+
+CREATE TRIGGER task_changes_move AFTER UPDATE ON tasks
+WHEN OLD.user_id IS NOT NEW.user_id OR OLD.id IS NOT NEW.id BEGIN{_log_change_sql('OLD.user_id', 'delete', 'OLD.id')}{_log_change_sql('NEW.user_id', 'create', 'NEW.id')}
+END;
+
+INSERT INTO task_revisions (user_id, rev) SELECT DISTINCT user_id, 0 FROM tasks WHERE user_id IS NOT NULL;
+"""
+
+
+class SQLiteStorage(Storage):
+    """Stores tasks and users in a WAL-mode SQLite database
+
+    Each task row keeps the full JSON document in `data` next to the indexed
+    columns, so arbitrary task fields survive while lookups by user, id and
+    due date only touch the affected rows.
+    """
+
+    def __init__(self, db_file, login_flush_interval=30):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._logins = LoginBuffer(self._save_logins, login_flush_interval)
+
+    @property
+    def conn(self):
+        """Per-thread connection, created on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SQLITE_SCHEMA)
+            self._add_task_columns(conn)
+            conn.executescript(SQLITE_INDEXES)
+            self._create_once(conn, 'task_stats', SQLITE_STATS)
+            self._create_once(conn, 'task_changes', SQLITE_CHANGES)
+            self._local.conn = conn
+        return conn
+
+    def _create_once(self, conn, table, script):
+        """Run a schema script unless `table` exists already (script statements end in ';\\n\\n')"""
+        exists = f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{table}'"
+        if conn.execute(exists).fetchone():
+            return
+        with _Transaction(conn):
+            if not conn.execute(exists).fetchone():
+                for statement in script.split(';\n\n'):
+                    conn.execute(statement)
+
+    def _add_task_columns(self, conn):
+        """Add derived task columns missing from an older database and fill them in"""
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(tasks)')}
+        missing = [(name, kind) for name, kind in TASK_COLUMNS if name not in existing]
+        if not missing:
+            return
+        with _Transaction(conn):
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(tasks)')}
+            for name, kind in missing:
+                if name not in existing:
+                    conn.execute(f'ALTER TABLE tasks ADD COLUMN {name} {kind}')
+            rows = conn.execute('SELECT data, seq FROM tasks').fetchall()
+            conn.executemany(
+                'UPDATE tasks SET id = ?, user_id = ?, due_date = ?, created_at = ?, completed = ?, due_ts = ?, '
+                'data = ? WHERE seq = ?',
+                [_task_row(json.loads(data)) + (seq,) for data, seq in rows]
+            )
+
+    def _write(self):
+        """Start a write transaction that holds the database write lock"""
+        return _Transaction(self.conn)
+
+    def load_tasks(self):
+        rows = self.conn.execute('SELECT data FROM tasks ORDER BY seq')
+        return [json.loads(data) for (data,) in rows]
+
+    def save_tasks(self, tasks):
+        with self._write() as conn:
+            conn.execute('DELETE FROM tasks')
+            conn.executemany(
+                'INSERT INTO tasks (id, user_id, due_date, created_at, completed, due_ts, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [_task_row(task) for task in tasks]
+            )
+
+    def load_users(self):
+        rows = self.conn.execute('SELECT username, data FROM users ORDER BY rowid')
+        return {username: json.loads(data) for username, data in rows}
+
+    def save_users(self, users):
+        with self._write() as conn:
+            conn.execute('DELETE FROM users')
+            conn.executemany(
+                'INSERT INTO users (username, email, data) VALUES (?, ?, ?)',
+                [(username, record.get('email'), json.dumps(record)) for username, record in users.items()]
+            )
+
+    def get_user_tasks(self, user_id):
+        rows = self.conn.execute('SELECT data FROM tasks WHERE user_id = ? ORDER BY seq', (user_id,))
+        return [json.loads(data) for (data,) in rows]
+
+    def get_task(self, user_id, task_id):
+        row = self.conn.execute(
+            'SELECT data FROM tasks WHERE id = ? AND user_id = ?', (task_id, user_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_tasks(self, user_id, completed=None, due_after=None, due_before=None,
+                    sort='created_at', cursor=None, limit=None):
+        field, descending = parse_sort(sort)
+        key = SQLITE_SORT_KEYS[field]
+        clauses = ['user_id = ?']
+        params = [user_id]
+        if completed is not None:
+            clauses.append('completed = ?')
+            params.append(int(completed))
+        if due_after is not None or due_before is not None:
+            clauses.append('due_ts > ? AND due_ts < ?')
+            params.extend([
+                due_after if due_after is not None else -1,
+                due_before if due_before is not None else NO_DUE_DATE,
+            ])
+        if cursor is not None:
+            if isinstance(cursor[0], int) != (field == 'due_date'):
+                raise ValueError("Cursor does not match the sort order")
+            clauses.append(f"({key}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(cursor)
+        order = 'DESC' if descending else 'ASC'
+        sql = f"SELECT data, {key} FROM tasks WHERE {' AND '.join(clauses)} ORDER BY {key} {order}, id {order}"
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit + 1)
+        rows = self.conn.execute(sql, params).fetchall()
+
+        last_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last_task = json.loads(rows[-1][0])
+            last_key = (rows[-1][1], last_task['id'])
+        return [json.loads(data) for data, _ in rows], last_key
+
+    def tasks_due_between(self, user_id, start, end):
+        rows = self.conn.execute(
+            'SELECT data FROM tasks WHERE user_id = ? AND due_ts >= ? AND due_ts < ? ORDER BY due_ts, id',
+            (user_id, start, min(end, NO_DUE_DATE))
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def task_stats(self, user_id, now):
+        row = self.conn.execute('SELECT total, completed FROM task_stats WHERE user_id = ?', (user_id,)).fetchone()
+        total, completed = row or (0, 0)
+        overdue = self.conn.execute(
+            'SELECT COUNT(*) FROM tasks WHERE user_id = ? AND completed = 0 AND due_ts < ?',
+            (user_id, min(now, NO_DUE_DATE))
+        ).fetchone()[0]
+        return {
+            'total_tasks': total,
+            'completed_tasks': completed,
+            'pending_tasks': total - completed,
+            'overdue_tasks': overdue,
+        }
+
+    def revision(self, user_id):
+        row = self.conn.execute('SELECT rev FROM task_revisions WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, user_id, since):
+        conn = self.conn
+        conn.execute('BEGIN')
+        try:
+            revision = self.revision(user_id)
+            floor = conn.execute('SELECT MIN(rev) - 1 FROM task_changes WHERE user_id = ?', (user_id,)).fetchone()[0]
+            if since > revision or since < (revision if floor is None else floor):
+                return revision, None
+            changes = conn.execute(
+                'SELECT rev, op, task_id FROM task_changes WHERE user_id = ? AND rev > ? ORDER BY rev',
+                (user_id, since)
+            ).fetchall()
+            return revision, changes
+        finally:
+            conn.execute('COMMIT')
+
+    def add_task(self, task):
+        with self._write() as conn:
+            self._insert_task(conn, task)
+
+    def update_task(self, user_id, task_id, changes):
+        with self._write() as conn:
+            return self._patch_task(conn, user_id, task_id, changes)
+
+    def delete_task(self, user_id, task_id):
+        with self._write() as conn:
+            return self._delete_task(conn, user_id, task_id)
+
+    def apply_batch(self, user_id, operations):
+        results = []
+        with self._write() as conn:
+            for operation in operations:
+                op = operation['op']
+                if op == 'create':
+                    self._insert_task(conn, operation['task'])
+                    results.append(operation['task'])
+                elif op == 'update':
+                    results.append(self._patch_task(conn, user_id, operation['id'], operation['changes']))
+                elif op == 'delete':
+                    results.append(self._delete_task(conn, user_id, operation['id']))
+                else:
+                    raise ValueError(f"Unknown batch operation: {op}")
+        return results
+
+    def _insert_task(self, conn, task):
+        conn.execute(
+            'INSERT INTO tasks (id, user_id, due_date, created_at, completed, due_ts, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            _task_row(task)
+        )
+
+    def _patch_task(self, conn, user_id, task_id, changes):
+        row = conn.execute(
+            'SELECT data FROM tasks WHERE id = ? AND user_id = ?', (task_id, user_id)
+        ).fetchone()
+        if not row:
+            return None
+        task = json.loads(row[0])
+        task.update(changes)
+        conn.execute(
+            'UPDATE tasks SET id = ?, user_id = ?, due_date = ?, created_at = ?, completed = ?, due_ts = ?, '
+            'data = ? WHERE id = ?',
+            _task_row(task) + (task_id,)
+        )
+        return task
+
+    def _delete_task(self, conn, user_id, task_id):
+        cursor = conn.execute('DELETE FROM tasks WHERE id = ? AND user_id = ?', (task_id, user_id))
+        return cursor.rowcount > 0
+
+    def open_due_tasks(self):
+        rows = self.conn.execute(
+            'SELECT data FROM tasks WHERE completed = 0 AND due_ts < ? ORDER BY seq', (NO_DUE_DATE,)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def load_overdue(self):
+        rows = self.conn.execute('SELECT user_id, task_id, due, overdue_at FROM overdue_fired')
+        return {(user_id, task_id): (due, overdue_at) for user_id, task_id, due, overdue_at in rows}
+
+    def record_overdue(self, transitions):
+        earlier = {}
+        with self._write() as conn:
+            for user_id, task_id, due, overdue_at in transitions:
+                row = conn.execute('SELECT due, overdue_at FROM overdue_fired WHERE user_id = ? AND task_id = ?',
+                                   (user_id, task_id)).fetchone()
+                if row and row[0] == due:
+                    earlier[(user_id, task_id)] = row[1]
+                    continue
+                conn.execute(
+                    'INSERT INTO overdue_fired (user_id, task_id, due, overdue_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (user_id, task_id) DO UPDATE SET due = excluded.due, overdue_at = excluded.overdue_at',
+                    (user_id, task_id, due, overdue_at)
+                )
+            conn.execute(
+                'DELETE FROM overdue_fired WHERE NOT EXISTS (SELECT 1 FROM tasks '
+                'WHERE tasks.id = overdue_fired.task_id AND tasks.user_id = overdue_fired.user_id)'
+            )
+        return earlier
+
+    def _load_logins(self, usernames):
+        placeholders = ', '.join('?' * len(usernames))
+        rows = self.conn.execute(
+            f'SELECT username, last_login FROM user_logins WHERE username IN ({placeholders})', list(usernames)
+        )
+        return dict(rows)
+
+    def _save_logins(self, logins):
+        with self._write() as conn:
+            conn.executemany(
+                'INSERT INTO user_logins (username, last_login) VALUES (?, ?) '
+                'ON CONFLICT (username) DO UPDATE SET last_login = MAX(last_login, excluded.last_login)',
+                list(logins.items())
+            )
+
+    def migration_lock(self):
+        return file_lock(self.db_file + '.migrate', exclusive=True)
+
+    def get_schema_version(self):
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def set_schema_version(self, version):
+        self.conn.execute(f'PRAGMA user_version = {int(version)}')
+
+    def get_user(self, username):
+        row = self.conn.execute('SELECT data FROM users WHERE username = ?', (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add_user(self, username, record):
+        with self._write() as conn:
+            if conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                return False, "Username already exists"
+            if conn.execute('SELECT 1 FROM users WHERE email = ? COLLATE NOCASE',
+                            (email_key(record.get('email')),)).fetchone():
+                return False, "Email already registered"
+            conn.execute(
+                'INSERT INTO users (username, email, data) VALUES (?, ?, ?)',
+                (username, record.get('email'), json.dumps(record))
+            )
+        return True, "User created successfully"
+
+    def update_user(self, username, changes):
+        with self._write() as conn:
+            row = conn.execute('SELECT data FROM users WHERE username = ?', (username,)).fetchone()
+            if row:
+                record = json.loads(row[0])
+                record.update(changes)
+                conn.execute(
+                    'UPDATE users SET email = ?, data = ? WHERE username = ?',
+                    (record.get('email'), json.dumps(record), username)
+                )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def _journal_entry(user_id, operation):
+    """Journal entry for one apply_batch() operation"""
+    op = operation['op']
+    if op == 'create':
+        return {'op': 'create', 'task': operation['task']}
+    if op == 'update':
+        return {'op': 'patch', 'user_id': user_id, 'id': operation['id'], 'changes': operation['changes']}
+    if op == 'delete':
+        return {'op': 'delete', 'user_id': user_id, 'id': operation['id']}
+    raise ValueError(f"Unknown batch operation: {op}")
+
+
+def _task_row(task):
+    """Column values for a task row"""
+    due = due_timestamp(task.get('due_date'))
+    return (task['id'], task.get('user_id'), task.get('due_date'), task.get('created_at') or '',
+            int(bool(task.get('completed', False))), NO_DUE_DATE if due is None else due, json.dumps(task))
+
+
+BACKENDS = ('json', 'sqlite')
+
+
+def create_storage(backend='json', tasks_file='data/tasks.json', users_file='data/users.json',
+                   db_file='data/ocean.db'):
+    """Build the configured storage backend"""
+    if backend == 'json':
+        return JSONStorage(tasks_file, users_file)
+    if backend == 'sqlite':
+        return SQLiteStorage(db_file)
+    raise ValueError(f"Unknown storage backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+
+def import_json(target, tasks_file='data/tasks.json', users_file='data/users.json'):
+    """Copy the JSON documents into another backend, returning (users, tasks) counts"""
+    source = JSONStorage(tasks_file, users_file)
+    users = source.load_users()
+    tasks = source.load_tasks()
+    target.save_users(users)
+    target.save_tasks(tasks)
+    logins = source._load_logins(list(users))
+    if logins:
+        target._save_logins(logins)
+    return len(users), len(tasks)
+
+
+def main():
+    """Command line entry point for one-shot data imports"""
+    parser = argparse.ArgumentParser(description='Ocean Tasks storage tools')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    importer = subcommands.add_parser('import-json', help='Import data/*.json into the SQLite store')
+    importer.add_argument('--tasks', default='data/tasks.json')
+    importer.add_argument('--users', default='data/users.json')
+    importer.add_argument('--db', default='data/ocean.db')
+    args = parser.parse_args()
+
+    if args.command == 'import-json':
+        user_count, task_count = import_json(SQLiteStorage(args.db), args.tasks, args.users)
+        print(f"🌊 Imported {user_count} users and {task_count} tasks into {args.db}")
+
+
+if __name__ == '__main__':
+    main()
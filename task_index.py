@@ -0,0 +1,353 @@
+"""
+Ocean Tasks in-memory task index
+Keeps every task reachable by id and grouped by owner so per-user reads cost
+O(their tasks) and lookups by id are O(1), plus per-user sorted keys for
+cursor-based pagination and due date range lookups
+"""
+
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+
+from task_model import Task, due_timestamp
+
+# Sort value used for tasks without a due date, so they sort after every real one
+NO_DUE_DATE = 2 ** 62
+
+SORT_FIELDS = ('created_at', 'due_date')
+
+# Changes remembered per user for delta sync; older clients have to reload
+CHANGE_LOG_SIZE = 500
+
+
+def now_timestamp():
+    """The current local wall-clock time as a due_timestamp() value"""
+    return due_timestamp(datetime.now().isoformat())
+
+
+def sort_key(field, task, due=None):
+    """Keyset pagination key of a task: (sort value, id)"""
+    if field == 'due_date':
+        return (NO_DUE_DATE if due is None else due, task['id'])
+    return (task.get('created_at') or '', task['id'])
+
+
+def parse_sort(sort):
+    """Split a sort parameter like '-due_date' into (field, descending)"""
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Unknown sort field: {field}")
+    return field, descending
+
+
+def encode_cursor(key):
+    """Opaque cursor for the position after `key`"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field='created_at'):
+    """Inverse of encode_cursor for a key of sort field `field`; ValueError if it isn't one"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], str):
+        raise ValueError("Invalid cursor")
+    value, task_id = key
+    if field == 'due_date':
+        if value is None:
+            value = NO_DUE_DATE
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= NO_DUE_DATE:
+            raise ValueError("Invalid cursor")
+    elif not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    return value, task_id
+
+
+def summarize_changes(changes):
+    """Collapse (revision, op, task_id) entries into created/updated/deleted id lists"""
+    first_op = {}
+    last_op = {}
+    for _, op, task_id in changes:
+        first_op.setdefault(task_id, op)
+        last_op[task_id] = op
+
+    summary = {'created': [], 'updated': [], 'deleted': []}
+    for task_id, op in last_op.items():
+        created_here = first_op[task_id] == 'create'
+        if op == 'delete':
+            if not created_here:
+                summary['deleted'].append(task_id)
+        else:
+            summary['created' if created_here else 'updated'].append(task_id)
+    return summary
+
+
+class UserStats:
+    """Running task counts for one user plus the sorted due dates of open tasks"""
+
+    __slots__ = ('total', 'completed', 'open_due')
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.open_due = []
+
+    def add(self, task, due):
+        self.total += 1
+        if task.get('completed', False):
+            self.completed += 1
+        elif due is not None:
+            insort(self.open_due, due)
+
+    def discard(self, task, due):
+        self.total -= 1
+        if task.get('completed', False):
+            self.completed -= 1
+        elif due is not None:
+            del self.open_due[bisect_left(self.open_due, due)]
+
+    def snapshot(self, now):
+        """Counts as of `now`; the overdue boundary is a single bisect"""
+        return {
+            'total_tasks': self.total,
+            'completed_tasks': self.completed,
+            'pending_tasks': self.total - self.completed,
+            'overdue_tasks': bisect_left(self.open_due, now),
+        }
+
+
+class TaskIndex:
+    """Tasks keyed by id (in insertion order) and by user_id -> {task_id -> task}
+
+    Tasks are held as slotted task_model.Task objects, packed once when they
+    are stored; callers copy them out with task.to_dict(). Per-user sorted key
+    lists for each sort field are built on the first query and then maintained
+    with bisect on every put/remove, and each user's UserStats is kept current
+    so counts are O(1) and the overdue count is O(log n).
+
+    Every applied journal entry bumps the owner's revision and lands in a
+    bounded per-user change log. Revisions are derived from the order of
+    entries, so every process replaying the same journal agrees on them; the
+    'baseline' entry written at the top of a compacted journal carries them
+    across snapshots.
+    """
+
+    def __init__(self, tasks=()):
+        self._tasks = {}
+        self._by_user = {}
+        self._sorted = {}
+        self._stats = {}
+        self._revisions = {}
+        self._changes = {}
+        self._change_floor = {}
+        for task in tasks:
+            self.put(task)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def all(self):
+        """Every task, in insertion order"""
+        return list(self._tasks.values())
+
+    def user_tasks(self, user_id):
+        """The tasks owned by one user, in insertion order"""
+        return list(self._by_user.get(user_id, {}).values())
+
+    def get(self, user_id, task_id):
+        """One task owned by user_id, or None"""
+        return self._by_user.get(user_id, {}).get(task_id)
+
+    def put(self, task):
+        """Insert a task (a dict or Task), or replace the stored task with the same id"""
+        if not isinstance(task, Task):
+            task = Task.from_dict(task)
+        old = self._tasks.get(task.id)
+        if old is not None:
+            self._unsort(old)
+            self._stats[old.get('user_id')].discard(old, old.due_ts)
+            if old.get('user_id') != task.get('user_id'):
+                self._unlink(old)
+        self._tasks[task['id']] = task
+        self._by_user.setdefault(task.get('user_id'), {})[task['id']] = task
+        for field, keys in self._sorted.get(task.get('user_id'), {}).items():
+            insort(keys, self._key(field, task))
+        if task.get('user_id') not in self._stats:
+            self._stats[task.get('user_id')] = UserStats()
+        self._stats[task.get('user_id')].add(task, task.due_ts)
+
+    def remove(self, user_id, task_id):
+        """Remove a task owned by user_id, returning it or None"""
+        task = self.get(user_id, task_id)
+        if task is not None:
+            self._unsort(task)
+            self._stats[user_id].discard(task, task.due_ts)
+            del self._tasks[task_id]
+            self._unlink(task)
+        return task
+
+    def stats(self, user_id, now):
+        """A user's task counts as of `now` (a due_timestamp() value)"""
+        user_stats = self._stats.get(user_id)
+        return user_stats.snapshot(now) if user_stats else UserStats().snapshot(now)
+
+    def revision(self, user_id):
+        """A counter that grows every time one of the user's tasks changes"""
+        return self._revisions.get(user_id, 0)
+
+    def changes_since(self, user_id, since):
+        """(revision, op, task_id) entries after `since`, or None if they are no longer known"""
+        if since < self._change_floor.get(user_id, 0) or since > self.revision(user_id):
+            return None
+        return [change for change in self._changes.get(user_id, ()) if change[0] > since]
+
+    def baseline(self):
+        """Journal entry that restores the current revisions and change logs"""
+        return {
+            'op': 'baseline',
+            'revisions': self._revisions,
+            'floors': self._change_floor,
+            'changes': {user_id: list(log) for user_id, log in self._changes.items()},
+        }
+
+    def carry_revisions(self, *previous):
+        """Continue past the revisions of the `previous` indexes after the whole collection was replaced"""
+        users = set(self._by_user).union(*(index._revisions for index in previous))
+        self._revisions = {user_id: max(index.revision(user_id) for index in previous) + 1 for user_id in users}
+        self._change_floor = dict(self._revisions)
+        self._changes = {}
+
+    def query(self, user_id, completed=None, due_after=None, due_before=None,
+              sort='created_at', cursor=None, limit=None):
+        """One page of a user's tasks, returned as (tasks, key of the last task or None)
+
+        due_after/due_before are exclusive due_timestamp() bounds and leave out
+        tasks without a due date. The key is only returned when more tasks may
+        follow.
+        """
+        field, descending = parse_sort(sort)
+        if cursor is not None and isinstance(cursor[0], int) != (field == 'due_date'):
+            raise ValueError("Cursor does not match the sort order")
+        keys = self._sorted_keys(user_id, field)
+        user_tasks = self._by_user.get(user_id, {})
+
+        if descending:
+            start = bisect_left(keys, cursor) if cursor is not None else len(keys)
+            positions = range(start - 1, -1, -1)
+        else:
+            start = bisect_right(keys, cursor) if cursor is not None else 0
+            positions = range(start, len(keys))
+
+        page = []
+        last_key = None
+        for position in positions:
+            key = keys[position]
+            task = user_tasks[key[1]]
+            if completed is not None and bool(task.get('completed', False)) != completed:
+                continue
+            if due_after is not None or due_before is not None:
+                due = task.due_ts
+                if due is None or (due_after is not None and due <= due_after) \
+                        or (due_before is not None and due >= due_before):
+                    continue
+            if limit is not None and len(page) == limit:
+                return page, last_key
+            page.append(task)
+            last_key = key
+        return page, None
+
+    def due_between(self, user_id, start, end):
+        """A user's tasks with start <= due < end (due_timestamp() values), by due date
+
+        Two bisects over the due date sort keys, so O(log n + k).
+        """
+        keys = self._sorted_keys(user_id, 'due_date')
+        user_tasks = self._by_user.get(user_id, {})
+        first = bisect_left(keys, (start, ''))
+        last = bisect_left(keys, (min(end, NO_DUE_DATE), ''))
+        return [user_tasks[task_id] for _, task_id in keys[first:last]]
+
+    def apply(self, entry):
+        """Apply one journal entry, returning the task it created, patched or deleted
+
+        A batch entry applies its ops in order and returns a list of results.
+
+        Entries are idempotent so replaying a journal that was already folded
+        into the snapshot is harmless.
+        """
+        op = entry['op']
+        if op == 'create':
+            task = dict(entry['task'])
+            self.put(task)
+            self._record(task.get('user_id'), 'create', task['id'])
+            return task
+        if op == 'patch':
+            task = self.get(entry['user_id'], entry['id'])
+            if task is None:
+                return None
+            task = dict(task.to_dict(), **entry['changes'])
+            if task['id'] != entry['id'] or task.get('user_id') != entry['user_id']:
+                self.remove(entry['user_id'], entry['id'])
+                self._record(entry['user_id'], 'delete', entry['id'])
+                self.put(task)
+                self._record(task.get('user_id'), 'create', task['id'])
+            else:
+                self.put(task)
+                self._record(entry['user_id'], 'update', entry['id'])
+            return task
+        if op == 'delete':
+            task = self.remove(entry['user_id'], entry['id'])
+            if task is not None:
+                self._record(entry['user_id'], 'delete', entry['id'])
+            return task
+        if op == 'batch':
+            return [self.apply(op_entry) for op_entry in entry['ops']]
+        if op == 'baseline':
+            self._revisions.update(entry['revisions'])
+            self._change_floor.update(entry['floors'])
+            for user_id, changes in entry['changes'].items():
+                self._changes[user_id] = deque((tuple(change) for change in changes), maxlen=CHANGE_LOG_SIZE)
+            return None
+        raise ValueError(f"Unknown journal operation: {op}")
+
+    def _record(self, user_id, op, task_id):
+        """Bump the user's revision and log the change"""
+        revision = self.revision(user_id) + 1
+        self._revisions[user_id] = revision
+        log = self._changes.get(user_id)
+        if log is None:
+            log = self._changes[user_id] = deque(maxlen=CHANGE_LOG_SIZE)
+        if len(log) == log.maxlen:
+            self._change_floor[user_id] = log[0][0]
+        log.append((revision, op, task_id))
+
+    def _key(self, field, task):
+        return sort_key(field, task, task.due_ts)
+
+    def _sorted_keys(self, user_id, field):
+        """The user's sort keys for one field, built on first use"""
+        user_sorted = self._sorted.setdefault(user_id, {})
+        if field not in user_sorted:
+            user_sorted[field] = sorted(self._key(field, task) for task in self._by_user.get(user_id, {}).values())
+        return user_sorted[field]
+
+    def _unsort(self, task):
+        """Drop a task's keys from its owner's sorted lists"""
+        for field, keys in self._sorted.get(task.get('user_id'), {}).items():
+            key = self._key(field, task)
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    def _unlink(self, task):
+        user_tasks = self._by_user[task.get('user_id')]
+        del user_tasks[task['id']]
+        if not user_tasks:
+            del self._by_user[task.get('user_id')]
+            self._sorted.pop(task.get('user_id'), None)
+            self._stats.pop(task.get('user_id'), None)
@@ -0,0 +1,201 @@
+"""
+Ocean Tasks task model
+A slotted Task keeps resident tasks small: dates are packed into ints, the
+owner's name is interned and there is no per-task dict. Tasks read like a
+mapping, so dict(task) gives back exactly the document that was stored.
+
+Also home to the whitelist of fields clients may change and a JSON codec that
+uses orjson when it is installed.
+"""
+
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+TASK_FIELDS = ('id', 'user_id', 'title', 'description', 'due_date', 'completed', 'created_at', 'completed_at')
+
+# Fields a client may set on create or update, and the JSON types allowed for each
+PATCHABLE_FIELDS = {
+    'title': (str,),
+    'description': (str,),
+    'due_date': (str, type(None)),
+    'completed': (bool,),
+}
+
+_EPOCH = datetime(1, 1, 1)
+_MISSING = object()
+
+
+def due_timestamp(value):
+    """Normalize a due date string to wall-clock seconds since 0001-01-01, or None"""
+    if not value:
+        return None
+    try:
+        due = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return due.toordinal() * 86400 + due.hour * 3600 + due.minute * 60 + due.second
+
+
+def validate_patch(changes):
+    """The client-settable subset of changes, or ValueError for a bad value"""
+    if not isinstance(changes, dict):
+        raise ValueError("Task changes must be an object")
+    clean = {}
+    for field, value in changes.items():
+        if field not in PATCHABLE_FIELDS:
+            continue
+        if not isinstance(value, PATCHABLE_FIELDS[field]):
+            raise ValueError(f"{field} has the wrong type")
+        if field == 'due_date' and value and due_timestamp(value) is None:
+            raise ValueError("due_date must be an ISO date")
+        clean[field] = value
+    return clean
+
+
+def _pack_date(value):
+    """A 'YYYY-MM-DD' due date as its day ordinal; anything else is kept as is"""
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            return value
+        if day.isoformat() == value:
+            return day.toordinal()
+    return value
+
+
+def _unpack_date(value):
+    return date.fromordinal(value).isoformat() if type(value) is int else value
+
+
+def _pack_time(value):
+    """A naive datetime.isoformat() timestamp as microseconds since 0001-01-01; anything else is kept as is"""
+    # Only the two shapes isoformat() produces round-trip: seconds, or non-zero microseconds
+    if not isinstance(value, str) or len(value) not in (19, 26) or value[10] != 'T':
+        return value
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if moment.tzinfo is not None or (len(value) == 26) != (moment.microsecond != 0):
+        return value
+    seconds = (moment.toordinal() - 1) * 86400 + moment.hour * 3600 + moment.minute * 60 + moment.second
+    return seconds * 1_000_000 + moment.microsecond
+
+
+def _unpack_time(value):
+    return (_EPOCH + timedelta(0, 0, value)).isoformat() if type(value) is int else value
+
+
+class Task:
+    """One task, packed; fields absent from the stored document stay absent"""
+
+    # Written out rather than @dataclass(slots=True), which needs Python 3.10
+    __slots__ = ('id', 'user_id', 'title', 'description', 'due', 'completed', 'created', 'finished', 'extra',
+                 '_due_ts')
+
+    def __init__(self, id, user_id=_MISSING, title=_MISSING, description=_MISSING, due=_MISSING,
+                 completed=_MISSING, created=_MISSING, finished=_MISSING, extra=None):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.description = description
+        self.due = due
+        self.completed = completed
+        self.created = created
+        self.finished = finished
+        self.extra = extra
+        # Due dates with a time are parsed once here (tasks are replaced, never patched in place)
+        self._due_ts = due_timestamp(due) if type(due) is str else None
+
+    def __repr__(self):
+        return f'Task({self.to_dict()!r})'
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {key: value for key, value in data.items() if key not in TASK_FIELDS} or None
+        user_id = data.get('user_id', _MISSING)
+        return cls(
+            id=data['id'],
+            user_id=sys.intern(user_id) if isinstance(user_id, str) else user_id,
+            title=data.get('title', _MISSING),
+            description=data.get('description', _MISSING),
+            due=_pack_date(data.get('due_date', _MISSING)),
+            completed=data.get('completed', _MISSING),
+            created=_pack_time(data.get('created_at', _MISSING)),
+            finished=_pack_time(data.get('completed_at', _MISSING)),
+            extra=extra,
+        )
+
+    @property
+    def due_ts(self):
+        """The due date as a due_timestamp() value, or None"""
+        if type(self.due) is int:
+            return self.due * 86400
+        return self._due_ts
+
+    def _values(self):
+        return (self.id, self.user_id, self.title, self.description, _unpack_date(self.due), self.completed,
+                _unpack_time(self.created), _unpack_time(self.finished))
+
+    def to_dict(self):
+        """The stored task document"""
+        task = {field: value for field, value in zip(TASK_FIELDS, self._values()) if value is not _MISSING}
+        if self.extra:
+            task.update(self.extra)
+        return task
+
+    # Read-only mapping interface, so task['id'] and task.get() work like on the stored document;
+    # prefer to_dict() for copies, dict(task) unpacks every field once per key
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        if key == 'id':
+            return self.id
+        if key == 'user_id':
+            value = self.user_id
+        elif key == 'completed':
+            value = self.completed
+        elif key == 'due_date':
+            value = _unpack_date(self.due)
+        elif key == 'created_at':
+            value = _unpack_time(self.created)
+        elif key in TASK_FIELDS:
+            value = self._values()[TASK_FIELDS.index(key)]
+        else:
+            value = (self.extra or {}).get(key, _MISSING)
+        return default if value is _MISSING else value
+
+
+def _default(obj):
+    if isinstance(obj, Task):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Compact JSON bytes, via orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
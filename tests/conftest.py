@@ -0,0 +1,73 @@
+"""
+Shared fixtures for the Ocean Tasks test suite
+`store` runs a test against every storage backend in a scratch folder;
+`client` is a logged-in test client of one app per test session (create_app()
+only runs once per process), each test getting a fresh user.
+"""
+
+import os
+import uuid
+
+import pytest
+
+# Before app.py is imported: no MCP server subprocesses during the tests
+os.environ['OCEAN_MCP_POOL'] = '0'
+
+from storage import BACKENDS, create_storage  # noqa: E402
+
+
+def open_store(backend, data_dir):
+    """A storage backend keeping its files under data_dir"""
+    return create_storage(backend,
+                          tasks_file=os.path.join(data_dir, 'tasks.json'),
+                          users_file=os.path.join(data_dir, 'users.json'),
+                          db_file=os.path.join(data_dir, 'ocean.db'))
+
+
+def make_task(user_id, number, **fields):
+    """A stored task record like the ones app.build_task() creates"""
+    task = {
+        'id': f'task-{number:04d}',
+        'user_id': user_id,
+        'title': f'Shell {number}',
+        'description': '',
+        'due_date': None,
+        'completed': False,
+        'created_at': f'2026-01-{number % 28 + 1:02d}T09:00:00',
+        'completed_at': None,
+    }
+    task.update(fields)
+    return task
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def store(backend, tmp_path):
+    return open_store(backend, str(tmp_path))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    from app import create_app
+
+    flask_app = create_app(storage='json', data_dir=str(tmp_path_factory.mktemp('data')))
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    username = f'surfer_{uuid.uuid4().hex[:8]}'
+    response = client.post('/api/signup', json={
+        'username': username, 'email': f'{username}@ocean.sea', 'password': 'seashells',
+        'confirmPassword': 'seashells', 'favoriteBeach': 'sunset', 'terms': True,
+    })
+    assert response.status_code == 200, response.get_json()
+    response = client.post('/api/login', json={'username': username, 'password': 'seashells'})
+    assert response.status_code == 200, response.get_json()
+    return client
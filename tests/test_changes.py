@@ -0,0 +1,110 @@
+"""Revisions, ETags and the /api/tasks/changes delta feed"""
+
+import json
+import os
+
+import pytest
+
+from conftest import make_task, open_store
+from task_index import CHANGE_LOG_SIZE, summarize_changes
+
+
+def test_every_change_bumps_only_its_owner(store):
+    start = store.revision('coral')
+    store.add_task(make_task('coral', 1))
+    store.update_task('coral', 'task-0001', {'title': 'Sand dollar'})
+    store.add_task(make_task('kelp', 2))
+    store.delete_task('coral', 'task-0001')
+
+    assert store.revision('coral') == start + 3
+    revision, changes = store.changes_since('coral', start)
+    assert revision == start + 3
+    assert [op for _, op, _ in changes] == ['create', 'update', 'delete']
+    assert [rev for rev, _, _ in changes] == [start + 1, start + 2, start + 3]
+
+
+def test_changes_collapse_per_task(store):
+    store.save_tasks([make_task('coral', 1), make_task('coral', 2)])
+    since = store.revision('coral')
+    store.update_task('coral', 'task-0001', {'completed': True})
+    store.delete_task('coral', 'task-0002')
+    store.add_task(make_task('coral', 3))
+    store.add_task(make_task('coral', 4))
+    store.update_task('coral', 'task-0004', {'title': 'Starfish'})
+    store.delete_task('coral', 'task-0003')
+
+    _, changes = store.changes_since('coral', since)
+    assert summarize_changes(changes) == {'created': ['task-0004'], 'updated': ['task-0001'],
+                                          'deleted': ['task-0002']}
+    assert store.changes_since('coral', store.revision('coral')) == (store.revision('coral'), [])
+
+
+def test_forgotten_or_future_revisions_ask_for_a_reset(store):
+    for i in range(CHANGE_LOG_SIZE + 10):
+        store.add_task(make_task('coral', i))
+    revision = store.revision('coral')
+
+    assert store.changes_since('coral', 0) == (revision, None)
+    assert store.changes_since('coral', revision + 1) == (revision, None)
+    assert len(store.changes_since('coral', revision - CHANGE_LOG_SIZE)[1]) == CHANGE_LOG_SIZE
+
+
+def test_hand_edited_tasks_file_bumps_revisions(tmp_path):
+    store = open_store('json', str(tmp_path))
+    store.save_tasks([make_task('coral', 1), make_task('kelp', 2)])
+    before = {user: store.revision(user) for user in ('coral', 'kelp')}
+
+    tasks_file = os.path.join(str(tmp_path), 'tasks.json')
+    with open(tasks_file) as f:
+        tasks = json.load(f)
+    tasks[0]['title'] = 'Edited by hand on the beach'
+    with open(tasks_file, 'w') as f:
+        json.dump(tasks, f)
+
+    for user in ('coral', 'kelp'):
+        assert store.revision(user) > before[user]
+        assert store.changes_since(user, before[user])[1] is None
+    # Another process opening the edited file agrees on the new revisions
+    reopened = open_store('json', str(tmp_path))
+    assert reopened.revision('coral') == store.revision('coral')
+
+
+def test_etag_revalidation(client):
+    response = client.get('/api/tasks')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    cached = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert client.get('/api/tasks?limit=5', headers={'If-None-Match': etag}).status_code == 200
+
+    client.post('/api/tasks', json={'title': 'Tide pool'})
+    changed = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert int(changed.headers['X-Revision']) == int(response.headers['X-Revision']) + 1
+
+
+def test_change_feed(client):
+    kept = client.post('/api/tasks', json={'title': 'Driftwood'}).get_json()
+    gone = client.post('/api/tasks', json={'title': 'Seaweed'}).get_json()
+    since = int(client.get('/api/tasks').headers['X-Revision'])
+
+    client.put(f"/api/tasks/{kept['id']}", json={'completed': True})
+    client.delete(f"/api/tasks/{gone['id']}")
+    new = client.post('/api/tasks', json={'title': 'Conch'}).get_json()
+
+    feed = client.get(f'/api/tasks/changes?since={since}').get_json()
+    assert feed['reset'] is False
+    assert feed['revision'] == since + 3
+    assert (feed['created'], feed['updated'], feed['deleted']) == ([new['id']], [kept['id']], [gone['id']])
+    assert {task['id']: task['completed'] for task in feed['tasks']} == {new['id']: False, kept['id']: True}
+
+    assert client.get(f"/api/tasks/changes?since={feed['revision']}").get_json()['tasks'] == []
+    assert client.get(f"/api/tasks/changes?since={feed['revision'] + 5}").get_json()['reset'] is True
+
+
+@pytest.mark.parametrize('since', ('', 'yesterday', '-1'))
+def test_change_feed_needs_a_revision(client, since):
+    assert client.get(f'/api/tasks/changes?since={since}').status_code == 400
@@ -0,0 +1,113 @@
+"""Cursor pagination of /api/tasks and Storage.query_tasks()"""
+
+import base64
+import json
+
+import pytest
+
+from conftest import make_task
+from task_index import encode_cursor, parse_sort, sort_key
+from task_model import due_timestamp
+
+SORTS = ('created_at', '-created_at', 'due_date', '-due_date')
+DUE_DATES = (None, '2026-03-01', '2026-02-14', '2026-02-14T08:30', '2026-02-14', '2026-01-31T23:59')
+
+
+@pytest.fixture
+def tasks(store):
+    # Repeated created_at and due dates, so ties have to be broken by id
+    tasks = [make_task('coral', i, due_date=DUE_DATES[i % len(DUE_DATES)], completed=i % 4 == 0)
+             for i in range(40)]
+    tasks.append(make_task('kelp', 99))
+    store.save_tasks(tasks)
+    return [task for task in tasks if task['user_id'] == 'coral']
+
+
+def expected_ids(tasks, sort):
+    field, descending = parse_sort(sort)
+    ordered = sorted(tasks, key=lambda task: sort_key(field, task, due_timestamp(task['due_date'])),
+                     reverse=descending)
+    return [task['id'] for task in ordered]
+
+
+def page_through(store, limit, **query):
+    ids = []
+    cursor = None
+    while True:
+        page, cursor = store.query_tasks('coral', cursor=cursor, limit=limit, **query)
+        assert len(page) <= limit
+        ids += [task['id'] for task in page]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('sort', SORTS)
+@pytest.mark.parametrize('limit', (1, 7, 40, 100))
+def test_pages_cover_every_task_once_in_order(store, tasks, sort, limit):
+    assert page_through(store, limit, sort=sort) == expected_ids(tasks, sort)
+
+
+@pytest.mark.parametrize('sort', SORTS)
+def test_filters_apply_across_pages(store, tasks, sort):
+    bounds = {'due_after': due_timestamp('2026-02-01'), 'due_before': due_timestamp('2026-03-01')}
+    wanted = [task for task in tasks if not task['completed'] and task['due_date']
+              and bounds['due_after'] < due_timestamp(task['due_date']) < bounds['due_before']]
+
+    assert page_through(store, 3, sort=sort, completed=False, **bounds) == expected_ids(wanted, sort)
+
+
+def test_inserts_between_pages_do_not_shift_the_cursor(store, tasks):
+    first, cursor = store.query_tasks('coral', limit=10)
+    store.add_task(make_task('coral', 500, created_at='2025-12-31T00:00:00'))
+    store.add_task(make_task('coral', 501, created_at='2026-12-31T00:00:00'))
+
+    rest = []
+    while cursor is not None:
+        page, cursor = store.query_tasks('coral', cursor=cursor, limit=10)
+        rest += [task['id'] for task in page]
+
+    # The task sorting before the cursor is skipped, the later one shows up last
+    assert [task['id'] for task in first] + rest[:-1] == expected_ids(tasks, 'created_at')
+    assert rest[-1] == 'task-0501'
+
+
+def test_cursor_from_another_sort_is_rejected(store, tasks):
+    _, cursor = store.query_tasks('coral', sort='created_at', limit=5)
+    with pytest.raises(ValueError):
+        store.query_tasks('coral', sort='due_date', cursor=cursor, limit=5)
+
+
+def test_api_follows_next_cursor_header(client):
+    created = [client.post('/api/tasks', json={'title': f'Wave {i}'}).get_json()['id'] for i in range(5)]
+
+    ids = []
+    url = '/api/tasks?limit=2'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [task['id'] for task in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/api/tasks?limit=2&cursor={cursor}' if cursor else None
+
+    assert sorted(ids) == sorted(created)
+    assert len(ids) == 5
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('query', (
+    'cursor=not-a-cursor!',
+    f'cursor={raw_cursor({"id": "task-0001"})}',
+    f'cursor={raw_cursor(["2026-01-01T09:00:00", 7])}',
+    f'sort=due_date&cursor={encode_cursor(("2026-01-01T09:00:00", "task-0001"))}',
+    f'sort=due_date&cursor={raw_cursor([-5, "task-0001"])}',
+    'limit=0',
+    'limit=ten',
+    'sort=title',
+))
+def test_api_rejects_bad_page_parameters(client, query):
+    response = client.get(f'/api/tasks?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,96 @@
+"""Data migrations (migrations.py) and the `flask migrate` command"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import open_store
+from migrations import SCHEMA_VERSION, migration, run_migrations
+
+LAST_LOGIN = '2026-01-09T21:15:07.668419'
+
+
+def write_legacy_data(data_dir, count):
+    """tasks.json and users.json the way the first release wrote them:
+    tasks without a user_id, last_login inside the user records"""
+    users = {
+        'shobi': {
+            'email': 'shobi@ocean.sea',
+            'password': '96cae35ce8a9b0244178bf28e4966c2ce1b8385723a96a6b838858cdd6ca0a1e',
+            'favorite_beach': 'sunset',
+            'created_at': '2026-01-09T20:45:38.118036',
+            'last_login': LAST_LOGIN,
+        }
+    }
+    tasks = [{
+        'id': f'legacy-{i}',
+        'title': f'Shell {i}',
+        'description': '',
+        'due_date': '2026-01-09' if i % 2 else None,
+        'completed': i % 3 == 0,
+        'created_at': '2026-01-09T21:15:35.938320',
+        'completed_at': None,
+    } for i in range(count)]
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, 'users.json'), 'w') as f:
+        json.dump(users, f, indent=2)
+    with open(os.path.join(data_dir, 'tasks.json'), 'w') as f:
+        json.dump(tasks, f, indent=2)
+
+
+def assert_migrated(store, count):
+    tasks = store.load_tasks()
+    assert len(tasks) == count
+    assert all(task.get('user_id') == 'shobi' for task in tasks)
+    assert not any('last_login' in user for user in store.load_users().values())
+    assert store.last_login('shobi') == LAST_LOGIN
+    assert store.get_schema_version() == SCHEMA_VERSION
+
+
+def test_legacy_json_data_is_upgraded(tmp_path):
+    write_legacy_data(str(tmp_path), 20)
+    store = open_store('json', str(tmp_path))
+
+    assert run_migrations(store) == list(range(1, SCHEMA_VERSION + 1))
+    assert_migrated(store, 20)
+
+
+def test_migrations_run_once(store):
+    assert run_migrations(store) == list(range(1, SCHEMA_VERSION + 1))
+    assert store.get_schema_version() == SCHEMA_VERSION
+    assert run_migrations(store) == []
+
+
+def test_versions_are_remembered_across_opens(tmp_path, backend, store):
+    run_migrations(store)
+    assert run_migrations(open_store(backend, str(tmp_path))) == []
+
+
+def test_pending_migrations_start_after_the_stored_version(tmp_path):
+    write_legacy_data(str(tmp_path), 4)
+    store = open_store('json', str(tmp_path))
+    store.set_schema_version(1)
+
+    # Owners are version 1, so only the login move runs and the orphans stay
+    assert run_migrations(store) == list(range(2, SCHEMA_VERSION + 1))
+    assert not any('user_id' in task for task in store.load_tasks())
+    assert store.last_login('shobi') == LAST_LOGIN
+
+
+def test_migration_versions_must_be_consecutive():
+    with pytest.raises(ValueError):
+        migration(SCHEMA_VERSION + 2)(lambda store: None)
+
+
+def test_flask_migrate_command(tmp_path, pytestconfig):
+    # create_app()'s default data folder, relative to the working directory
+    write_legacy_data(str(tmp_path / 'data'), 100)
+    env = dict(os.environ, OCEAN_STORAGE='json', OCEAN_MCP_POOL='0', PYTHONPATH=str(pytestconfig.rootpath))
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'migrate'],
+                            cwd=str(tmp_path), env=env, capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert_migrated(open_store('json', str(tmp_path / 'data')), 100)
@@ -0,0 +1,66 @@
+"""Maintained task counts (Storage.task_stats) against a recount from scratch"""
+
+import random
+
+from conftest import make_task, open_store
+from task_model import due_timestamp
+
+DUE_DATES = (None, '2026-01-10', '2026-01-10T12:00', '2026-01-11', '2026-02-01T08:15', '2027-01-01')
+NOWS = ('2026-01-01', '2026-01-10T11:59', '2026-01-10T12:00', '2026-01-10T12:01', '2026-06-01')
+
+
+def recount(tasks, now):
+    """Task counts for one user computed from scratch; `now` is a due_timestamp() value"""
+    stats = {'total_tasks': 0, 'completed_tasks': 0, 'pending_tasks': 0, 'overdue_tasks': 0}
+    for task in tasks:
+        stats['total_tasks'] += 1
+        if task.get('completed', False):
+            stats['completed_tasks'] += 1
+        else:
+            stats['pending_tasks'] += 1
+            due = due_timestamp(task.get('due_date'))
+            if due is not None and due < now:
+                stats['overdue_tasks'] += 1
+    return stats
+
+
+def assert_counts_match(store, users):
+    for user_id in users:
+        tasks = store.get_user_tasks(user_id)
+        for now in map(due_timestamp, NOWS):
+            assert store.task_stats(user_id, now) == recount(tasks, now), (user_id, now)
+
+
+def test_counts_survive_random_changes(backend, store, tmp_path):
+    rng = random.Random(2026)
+    users = ('coral', 'kelp', 'pearl')
+    store.save_tasks([make_task(rng.choice(users), i, due_date=rng.choice(DUE_DATES)) for i in range(30)])
+    live = {task['id']: task['user_id'] for task in store.load_tasks()}
+    next_number = 30
+
+    for step in range(400):
+        action = rng.random()
+        if action < 0.3 or not live:
+            user_id = rng.choice(users)
+            store.add_task(make_task(user_id, next_number, due_date=rng.choice(DUE_DATES)))
+            live[f'task-{next_number:04d}'] = user_id
+            next_number += 1
+        elif action < 0.8:
+            task_id = rng.choice(sorted(live))
+            changes = rng.choice(({'completed': rng.random() < 0.5}, {'due_date': rng.choice(DUE_DATES)},
+                                  {'title': 'Renamed', 'completed': False}))
+            assert store.update_task(live[task_id], task_id, changes) is not None
+        else:
+            task_id = rng.choice(sorted(live))
+            assert store.delete_task(live.pop(task_id), task_id)
+
+        if step % 50 == 0:
+            assert_counts_match(store, users)
+
+    assert_counts_match(store, users)
+    # Counts rebuilt from disk by a fresh process agree as well
+    assert_counts_match(open_store(backend, str(tmp_path)), users)
+
+
+def test_counts_for_a_user_without_tasks(store):
+    assert store.task_stats('nobody', due_timestamp('2026-01-01')) == recount([], 0)
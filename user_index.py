@@ -0,0 +1,50 @@
+"""
+Ocean Tasks in-memory user directory
+Keeps user records reachable by username and by lowercase email, so signup
+validation and username availability checks are O(1) whatever the user count
+"""
+
+
+def email_key(email):
+    """Emails are unique regardless of case"""
+    return (email or '').strip().lower()
+
+
+class UserIndex:
+    """Username and email hash indexes over a users document"""
+
+    def __init__(self, users=None):
+        self._users = {}
+        self._emails = {}
+        for username, record in (users or {}).items():
+            self.put(username, record)
+
+    def __len__(self):
+        return len(self._users)
+
+    def all(self):
+        """The users document, username -> record"""
+        return self._users
+
+    def get(self, username):
+        return self._users.get(username)
+
+    def email_owner(self, email):
+        """Username registered with `email`, or None"""
+        return self._emails.get(email_key(email)) if email_key(email) else None
+
+    def conflict(self, username, email):
+        """Why a new user can't be added, or None"""
+        if username in self._users:
+            return "Username already exists"
+        if self.email_owner(email) is not None:
+            return "Email already registered"
+        return None
+
+    def put(self, username, record):
+        previous = self._users.get(username)
+        if previous is not None and self._emails.get(email_key(previous.get('email'))) == username:
+            del self._emails[email_key(previous.get('email'))]
+        self._users[username] = record
+        if email_key(record.get('email')):
+            self._emails.setdefault(email_key(record.get('email')), username)
@@ -0,0 +1,16 @@
+"""
+Ocean Tasks WSGI entry point
+app.py builds nothing on import, so WSGI servers that load a module-level
+app should point here; it runs create_app() with the environment's settings
+(OCEAN_STORAGE, OCEAN_SESSIONS, OCEAN_SECRET_KEY, ...).
+
+    gunicorn --workers 4 --threads 8 wsgi:app
+    flask --app wsgi run
+
+Each worker has to build its own app (the overdue scheduler and MCP pool run
+on threads, which don't survive a fork), so don't use gunicorn's --preload.
+"""
+
+from app import create_app
+
+app = create_app()